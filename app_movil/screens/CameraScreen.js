@@ -10,6 +10,7 @@ import {
   View,
 } from "react-native";
 import { SERVER_URL } from "../config";
+import { sessionHeaders } from "../session";
 
 export default function CameraScreen({ navigation }) {
   const [permission, requestPermission] = useCameraPermissions();
@@ -43,16 +44,18 @@ export default function CameraScreen({ navigation }) {
         if (cameraRef.current && cameraRef.current.takePictureAsync) {
           const photo = await cameraRef.current.takePictureAsync({
             quality: 0.3,
-            base64: true,
             skipProcessing: true,
           });
 
-          if (photo && photo.base64) {
+          if (photo && photo.uri) {
             try {
+              // Enviar el JPEG como archivo multipart (sin base64)
+              const form = new FormData();
+              form.append("image", { uri: photo.uri, name: "frame.jpg", type: "image/jpeg" });
               const resp = await fetch(`${SERVER_URL}/api/evaluate_frame`, {
                 method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ image: `data:image/jpeg;base64,${photo.base64}` }),
+                headers: sessionHeaders(),
+                body: form,
               });
 
               const j = await resp.json();
@@ -14,6 +14,7 @@ import {
 } from "react-native";
 import { Video, Audio } from "expo-av";
 import { SERVER_URL } from "../config";
+import { sessionHeaders } from "../session";
 
 // Stubs de sonido para evitar ReferenceError si todavía no hay implementación de audio
 // Se pueden reemplazar posteriormente por carga de sonidos con expo-av
@@ -176,7 +177,7 @@ export default function VideoRefScreen({ navigation }) {
           
           await fetch(`${SERVER_URL}/api/sync_reference_time`, {
             method: "POST",
-            headers: { "Content-Type": "application/json" },
+            headers: sessionHeaders({ "Content-Type": "application/json" }),
             body: JSON.stringify({ current_time: videoCurrentTime }),
             signal: controller.signal,
           });
@@ -309,21 +310,22 @@ export default function VideoRefScreen({ navigation }) {
             const controller = new AbortController();
             const timeoutId = setTimeout(() => controller.abort(), 20000); // 20 segundos timeout
 
+            // ⭐ Enviar el JPEG como archivo multipart (sin base64) y la información
+            // del video de referencia para sincronización como campos del formulario
+            const form = new FormData();
+            form.append("image", { uri: photo.uri, name: "frame.jpg", type: "image/jpeg" });
+            if (selectedVideo) {
+              form.append("condition", selectedCondition);
+              form.append("video_name", selectedVideo.name);
+              form.append("current_time", String(videoCurrentTime));
+            }
+
             const resp = await fetch(`${SERVER_URL}/api/evaluate_frame`, {
               method: "POST",
-              headers: { 
-                "Content-Type": "application/json",
+              headers: sessionHeaders({
                 "Accept": "application/json",
-              },
-              body: JSON.stringify({
-                image: `data:image/jpeg;base64,${photo.base64}`,
-                // ⭐ Enviar información del video de referencia para sincronización
-                reference_video: selectedVideo ? {
-                  condition: selectedCondition,
-                  video_name: selectedVideo.name,
-                  current_time: videoCurrentTime,
-                } : null,
               }),
+              body: form,
               signal: controller.signal,
             }).catch((fetchError) => {
               clearTimeout(timeoutId);
@@ -557,7 +559,7 @@ export default function VideoRefScreen({ navigation }) {
                   try {
                     await fetch(`${SERVER_URL}/api/set_reference_video`, {
                       method: 'POST',
-                      headers: { 'Content-Type': 'application/json' },
+                      headers: sessionHeaders({ 'Content-Type': 'application/json' }),
                       body: JSON.stringify({
                         condition: selectedCondition,
                         video_name: video.name,
@@ -0,0 +1,39 @@
+/**
+ * Identificador de sesión por instalación
+ * El servidor guarda referencia, tolerancia, suavizado y DTW por sesión; se envía en la
+ * cabecera X-Session-Id para que dos teléfonos detrás de la misma red no compartan estado.
+ */
+
+import { File, Paths } from "expo-file-system";
+
+let sessionId = null;
+
+function newSessionId() {
+  return `app-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+}
+
+export function getSessionId() {
+  if (sessionId) return sessionId;
+  try {
+    const file = new File(Paths.document, "session_id.txt");
+    if (file.exists) {
+      const saved = file.textSync().trim();
+      if (saved) {
+        sessionId = saved;
+        return sessionId;
+      }
+    } else {
+      file.create();
+    }
+    sessionId = newSessionId();
+    file.write(sessionId);
+  } catch (e) {
+    // Sin almacenamiento: id válido solo mientras la app siga abierta
+    sessionId = sessionId || newSessionId();
+  }
+  return sessionId;
+}
+
+export function sessionHeaders(headers = {}) {
+  return { ...headers, "X-Session-Id": getSessionId() };
+}
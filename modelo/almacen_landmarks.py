@@ -0,0 +1,309 @@
+"""
+Almacén binario columnar de landmarks para entrenamiento y calibración.
+
+Sustituye a `dataset_posturas.csv` / `dataset_posturas_videos.csv` (99 floats como texto por
+fila que había que volver a parsear en cada entrenamiento). Un almacén es un directorio
+`<nombre>.lmk/` con una columna por archivo binario sin cabecera:
+
+- `features.f32`   float32 (N, n_features) con los landmarks [x,y,z,...]
+- `label.i32`      índice de la clase en `meta.json['classes']`
+- `source.i32`     índice del archivo de origen en `meta.json['sources']` (-1 si se desconoce)
+- `frame.i32`      índice de frame dentro del video (-1 en imágenes o si se desconoce)
+- `timestamp.f32`  segundo del frame en el video (NaN si se desconoce)
+- `confidence.f32` confianza del detector (visibilidad media; NaN si se desconoce)
+
+Las columnas se abren con `np.memmap`, así que cargar el almacén no lee nada hasta que se
+usan los datos, y los filtros por clase o por video solo tocan las filas seleccionadas.
+`append` añade al final de cada archivo y después actualiza `meta.json` de forma atómica:
+`meta['rows']` es lo único que cuenta, de modo que un proceso que muera a mitad de una
+escritura deja a lo sumo bytes sobrantes que se ignoran (y se recortan en el siguiente append).
+`meta['stamps']` guarda opcionalmente el tamaño y mtime de cada archivo de origen para que
+quien lo use (la calibración) detecte videos reemplazados y los vuelva a extraer tras
+`remove_sources`.
+
+Uso:
+    python almacen_landmarks.py importar dataset_posturas.csv dataset_posturas.lmk
+    python almacen_landmarks.py exportar dataset_posturas.lmk dataset_posturas.csv
+    python almacen_landmarks.py info dataset_posturas.lmk
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+STORE_VERSION = 1
+N_FEATURES = 99
+COLUMNS = {'label': np.int32, 'source': np.int32, 'frame': np.int32,
+           'timestamp': np.float32, 'confidence': np.float32}
+FEATURE_NAMES = [f'lm_{i}_{coord}' for i in range(33) for coord in ['x', 'y', 'z']]
+
+
+class LandmarkStore:
+    """Almacén de filas (landmarks, clase, procedencia) en columnas binarias memory-mapped."""
+
+    def __init__(self, path, n_features=N_FEATURES, normalized=False, create=True):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        meta_path = self.path / 'meta.json'
+        if meta_path.exists():
+            with open(meta_path, encoding='utf-8') as f:
+                self.meta = json.load(f)
+            if self.meta.get('version') != STORE_VERSION:
+                raise ValueError(f"versión de almacén no soportada: {self.meta.get('version')}")
+        elif create:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.meta = {'version': STORE_VERSION, 'rows': 0, 'n_features': int(n_features),
+                         'normalized': bool(normalized), 'classes': [], 'sources': []}
+            self._write_meta()
+        else:
+            raise FileNotFoundError(f'No existe el almacén {self.path}')
+        self._class_ids = {c: i for i, c in enumerate(self.meta['classes'])}
+        self._source_ids = {s: i for i, s in enumerate(self.meta['sources'])}
+
+    @classmethod
+    def open(cls, path):
+        return cls(path, create=False)
+
+    @staticmethod
+    def exists(path):
+        return (Path(path) / 'meta.json').exists()
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def n_features(self):
+        return self.meta['n_features']
+
+    @property
+    def classes(self):
+        return list(self.meta['classes'])
+
+    @property
+    def sources(self):
+        return list(self.meta['sources'])
+
+    @property
+    def normalized(self):
+        return self.meta['normalized']
+
+    def _file(self, name):
+        suffix = 'f32' if name in ('features', 'timestamp', 'confidence') else 'i32'
+        return self.path / f'{name}.{suffix}'
+
+    def _write_meta(self):
+        tmp = self.path / 'meta.json.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp, self.path / 'meta.json')
+
+    def _ids(self, values, table, key):
+        out = np.empty(len(values), dtype=np.int32)
+        for i, v in enumerate(values):
+            if v is None:
+                out[i] = -1
+                continue
+            v = str(v)
+            idx = table.get(v)
+            if idx is None:
+                idx = table[v] = len(self.meta[key])
+                self.meta[key].append(v)
+            out[i] = idx
+        return out
+
+    def append(self, features, labels, sources=None, frames=None, timestamps=None, confidences=None):
+        """Añade n filas. `features` es (n, n_features); `labels` y `sources` son nombres
+        (str); las columnas de procedencia se pueden omitir o dar como un escalar."""
+        features = np.ascontiguousarray(features, dtype=np.float32).reshape(-1, self.n_features)
+        n = len(features)
+        if n == 0:
+            return 0
+        if isinstance(labels, str):
+            labels = [labels] * n
+        if sources is None or isinstance(sources, str):
+            sources = [sources] * n
+        cols = {'frame': -1 if frames is None else frames,
+                'timestamp': np.nan if timestamps is None else timestamps,
+                'confidence': np.nan if confidences is None else confidences}
+        with self._lock:
+            cols['label'] = self._ids(labels, self._class_ids, 'classes')
+            cols['source'] = self._ids(sources, self._source_ids, 'sources')
+            rows = self.meta['rows']
+            self._write_column('features', features, rows * self.n_features * 4)
+            for name, dtype in COLUMNS.items():
+                values = np.broadcast_to(np.asarray(cols[name], dtype=dtype), (n,))
+                self._write_column(name, np.ascontiguousarray(values), rows * 4)
+            self.meta['rows'] = rows + n
+            self._write_meta()
+        return n
+
+    def stamp(self, source):
+        """Sello {'size', 'mtime_ns'} guardado para el archivo de origen, o None."""
+        return self.meta.get('stamps', {}).get(str(source))
+
+    def set_stamp(self, source, stamp):
+        with self._lock:
+            self.meta.setdefault('stamps', {})[str(source)] = dict(stamp)
+            self._write_meta()
+
+    def remove_sources(self, sources):
+        """Elimina las filas (y los sellos) de los archivos de origen dados reescribiendo las
+        columnas. Devuelve las filas eliminadas."""
+        with self._lock:
+            ids = [self._source_ids[s] for s in sources if s in self._source_ids]
+            for s in sources:
+                self.meta.get('stamps', {}).pop(str(s), None)
+            keep = np.flatnonzero(~np.isin(self._column('source'), ids)) if ids else None
+            removed = 0 if keep is None else len(self) - len(keep)
+            if removed:
+                cols = {name: np.ascontiguousarray(self._column(name)[keep])
+                        for name in ('features',) + tuple(COLUMNS)}
+                # Primero el almacén se da por vacío: si el proceso muere a mitad, se pierden
+                # filas (se vuelven a extraer) pero nunca quedan columnas desalineadas
+                self.meta['rows'] = 0
+                self._write_meta()
+                for name, values in cols.items():
+                    tmp = self._file(name).with_suffix('.tmp')
+                    with open(tmp, 'wb') as f:
+                        f.write(values.tobytes())
+                    os.replace(tmp, self._file(name))
+                self.meta['rows'] = len(keep)
+            self._write_meta()
+        return removed
+
+    def clear(self, normalized=None):
+        """Vacía el almacén (para reconstruirlo) conservando su directorio."""
+        with self._lock:
+            for name in ('features',) + tuple(COLUMNS):
+                try:
+                    self._file(name).unlink()
+                except FileNotFoundError:
+                    pass
+            self.meta.update(rows=0, classes=[], sources=[], stamps={})
+            if normalized is not None:
+                self.meta['normalized'] = bool(normalized)
+            self._class_ids = {}
+            self._source_ids = {}
+            self._write_meta()
+
+    def _write_column(self, name, values, offset):
+        with open(self._file(name), 'ab') as f:
+            if f.tell() != offset:
+                f.truncate(offset)   # restos de un append interrumpido
+                f.seek(offset)
+            f.write(values.tobytes())
+
+    def _column(self, name):
+        rows = self.meta['rows']
+        if name == 'features':
+            if rows == 0:
+                return np.zeros((0, self.n_features), dtype=np.float32)
+            return np.memmap(self._file(name), dtype=np.float32, mode='r', shape=(rows, self.n_features))
+        if rows == 0:
+            return np.zeros(0, dtype=COLUMNS[name])
+        return np.memmap(self._file(name), dtype=COLUMNS[name], mode='r', shape=(rows,))
+
+    def select(self, classes=None, sources=None):
+        """Índices de las filas cuyas clases / archivos de origen están en las listas dadas."""
+        mask = np.ones(len(self), dtype=bool)
+        if classes is not None:
+            ids = [self._class_ids[c] for c in classes if c in self._class_ids]
+            mask &= np.isin(self._column('label'), ids)
+        if sources is not None:
+            ids = [self._source_ids[s] for s in sources if s in self._source_ids]
+            mask &= np.isin(self._column('source'), ids)
+        return np.flatnonzero(mask)
+
+    def load(self, classes=None, sources=None):
+        """Dict con 'features' (n, n_features) float32, 'labels' (nombres), 'label_ids' y las
+        columnas de procedencia ('sources' como nombres). Sin filtros las columnas numéricas
+        son vistas memory-mapped (no se lee nada del disco hasta usarlas)."""
+        cols = {name: self._column(name) for name in ('features',) + tuple(COLUMNS)}
+        if classes is not None or sources is not None:
+            idx = self.select(classes, sources)
+            cols = {name: np.asarray(col[idx]) for name, col in cols.items()}
+        class_names = np.array(self.meta['classes'] or [''], dtype=object)
+        source_names = np.array(self.meta['sources'] + [None], dtype=object)  # -1 -> None
+        return {'features': cols['features'],
+                'label_ids': cols['label'],
+                'labels': class_names[cols['label']] if len(cols['label']) else np.array([], dtype=object),
+                'sources': source_names[cols['source']] if len(cols['source']) else np.array([], dtype=object),
+                'frames': cols['frame'],
+                'timestamps': cols['timestamp'],
+                'confidences': cols['confidence']}
+
+    def info(self):
+        labels = self._column('label')
+        counts = np.bincount(labels, minlength=len(self.meta['classes'])) if len(labels) else []
+        return {'rows': len(self),
+                'n_features': self.n_features,
+                'normalized': self.normalized,
+                'sources': len(self.meta['sources']),
+                'classes': {c: int(n) for c, n in zip(self.meta['classes'], counts)}}
+
+
+def csv_to_store(csv_path, store_path, normalized=False, batch_rows=4096):
+    """Importa un CSV con columnas lm_*_{x,y,z} y 'clase' a un almacén (añadiendo si ya existe).
+    Devuelve el almacén."""
+    store = LandmarkStore(store_path, normalized=normalized)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        n = store.n_features
+        label_col = header.index('clase') if 'clase' in header else len(header) - 1
+        feats, labels = [], []
+        for row in reader:
+            if len(row) <= label_col:
+                continue
+            feats.append(row[:n])
+            labels.append(row[label_col])
+            if len(feats) >= batch_rows:
+                store.append(np.array(feats, dtype=np.float32), labels)
+                feats, labels = [], []
+        if feats:
+            store.append(np.array(feats, dtype=np.float32), labels)
+    return store
+
+
+def store_to_csv(store_path, csv_path):
+    """Exporta un almacén al CSV clásico (lm_*_{x,y,z} + clase). Devuelve las filas escritas."""
+    data = LandmarkStore.open(store_path).load()
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(FEATURE_NAMES[:data['features'].shape[1]] + ['clase'])
+        for feats, label in zip(data['features'], data['labels']):
+            writer.writerow([repr(float(v)) for v in feats] + [label])
+    return len(data['labels'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convertir entre CSV de landmarks y el almacén binario')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    imp = sub.add_parser('importar', help='CSV -> almacén')
+    imp.add_argument('csv')
+    imp.add_argument('almacen')
+    imp.add_argument('--normalizado', action='store_true', help='Las filas ya están normalizadas por torso')
+    exp = sub.add_parser('exportar', help='almacén -> CSV')
+    exp.add_argument('almacen')
+    exp.add_argument('csv')
+    inf = sub.add_parser('info', help='Resumen del almacén')
+    inf.add_argument('almacen')
+    args = parser.parse_args()
+
+    if args.comando == 'importar':
+        store = csv_to_store(args.csv, args.almacen, normalized=args.normalizado)
+        print(f"Almacén {args.almacen}: {len(store)} filas")
+    elif args.comando == 'exportar':
+        n = store_to_csv(args.almacen, args.csv)
+        print(f"CSV {args.csv}: {n} filas")
+    else:
+        print(json.dumps(LandmarkStore.open(args.almacen).info(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@
 print("[BOOT] Iniciando importaciones...")
 import sys
 import os
+import time
+_BOOT_T0 = time.perf_counter()
 # Suprimir warnings de TensorFlow
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
@@ -10,57 +12,438 @@ from flask import Flask, render_template, jsonify, send_file, request
 print("[BOOT] ✓ Flask importado")
 from flask_socketio import SocketIO
 print("[BOOT] ✓ Flask-SocketIO importado")
-import cv2
-print("[BOOT] ✓ OpenCV importado")
-import mediapipe as mp
-print("[BOOT] ✓ MediaPipe importado")
 import numpy as np
-import joblib
 import base64
 import json
-import requests
 from threading import Lock
 from pathlib import Path
-print("[BOOT] ✓ Todas las importaciones completadas")
+from arranque import BootSequence
+from sesiones import LeaseTotals, SessionRegistry
+from contextlib import contextmanager
+from micro_lotes import MicroBatcher
+from canal_evaluacion import LatestFrameChannel
+from pipeline_video import VideoPipeline
+from suscripciones_video import VideoSubscriptions
+from dtw_vectorizado import StreamingDTW, dtw_compare, point_distances
+from busqueda_fase import PhaseSearcher
+from almacen_landmarks import LandmarkStore
+from bosque_compilado import check_equivalence, is_forest, load_or_export, probe_samples
+from compuerta_movimiento import GateTotals, MotionGate
+from landmarks_compactos import ReferenceSequence, as_frame, flat_xyz, frame_from_results, to_lists
+print("[BOOT] ✓ Importaciones ligeras completadas")
 
 app = Flask(__name__)
-# Forzar modo threading para evitar dependencias async (aiohttp/asyncio) en Python 3.9
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
-
-# Cargar modelo y encoder con manejo de errores
-try:
-    print("[BOOT] Cargando modelo_posturas.pkl...")
-    modelo = joblib.load('modelo_posturas.pkl')
-    print("[BOOT] Cargando encoder.pkl...")
-    encoder = joblib.load('encoder.pkl')
+# Forzar modo threading para evitar dependencias async (aiohttp/asyncio) en Python 3.9.
+# Con varios procesos (servidor_produccion.py) los emits pasan por una cola de mensajes
+# (p. ej. redis://127.0.0.1:6379/0) para llegar a clientes conectados a otro worker.
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', message_queue=SOCKETIO_MESSAGE_QUEUE)
+
+# Arranque por etapas: el puerto se abre en cuanto Flask está importado y lo pesado
+# (OpenCV/MediaPipe, modelo, grafos Pose, inferencia de calentamiento) se prepara en segundo
+# plano. Hasta que termina, /api/ready responde 503 y las rutas de inferencia también.
+boot = BootSequence(t0=_BOOT_T0)
+boot.record('importaciones_flask', _BOOT_T0)
+
+# Se asignan en las etapas de arranque (ver `boot_stages` al final del archivo)
+cv2 = mp = joblib = requests = None
+modelo = encoder = compiled_forest = None
+extraction_pool = reference_cache = reference_indexes = reference_warmup = None
+mp_pose = tracking_pose_pool = static_pose_pool = None
+
+
+def import_heavy_modules():
+    """Etapa 'importaciones': OpenCV, MediaPipe y los módulos que dependen de ellos."""
+    global cv2, mp, joblib, requests
+    global ReferenceCache, ReferenceWarmup, ExtractionPool, ReferenceIndexStore
+    global PosePool, create_static_pose, create_tracking_pose
+    import cv2
+    print("[BOOT] ✓ OpenCV importado")
+    import mediapipe as mp
+    print("[BOOT] ✓ MediaPipe importado")
+    import joblib
+    import requests
+    from cache_referencias import ReferenceCache
+    from precalentamiento import ReferenceWarmup
+    from extraccion_paralela import ExtractionPool
+    from indice_referencia import ReferenceIndexStore
+    from pool_pose import PosePool, create_static_pose, create_tracking_pose
+
+
+# Con MODEL_MMAP=1 los arrays del modelo y del bosque compilado se abren mapeados desde disco
+# (joblib mmap_mode) y los procesos que comparten el archivo comparten sus páginas
+MODEL_MMAP = os.environ.get('MODEL_MMAP', '0') != '0'
+
+
+def load_model():
+    """Etapa 'modelo': modelo_posturas.pkl y encoder.pkl."""
+    global modelo, encoder
+    try:
+        print("[BOOT] Cargando modelo_posturas.pkl...")
+        loaded_model = joblib.load('modelo_posturas.pkl', mmap_mode='r' if MODEL_MMAP else None)
+        print("[BOOT] Cargando encoder.pkl...")
+        loaded_encoder = joblib.load('encoder.pkl')
+    except FileNotFoundError as e:
+        print(f"[BOOT][ERROR] No se encontró el archivo: {e.filename}")
+        print("Asegúrate de que modelo_posturas.pkl y encoder.pkl están en la carpeta 'modelo'")
+        raise
+    modelo, encoder = loaded_model, loaded_encoder
     print("[BOOT] ✓ Modelo y encoder cargados correctamente")
-except FileNotFoundError as e:
-    print(f"[BOOT][ERROR] No se encontró el archivo: {e.filename}")
-    print("Asegúrate de que modelo_posturas.pkl y encoder.pkl están en la carpeta 'modelo'")
-    exit(1)
-except Exception as e:
-    print(f"[BOOT][ERROR] Error al cargar modelo: {e}")
-    import traceback
-    traceback.print_exc()
-    exit(1)
 
 
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    min_detection_confidence=0.4,  # Reducido para detectar más movimientos
-    min_tracking_confidence=0.4     # Reducido para mejor seguimiento
-)
+# Bosque compilado en arrays planos (mismas predicciones que modelo.predict, sin el coste
+# de despacho de scikit-learn); si falla la carga o la comprobación se usa scikit-learn
+DATASET_PATH = 'dataset_posturas.lmk' if LandmarkStore.exists('dataset_posturas.lmk') else 'dataset_posturas.csv'
+COMPILED_FOREST_PATH = 'modelo_compilado.joblib' if MODEL_MMAP else 'modelo_compilado.npz'
+
+
+def load_compiled_forest():
+    """Etapa opcional 'bosque_compilado'."""
+    global compiled_forest
+    if os.environ.get('COMPILED_FOREST', '1') == '0' or not is_forest(modelo):
+        return
+    try:
+        forest = load_or_export(modelo, COMPILED_FOREST_PATH, model_path='modelo_posturas.pkl',
+                                mmap_mode='r' if MODEL_MMAP else None)
+        ok, total = check_equivalence(forest, modelo, probe_samples(forest.n_features, DATASET_PATH))
+    except Exception as e:
+        print(f"[BOOT][WARN] No se pudo compilar el bosque, se usa scikit-learn: {e}")
+        return
+    if ok == total:
+        compiled_forest = forest
+        print(f"[BOOT] ✓ Bosque compilado: {forest.n_trees} árboles, {forest.n_nodes} nodos "
+              f"({ok}/{total} predicciones idénticas)")
+    else:
+        print(f"[BOOT][WARN] Bosque compilado difiere de scikit-learn ({ok}/{total}); se usa scikit-learn")
+
+
+PARALLEL_EXTRACTION = os.environ.get('PARALLEL_EXTRACTION', '1') != '0'
+
+
+def extract_reference_parallel(video_path, target_fps=3, max_samples=600):
+    return extraction_pool.extract(video_path, target_fps=target_fps, max_samples=max_samples)
+
+
+# Pools de grafos Pose: tracking con afinidad por sesión de streaming y estáticos para trabajo puntual
+POSE_POOL_SIZE = int(os.environ.get('POSE_POOL_SIZE', 0)) or (os.cpu_count() or 2)
+# Grafos de cada pool que se crean y calientan durante el arranque (el resto, bajo demanda)
+POSE_WARM_GRAPHS = max(0, min(POSE_POOL_SIZE, int(os.environ.get('POSE_WARM_GRAPHS', 1))))
+
+
+def create_services():
+    """Etapa 'servicios': pool de extracción, cachés de referencias y pools de grafos Pose."""
+    global extraction_pool, reference_cache, reference_indexes, reference_warmup
+    global mp_pose, tracking_pose_pool, static_pose_pool, posture_batcher
+    # Pool de procesos para extraer referencias repartiendo el video entre núcleos
+    extraction_pool = ExtractionPool(workers=int(os.environ.get('EXTRACTION_WORKERS', 0)) or None)
+    # Caché de secuencias de referencia (memoria LRU + disco en cache_landmarks/)
+    if PARALLEL_EXTRACTION:
+        reference_cache = ReferenceCache(max_memory_entries=int(os.environ.get('REFERENCE_CACHE_ENTRIES', 32)),
+                                         extractor=extract_reference_parallel)
+    else:
+        reference_cache = ReferenceCache(max_memory_entries=int(os.environ.get('REFERENCE_CACHE_ENTRIES', 32)))
+    # Índices tiempo -> landmarks para evaluate_frame sin secuencia cargada
+    reference_indexes = ReferenceIndexStore(reference_cache, target_fps=3)
+    # Precalentamiento de todas las referencias del dataset (se lanza al quedar listo el servidor)
+    reference_warmup = ReferenceWarmup(reference_cache, dataset_dir='dataset', target_fps=3, pool=extraction_pool)
+    mp_pose = mp.solutions.pose
+    tracking_pose_pool = PosePool(create_tracking_pose, size=POSE_POOL_SIZE, name='tracking')
+    static_pose_pool = PosePool(create_static_pose, size=POSE_POOL_SIZE, name='estatico')
+    # El hilo del micro-lote se crea aquí y no al importar: en el servidor pre-fork esta etapa
+    # ya corre dentro de cada worker (los hilos no sobreviven al fork)
+    if MICRO_BATCH:
+        posture_batcher = MicroBatcher(predict_postures,
+                                       max_batch=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 32)),
+                                       max_wait_ms=float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 3)))
+
+
+def predict_postures(X):
+    """Predicción vectorizada: matriz (n, 99) -> etiquetas de condición."""
+    if compiled_forest is not None:
+        return encoder.inverse_transform(compiled_forest.predict(X))
+    return encoder.inverse_transform(modelo.predict(X))
+
+
+# Micro-lotes: agrupa las predicciones de peticiones concurrentes en un solo predict
+# (se crea en la etapa de arranque 'servicios')
+MICRO_BATCH = os.environ.get('MICRO_BATCH', '1') != '0'
+posture_batcher = None
+
+
+def predict_posture(landmarks):
+    """Etiqueta para un vector de landmarks, vía micro-lotes si están activos."""
+    if posture_batcher is not None:
+        return posture_batcher.predict(landmarks)
+    return predict_postures([landmarks])[0]
+
+
+# Compuerta de movimiento: reutiliza la última predicción mientras el paciente está quieto
+# y estabiliza la etiqueta por votación (una compuerta por sesión)
+MOTION_GATE = os.environ.get('MOTION_GATE', '1') != '0'
+gate_totals = GateTotals()
+
+
+def make_motion_gate():
+    return MotionGate(epsilon=float(os.environ.get('MOTION_EPSILON', 0.02)),
+                      max_skip=int(os.environ.get('MOTION_MAX_SKIP', 10)),
+                      max_age=float(os.environ.get('MOTION_MAX_AGE', 1.0)),
+                      vote_window=int(os.environ.get('LABEL_VOTE_WINDOW', 5)),
+                      totals=gate_totals)
+
+
+def predict_landmarks(landmarks, gate=None):
+    """Etiqueta para un frame (33, 4), a través de la compuerta de movimiento si se da una."""
+    def predict(lms):
+        try:
+            return predict_posture(flat_xyz(lms))
+        except Exception:
+            return None
+    if gate is not None:
+        return gate.classify(landmarks, predict)
+    return predict(landmarks)
+
+
+def release_session_resources(session, reason):
+    """Al cerrar/desalojar una sesión se descarta su grafo tracking (no se hereda su estado)."""
+    with session.pose_lock:
+        graph, session.pose_graph = session.pose_graph, None
+    if graph is not None:
+        tracking_pose_pool.discard(graph)
 
 
 thread_lock = Lock()
 thread = None
-current_reference_landmarks = None  # Landmarks de la imagen de referencia (single)
-current_reference_sequence = []    # Lista de landmarks por frame del video de referencia
-reference_fps = 1                  # FPS de la secuencia de referencia (frames por segundo)
-current_reference_index = 0        # Índice de frame de referencia sincronizado desde cliente
-user_landmarks_buffer = []         # Buffer corto de landmarks del usuario para suavizar ruido
-current_tolerance = 1.0            # Factor de tolerancia: >1 más permisivo, <1 más estricto
-recent_user_landmarks_buffer = []  # Buffer corto usado por el endpoint HTTP evaluate_frame
+# Estado de evaluación por cliente (referencia, índice, tolerancia, buffers de suavizado)
+sessions = SessionRegistry(max_sessions=int(os.environ.get('MAX_SESSIONS', 64)),
+                           idle_timeout=float(os.environ.get('SESSION_IDLE_TIMEOUT', 900)),
+                           on_evict=release_session_resources,
+                           alignment=os.environ.get('ALIGNMENT_MODE', 'sync'),
+                           smoothing=os.environ.get('SMOOTHING_FILTER', 'one_euro'),
+                           gate_factory=make_motion_gate if MOTION_GATE else None)
+
+
+# Grafos tracking: solo para sesiones de streaming y liberados tras POSE_LEASE_IDLE s sin frames
+POSE_LEASE_IDLE = float(os.environ.get('POSE_LEASE_IDLE', 10))
+lease_totals = LeaseTotals(POSE_LEASE_IDLE)
+
+
+def is_streaming_session(session):
+    """Conexiones Socket.IO (canal 'stream_frame' incluido) y clientes HTTP con id propio.
+    Los clientes agrupados por IP pueden ser varios dispositivos: no alquilan grafo tracking."""
+    return session.is_socket or not str(session.session_id).startswith('ip:')
+
+
+def reclaim_idle_pose_graphs():
+    """Descarta los grafos tracking de las sesiones sin frames desde hace POSE_LEASE_IDLE s."""
+    now = time.time()
+    for other in sessions.values():
+        if other.pose_graph is None or now - other.pose_last_used < POSE_LEASE_IDLE:
+            continue
+        if not other.pose_lock.acquire(blocking=False):
+            continue  # procesando un frame ahora mismo
+        try:
+            graph = None
+            if other.pose_graph is not None and now - other.pose_last_used >= POSE_LEASE_IDLE:
+                graph, other.pose_graph = other.pose_graph, None
+        finally:
+            other.pose_lock.release()
+        if graph is not None:
+            tracking_pose_pool.discard(graph)
+            lease_totals.add(reclaimed=1)
+
+
+@contextmanager
+def session_pose(session):
+    """Grafo tracking alquilado en exclusiva por una sesión de streaming. Las llamadas
+    sueltas, y las sesiones que no encuentran grafo libre aun liberando los inactivos, usan
+    un grafo estático del pool solo para esta llamada."""
+    if is_streaming_session(session):
+        with session.pose_lock:
+            if session.pose_graph is None:
+                reclaim_idle_pose_graphs()
+                session.pose_graph = tracking_pose_pool.try_acquire()
+                if session.pose_graph is not None:
+                    lease_totals.add(leases=1)
+                else:
+                    lease_totals.add(exhausted=1)
+            if session.pose_graph is not None:
+                try:
+                    yield session.pose_graph
+                finally:
+                    session.pose_last_used = time.time()
+                return
+    else:
+        lease_totals.add(one_off=1)
+    with static_pose_pool.checkout() as graph:
+        yield graph
+
+
+def get_http_session():
+    """Sesión del cliente HTTP: cabecera X-Session-Id (la app móvil envía un id por instalación),
+    campo 'session_id' (JSON, formulario o query) o, solo para clientes antiguos que no envían
+    nada, su dirección IP."""
+    session_id = request.headers.get('X-Session-Id') or request.args.get('session_id')
+    if not session_id and request.mimetype == 'multipart/form-data':
+        session_id = request.form.get('session_id')
+    if not session_id:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            session_id = payload.get('session_id')
+    if not session_id:
+        session_id = f"ip:{request.remote_addr}"
+    return sessions.get(str(session_id))
+
+
+def get_socket_session():
+    """Sesión del cliente Socket.IO actual (una por conexión)."""
+    return sessions.get(request.sid)
+
+
+# Frames subidos: JSON con base64 (formato original), cuerpo binario image/jpeg o multipart.
+# Los dos últimos se decodifican desde los bytes recibidos sin pasar por base64 ni str.
+BINARY_IMAGE_TYPES = ('image/jpeg', 'image/jpg', 'image/png', 'image/webp', 'application/octet-stream')
+UPLOAD_CHUNK = 64 * 1024
+
+
+def upload_kind():
+    """'binary', 'multipart' o 'json' según el Content-Type de la petición."""
+    if request.mimetype in BINARY_IMAGE_TYPES:
+        return 'binary'
+    if request.mimetype == 'multipart/form-data':
+        return 'multipart'
+    return 'json'
+
+
+def read_body_buffer():
+    """Lee el cuerpo de la petición en un bytearray preasignado con Content-Length
+    (readinto sobre el stream) y devuelve una vista de los bytes leídos."""
+    length = request.content_length
+    if not length:
+        # Sin Content-Length (chunked): leer de una vez sin cachear en la petición
+        return memoryview(request.get_data(cache=False))
+    stream = request.stream
+    buf = bytearray(length)
+    view = memoryview(buf)
+    pos = 0
+    readinto = getattr(stream, 'readinto', None)
+    while pos < length:
+        end = min(length, pos + UPLOAD_CHUNK)
+        if readinto is not None:
+            n = readinto(view[pos:end])
+        else:
+            chunk = stream.read(end - pos)
+            n = len(chunk)
+            view[pos:pos + n] = chunk
+        if not n:
+            break
+        pos += n
+    return view[:pos]
+
+
+def decode_image_bytes(data):
+    """bytes/bytearray/memoryview de un JPEG/PNG -> frame BGR (o None)."""
+    if data is None or len(data) == 0:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def decode_image_b64(img_b64):
+    """Data URI o base64 plano -> frame BGR (o None)."""
+    if not img_b64:
+        return None
+    # Soporta data URI o solo base64
+    if ',' in img_b64:
+        img_b64 = img_b64.split(',', 1)[1]
+    return decode_image_bytes(base64.b64decode(img_b64))
+
+
+def decode_upload(storage):
+    """Archivo de un multipart (FileStorage) -> frame BGR. Si werkzeug lo guardó en
+    memoria (BytesIO) se decodifica sobre su buffer sin copiarlo."""
+    stream = storage.stream
+    getbuffer = getattr(stream, 'getbuffer', None)
+    if getbuffer is not None:
+        return decode_image_bytes(getbuffer())
+    stream.seek(0)
+    return decode_image_bytes(stream.read())
+
+
+def upload_metadata(kind):
+    """Campos que acompañan a la imagen. En JSON es el propio payload; en multipart los
+    campos del formulario y en cuerpo binario los parámetros de la query. 'reference_video'
+    puede llegar como JSON (campo o cabecera X-Reference-Video) o como campos sueltos
+    condition / video_name / current_time."""
+    if kind == 'json':
+        payload = request.get_json(silent=True)
+        return payload if isinstance(payload, dict) else None
+    fields = request.values if kind == 'multipart' else request.args
+    meta = fields.to_dict()
+    ref = fields.get('reference_video') or request.headers.get('X-Reference-Video')
+    meta.pop('reference_video', None)
+    if ref:
+        try:
+            meta['reference_video'] = json.loads(ref)
+        except ValueError:
+            print(f"reference_video inválido en la petición: {ref[:80]}")
+    elif fields.get('video_name'):
+        meta['reference_video'] = {'condition': fields.get('condition'),
+                                   'video_name': fields.get('video_name'),
+                                   'current_time': fields.get('current_time', 0)}
+    return meta
+
+
+def read_request_frame():
+    """Frame de /api/evaluate_frame en cualquiera de los tres formatos.
+    Retorna (frame, metadatos, mensaje_error)."""
+    kind = upload_kind()
+    if kind == 'binary':
+        meta = upload_metadata(kind)
+        frame = decode_image_bytes(read_body_buffer())
+    elif kind == 'multipart':
+        meta = upload_metadata(kind)
+        storage = request.files.get('image') or request.files.get('frame')
+        if storage is None:
+            return None, meta, 'No image provided'
+        frame = decode_upload(storage)
+    else:
+        meta = upload_metadata(kind)
+        if not meta:
+            return None, None, 'No JSON payload'
+        if not meta.get('image'):
+            return None, meta, 'No image provided'
+        frame = decode_image_b64(meta.get('image'))
+    if frame is None:
+        return None, meta, 'Invalid image data'
+    return frame, meta, None
+
+
+def iter_request_frames():
+    """Frames de /api/process_video_frames: lista base64 en JSON, archivos 'frames' de un
+    multipart o una sola imagen binaria. Devuelve (generador de frames, metadatos, error);
+    cada frame se decodifica al consumirlo y los inválidos se omiten."""
+    kind = upload_kind()
+    meta = upload_metadata(kind)
+    if kind == 'binary':
+        sources, decode = [read_body_buffer()], decode_image_bytes
+    elif kind == 'multipart':
+        sources, decode = request.files.getlist('frames'), decode_upload
+    else:
+        if not meta:
+            return None, None, 'No JSON payload'
+        sources, decode = meta.get('frames', []), decode_image_b64
+    if not sources:
+        return None, meta, 'No frames provided'
+
+    def frames():
+        for source in sources:
+            try:
+                frame = decode(source)
+            except Exception as e:
+                print(f"Error procesando frame: {e}")
+                continue
+            if frame is not None:
+                yield frame
+    return frames(), meta, None
 
 # Integración opcional con Groq para decisión final basada en métricas
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
@@ -105,33 +488,27 @@ def groq_assess_movement(metrics: dict, default_feedback: str, default_reason: s
 # 'hernia de disco lumbar', 'espondilolisis', 'escoliosis lumbar', etc.).
 
 
-def evaluate_posture(landmarks, posture_label, reference_landmarks=None, tolerance_scale=1.0):
+def evaluate_posture(landmarks, posture_label, reference_landmarks=None, tolerance_scale=1.0,
+                     user_sequence=None, reference_index=0, sequence_metrics=None):
     """Evaluación mejorada que devuelve 'Bien' o 'Mal' y una breve sugerencia.
     
     Utiliza umbrales CALIBRADOS basados en análisis de videos reales.
     Si se proporciona reference_landmarks, se compara con precisión basada en distancias de landmarks.
     Si no, usa heurísticas especializadas por enfermedad.
+    `landmarks` es el frame (33, 4) del usuario (o su lista plana [x,y,z,...]) y
+    `reference_landmarks` un frame, una ReferenceSequence o una lista de frames.
+    `user_sequence` es el buffer corto de landmarks recientes del cliente y `reference_index`
+    su índice sincronizado en la secuencia de referencia. `sequence_metrics` son las
+    (avg, max) ya calculadas por el DTW en línea de la sesión; si se pasan, no se recalcula
+    el DTW sobre la ventana.
     """
-    if not landmarks or not posture_label:
+    if landmarks is None or len(landmarks) == 0 or not posture_label:
         return 'Sin evaluación', 'No hay datos suficientes', {'avg_distance': None, 'max_distance': None}
 
-    # Exponer el buffer global localmente para permitir comparaciones temporales
-    global recent_user_landmarks_buffer, current_reference_index
-
-    # Convertir la lista plana a pares (x,y,z) por punto
-    pts = [(landmarks[i], landmarks[i+1], landmarks[i+2]) for i in range(0, len(landmarks), 3)]
-
-    # Helpers: normalizar y alineamiento por similitud (Umeyama) para robustez
-    def to_xy_array(pts_list):
-        arr = np.array(pts_list)
-        if arr.ndim == 2 and arr.shape[1] >= 2:
-            return arr[:, :2]
-        # si está plano [x,y,z,...], convertir
-        if arr.ndim == 1:
-            arr = arr.reshape((-1, 3))
-            return arr[:, :2]
-        return arr
+    # Vista (33, 3) x,y,z del frame compacto (sin reconstruir tuplas)
+    pts = as_frame(landmarks)[:, :3]
 
+    # Helper: normalizar por pelvis/torso para las heurísticas sin referencia
     def normalize_by_pelvis(pts_list):
         try:
             arr = np.array(pts_list)
@@ -154,108 +531,6 @@ def evaluate_posture(landmarks, posture_label, reference_landmarks=None, toleran
         except Exception:
             return np.array(pts_list)
 
-    def umeyama_similarity(src, dst, eps=1e-8):
-        """Estimate similarity transform (s,R,t) that maps src -> dst using Umeyama method (2D).
-        Devuelve (s, R, t) donde R es 2x2, t es 2-vector."""
-        src = np.array(src, dtype=float)
-        dst = np.array(dst, dtype=float)
-        if src.shape != dst.shape or src.ndim != 2 or src.shape[1] != 2:
-            raise ValueError('src/dst must be Nx2 arrays')
-
-        n = src.shape[0]
-        mu_src = src.mean(axis=0)
-        mu_dst = dst.mean(axis=0)
-        src_c = src - mu_src
-        dst_c = dst - mu_dst
-
-        var_src = (src_c**2).sum() / n
-        cov = (dst_c.T @ src_c) / n
-
-        U, D, Vt = np.linalg.svd(cov)
-        S = np.eye(2)
-        if np.linalg.det(U) * np.linalg.det(Vt) < 0:
-            S[-1, -1] = -1
-        R = U @ S @ Vt
-        scale = 1.0
-        if var_src > eps:
-            scale = np.trace(D @ S) / var_src if D.ndim == 1 else np.trace(np.diag(D) @ S) / var_src
-        t = mu_dst - scale * (R @ mu_src)
-        return scale, R, t
-
-    def align_and_compute_distances(user_pts, ref_pts):
-        # user_pts and ref_pts are lists/arrays of (x,y,...) - usar solo XY
-        u_xy = to_xy_array(user_pts)
-        r_xy = to_xy_array(ref_pts)
-        if u_xy.shape[0] != r_xy.shape[0]:
-            # si longitud diferente, truncar al mínimo
-            m = min(u_xy.shape[0], r_xy.shape[0])
-            u_xy = u_xy[:m]
-            r_xy = r_xy[:m]
-        try:
-            s, R, t = umeyama_similarity(u_xy, r_xy)
-            u_aligned = (s * (R @ u_xy.T)).T + t
-        except Exception:
-            # fallback: centrar y escalar por torso
-            u_norm = normalize_by_pelvis(user_pts)
-            r_norm = normalize_by_pelvis(ref_pts)
-            u_aligned = to_xy_array(u_norm)
-            r_xy = to_xy_array(r_norm)
-
-        # distancias euclidianas entre u_aligned y r_xy
-        diffs = u_aligned - r_xy
-        dists = np.linalg.norm(diffs, axis=1)
-        return dists
-
-    # DTW helper: compara dos secuencias de frames usando la distancia por frame
-    def dtw_distance(seq_a, seq_b, frame_distance_fn):
-        """Computa la distancia DTW entre dos secuencias donde frame_distance_fn(a,b) devuelve un escalar.
-        Devuelve (avg_distance, max_distance, path_len, total_cost).
-        """
-        a = list(seq_a)
-        b = list(seq_b)
-        na = len(a)
-        nb = len(b)
-        if na == 0 or nb == 0:
-            return None, None, 0, float('inf')
-
-        # construir matriz DTW
-        dtw = np.full((na+1, nb+1), np.inf)
-        dtw[0,0] = 0.0
-
-        # precomputar distancias entre frames
-        fd = np.zeros((na, nb), dtype=float)
-        for i in range(na):
-            for j in range(nb):
-                try:
-                    fd[i,j] = float(frame_distance_fn(a[i], b[j]))
-                except Exception:
-                    fd[i,j] = float('inf')
-
-        for i in range(1, na+1):
-            for j in range(1, nb+1):
-                cost = fd[i-1, j-1]
-                dtw[i,j] = cost + min(dtw[i-1,j], dtw[i,j-1], dtw[i-1,j-1])
-
-        # reconstruir la ruta (camino) para obtener longitudes/costes por paso
-        i = na
-        j = nb
-        path = []
-        while i > 0 and j > 0:
-            path.append((i-1,j-1))
-            choices = [(dtw[i-1,j-1], i-1, j-1), (dtw[i-1,j], i-1, j), (dtw[i,j-1], i, j-1)]
-            best = min(choices, key=lambda x: x[0])
-            i,j = best[1], best[2]
-        path.reverse()
-
-        if not path:
-            return None, None, 0, float('inf')
-
-        costs = [fd[p] for p in path]
-        avg = float(np.mean(costs))
-        mx = float(np.max(costs))
-        total_cost = float(dtw[na, nb])
-        return avg, mx, len(path), total_cost
-
     # Índices comunes en MediaPipe Pose
     LEFT_SHOULDER = 11
     RIGHT_SHOULDER = 12
@@ -290,41 +565,39 @@ def evaluate_posture(landmarks, posture_label, reference_landmarks=None, toleran
         avg_distance = None
         max_distance = None
         # Diferenciar entre referencia como UN frame (lista plana) o como SECUENCIA de frames
-        if reference_landmarks:
-            # Secuencia de frames (lista-de-listas)
-            if isinstance(reference_landmarks, list) and len(reference_landmarks) > 0 and isinstance(reference_landmarks[0], list):
+        if reference_landmarks is not None and len(reference_landmarks) > 0:
+            # Secuencia de frames (ReferenceSequence o lista-de-listas)
+            is_sequence = isinstance(reference_landmarks, ReferenceSequence) or (
+                isinstance(reference_landmarks, list) and isinstance(reference_landmarks[0], (list, np.ndarray)))
+            if is_sequence:
                 ref_seq = reference_landmarks
-                # Obtener ventana de referencia centrada en current_reference_index si es posible
+                if not isinstance(ref_seq, ReferenceSequence):
+                    ref_seq = ReferenceSequence(ref_seq)
+                # Obtener ventana de referencia centrada en reference_index si es posible
                 try:
-                    global current_reference_index
-                    idx = int(current_reference_index) if isinstance(current_reference_index, int) else 0
+                    idx = int(reference_index) if isinstance(reference_index, int) else 0
                 except Exception:
                     idx = 0
 
                 # Obtener la secuencia de usuario (preferir buffer suavizado si existe)
                 try:
-                    user_seq = list(recent_user_landmarks_buffer) if recent_user_landmarks_buffer else [landmarks]
+                    user_seq = user_sequence if user_sequence is not None and len(user_sequence) else [landmarks]
                 except Exception:
                     user_seq = [landmarks]
 
-                # Ventana en referencia: ancho relativo a usuario (ej. 3x longitud de usuario, mínimo 4)
-                m = max(1, len(user_seq))
-                win = min(len(ref_seq), max(4, 3 * m))
-                start = max(0, idx - win // 2)
-                end = min(len(ref_seq), start + win)
-                ref_window = ref_seq[start:end]
-
-                # función que calcula distancia entre dos frames (media de distancias entre puntos tras alinear)
-                def frame_dist(a_frame, b_frame):
-                    try:
-                        d = align_and_compute_distances(a_frame, b_frame)
-                        if len(d) == 0:
-                            return float('inf')
-                        return float(np.mean(d))
-                    except Exception:
-                        return float('inf')
-
-                avg_distance, max_distance, path_len, total_cost = dtw_distance(user_seq, ref_window, frame_dist)
+                if sequence_metrics is not None:
+                    # DTW en línea de la sesión: ya extendido con el frame actual
+                    avg_distance, max_distance = sequence_metrics[0], sequence_metrics[1]
+                else:
+                    # Ventana en referencia: ancho relativo a usuario (ej. 3x longitud de usuario, mínimo 4)
+                    m = max(1, len(user_seq))
+                    win = min(len(ref_seq), max(4, 3 * m))
+                    start = max(0, idx - win // 2)
+                    end = min(len(ref_seq), start + win)
+                    ref_window = ref_seq[start:end]
+
+                    # DTW vectorizado: distancia por frame = media de distancias entre puntos normalizados por el torso
+                    avg_distance, max_distance, path_len, total_cost = dtw_compare(user_seq, ref_window)
 
                 # Umbrales término medio: balance entre sensibilidad y precisión
                 t = float(tolerance_scale)
@@ -346,45 +619,26 @@ def evaluate_posture(landmarks, posture_label, reference_landmarks=None, toleran
                 else:
                     feedback = 'Sin evaluación'
                     reason = 'No se pudo comparar con la referencia (DTW)'
-            # Caso referencia como un único frame (lista plana)
-            elif isinstance(reference_landmarks, list) and len(reference_landmarks) >= 10:
-                ref_pts = [(reference_landmarks[i], reference_landmarks[i+1], reference_landmarks[i+2]) 
-                           for i in range(0, len(reference_landmarks), 3)]
+            # Caso referencia como un único frame (array (33, 4) o lista plana)
+            elif len(reference_landmarks) >= 10:
+                ref_pts = as_frame(reference_landmarks)[:, :3]
 
                 # Intentar suavizar landmarks del usuario si están en buffer (reduce ruido)
                 try:
-                    # usar buffer global si existe (para llamadas HTTP rápidas)
-                    if recent_user_landmarks_buffer:
+                    # usar buffer del cliente si existe (para llamadas HTTP rápidas)
+                    if user_sequence is not None and len(user_sequence):
                         # promediar elemento a elemento
-                        arr = np.array(recent_user_landmarks_buffer)
-                        avg_land = list(np.mean(arr, axis=0))
-                        user_pts = [(avg_land[i], avg_land[i+1], avg_land[i+2]) for i in range(0, len(avg_land), 3)]
+                        user_pts = np.mean([as_frame(f) for f in user_sequence], axis=0)[:, :3]
                     else:
                         user_pts = pts
                 except Exception:
                     user_pts = pts
 
-                # Calcular distancias tras alinear por similitud (Umeyama)
-                try:
-                    dists = align_and_compute_distances(user_pts, ref_pts)
+                # Distancias punto a punto normalizadas por el torso (mismas unidades que el DTW)
+                dists = point_distances(user_pts, ref_pts)
+                if np.isfinite(dists).all():
                     avg_distance = float(np.mean(dists))
                     max_distance = float(np.max(dists))
-                except Exception:
-                    # fallback a comparación simple normalizada
-                    norm_user = normalize_by_pelvis(user_pts)
-                    norm_ref = normalize_by_pelvis(ref_pts)
-                    d = []
-                    for i in range(min(len(norm_user), len(norm_ref))):
-                        p = norm_user[i]
-                        rp = norm_ref[i]
-                        dist = np.linalg.norm(p[:2] - rp[:2])
-                        d.append(dist)
-                    if d:
-                        avg_distance = float(np.mean(d))
-                        max_distance = float(np.max(d))
-                    else:
-                        avg_distance = None
-                        max_distance = None
 
                 # Umbrales término medio para postura por frame
                 t = float(tolerance_scale)
@@ -459,21 +713,20 @@ def evaluate_posture(landmarks, posture_label, reference_landmarks=None, toleran
     return feedback, reason, {'avg_distance': float(avg_distance) if avg_distance is not None else None,
                               'max_distance': float(max_distance) if max_distance is not None else None}
 
-def classify_posture(frame):
+def classify_posture(frame, pose_graph, gate=None):
+    """Detecta la pose en `frame` (BGR), dibuja el esqueleto y clasifica los landmarks
+    (con la compuerta de movimiento `gate` de la sesión si se da). Devuelve
+    (frame, postura, landmarks (33, 4)) o (frame, None, None)."""
     image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(image)
+    results = pose_graph.process(image)
 
     if results.pose_landmarks:
-        # Extraer landmarks en forma plana [x,y,z,...] - siempre usar todos
+        # Volcar los landmarks en un array (33, 4) x,y,z,visibility - siempre usar todos
         # (filtrado de visibilidad era demasiado agresivo y rechazaba frames válidos)
-        landmarks = [coord for landmark in results.pose_landmarks.landmark
-                     for coord in [landmark.x, landmark.y, landmark.z]]
+        landmarks = frame_from_results(results.pose_landmarks)
 
-        # Predecir postura
-        try:
-            posture = encoder.inverse_transform(modelo.predict([landmarks]))[0]
-        except Exception:
-            posture = None
+        # Predecir postura (el modelo usa el vector plano x,y,z)
+        posture = predict_landmarks(landmarks, gate)
 
         # Dibujar landmarks en el frame
         mp.solutions.drawing_utils.draw_landmarks(
@@ -483,71 +736,201 @@ def classify_posture(frame):
 
     return frame, None, None
 
-def video_stream():
-    global current_reference_landmarks
-    global current_reference_sequence, current_reference_index, user_landmarks_buffer
-    cap = cv2.VideoCapture(0)
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        frame, posture, landmarks = classify_posture(frame)
+# DTW en línea por sesión: extiende la alineación con cada frame en vez de recalcular la ventana
+ONLINE_DTW = os.environ.get('ONLINE_DTW', '1') != '0'
 
-        # Tratar la etiqueta del modelo como la condición médica
-        condition = posture if posture else 'No detectada'
 
-        # Suavizar landmarks del usuario (promedio último par de frames) para reducir ruido
-        if landmarks:
-            user_landmarks_buffer.append(landmarks)
-            # mantener buffer corto
-            if len(user_landmarks_buffer) > 3:
-                user_landmarks_buffer.pop(0)
-            # promediar elemento a elemento
-            avg_landmarks = None
+def push_online_dtw(session, attr, landmarks):
+    """Extiende el DTW en línea de la sesión ('stream_dtw' o 'http_dtw') con un frame y
+    devuelve sus métricas (avg, max, path_len, total_cost, ref_position), o None si falla.
+    Llamar con session.lock tomado."""
+    try:
+        dtw = getattr(session, attr)
+        if dtw is None:
+            dtw = StreamingDTW(session.reference_sequence, window=max(4, 3 * session.buffer_size),
+                               horizon=session.buffer_size)
+            setattr(session, attr, dtw)
+        return dtw.push(landmarks, center=session.reference_index)
+    except Exception as e:
+        print(f"[DTW] Error en DTW en línea de {session.session_id}: {e}")
+        return None
+
+
+# Modo 'auto': fase de la referencia buscada con LB_Keogh + DTW con banda Sakoe-Chiba
+PHASE_BAND = int(os.environ.get('PHASE_BAND', 2))
+
+
+def estimate_phase(session, user_seq):
+    """En modo 'auto' actualiza reference_index con la fase de la referencia que mejor encaja
+    con el buffer reciente del usuario. Llamar con session.lock tomado."""
+    if session.alignment != 'auto' or not session.reference_sequence or len(user_seq) < 2:
+        return
+    try:
+        if session.phase_searcher is None:
+            session.phase_searcher = PhaseSearcher(session.reference_sequence, band=PHASE_BAND)
+        idx, _ = session.phase_searcher.search(user_seq)
+        if idx is not None:
+            session.reference_index = idx
+    except Exception as e:
+        print(f"[FASE] Error buscando fase de {session.session_id}: {e}")
+
+
+def evaluate_stream_for_session(session, landmarks, posture):
+    """Evalúa el frame del stream contra la referencia de una sesión Socket.IO."""
+    with session.lock:
+        # Suavizar landmarks del usuario (filtro por articulación + media del buffer circular)
+        filtered = None
+        avg_landmarks = None
+        if landmarks is not None:
             try:
-                arr = np.array(user_landmarks_buffer)
-                avg_landmarks = list(np.mean(arr, axis=0))
-            except Exception:
-                avg_landmarks = landmarks
-        else:
-            avg_landmarks = None
+                filtered = session.push_stream_landmarks(landmarks)
+                avg_landmarks = session.stream_smoother.mean()
+            except Exception as e:
+                print(f"[SUAVIZADO] Error en el buffer de {session.session_id}: {e}")
+                filtered = avg_landmarks = landmarks
 
-        # Seleccionar landmarks de referencia sincronizados si existe una secuencia
-        ref_landmarks_to_use = None
-        if current_reference_sequence:
-            idx = min(max(0, current_reference_index), len(current_reference_sequence)-1)
-            ref_landmarks_to_use = current_reference_sequence[idx]
-        elif current_reference_landmarks:
-            ref_landmarks_to_use = current_reference_landmarks
+        user_seq = session.stream_smoother.window()
+        estimate_phase(session, user_seq)
+        dtw_metrics = None
+        if ONLINE_DTW and session.reference_sequence and filtered is not None:
+            dtw_metrics = push_online_dtw(session, 'stream_dtw', filtered)
 
         # Evaluar feedback (Bien/Mal + razón) usando landmarks de referencia sincronizados si están disponibles
         # Si tenemos una secuencia de referencia y un buffer del usuario (streaming), privilegimos comparación temporal (DTW)
-        if current_reference_sequence and len(user_landmarks_buffer) > 1:
-            try:
-                # sincronizar el buffer corto del stream en el buffer global usado por evaluate_posture
-                global recent_user_landmarks_buffer
-                recent_user_landmarks_buffer = list(user_landmarks_buffer)
-            except Exception:
-                pass
-            feedback_label, feedback_reason, metrics = evaluate_posture(avg_landmarks, posture, current_reference_sequence, tolerance_scale=current_tolerance)
-        else:
-            feedback_label, feedback_reason, metrics = evaluate_posture(avg_landmarks, posture, ref_landmarks_to_use, tolerance_scale=current_tolerance)
+        return evaluate_posture(avg_landmarks, posture, session.evaluation_reference(user_seq),
+                                tolerance_scale=session.tolerance, user_sequence=user_seq,
+                                reference_index=session.reference_index, sequence_metrics=dtw_metrics)
+
+
+# Cámara local del servidor difundida por 'video_feed' (desactivada en el servidor pre-fork
+# salvo que se pida: cada worker abriría su propia cámara)
+LOCAL_CAMERA = os.environ.get('LOCAL_CAMERA', '1') != '0'
+STREAM_POSE_TIMEOUT = float(os.environ.get('STREAM_POSE_TIMEOUT', 5))  # espera máx. por un grafo del pool
+video_pipeline = None
 
-        _, buffer = cv2.imencode('.jpg', frame)
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
 
+def move_video_room(client_id, old_room, new_room):
+    if old_room:
+        socketio.server.leave_room(client_id, old_room, namespace='/')
+    if new_room:
+        socketio.server.enter_room(client_id, new_room, namespace='/')
+
+
+# Suscripciones a 'video_feed' por cliente: modo (full / downscaled / landmarks) y escalón de
+# calidad JPEG y fps ajustado con la latencia de 'video_ack'; una sala de Socket.IO por (modo, escalón)
+video_subscriptions = VideoSubscriptions(on_room_change=move_video_room,
+                                         high_ms=float(os.environ.get('VIDEO_ACK_HIGH_MS', 250)),
+                                         low_ms=float(os.environ.get('VIDEO_ACK_LOW_MS', 100)),
+                                         downscaled_width=int(os.environ.get('VIDEO_DOWNSCALED_WIDTH', 400)))
+
+
+def encode_data_uri(image, quality):
+    """Frame BGR -> data URI JPEG con la calidad dada."""
+    t0 = time.perf_counter()
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    video_subscriptions.record_encode(time.perf_counter() - t0)
+    return f"data:image/jpeg;base64,{base64.b64encode(buffer).decode('ascii')}"
+
+
+def downscale(frame):
+    width = video_subscriptions.downscaled_width
+    h, w = frame.shape[:2]
+    if w <= width:
+        return frame
+    return cv2.resize(frame, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+
+
+def video_stream():
+    """Hilo de la cámara local. Al terminar (cámara no disponible o sin más frames) deja
+    `thread` a None para que la siguiente conexión vuelva a intentarlo."""
+    global thread
+    try:
+        run_video_stream()
+    finally:
         with thread_lock:
-            socketio.emit('video_feed', {
-                'image': f"data:image/jpeg;base64,{frame_base64}",
-                'posture': posture or "No detectado",
-                'condition': condition,
-                'feedback': feedback_label,
-                'reason': feedback_reason,
-                'metrics': metrics
-            })
-    
-    cap.release()
+            thread = None
+
+
+def run_video_stream():
+    global video_pipeline
+    # La cámara y los grafos Pose están disponibles cuando termina el arranque
+    if not boot.wait():
+        print("[STREAM] El arranque falló; no se abre la cámara")
+        return
+    cap = cv2.VideoCapture(0)
+    if not cap.isOpened():
+        print("[STREAM] No se pudo abrir la cámara local")
+        cap.release()
+        return
+    # La cámara local es un único flujo continuo: alquila un grafo tracking durante todo el bucle
+    # (solo lo usa el hilo de inferencia). Si las sesiones de streaming ocupan el pool, usa un
+    # grafo propio en lugar de esperar indefinidamente
+    stream_pose = tracking_pose_pool.acquire(timeout=STREAM_POSE_TIMEOUT)
+    dedicated_pose = stream_pose is None
+    if dedicated_pose:
+        print(f"[STREAM] Pool tracking ocupado tras {STREAM_POSE_TIMEOUT}s; la cámara usa un grafo propio")
+        stream_pose = create_tracking_pose()
+    stream_gate = make_motion_gate() if MOTION_GATE else None
+
+    def capture():
+        ret, frame = cap.read()
+        return frame if ret else None
+
+    def infer(frame):
+        frame, posture, landmarks = classify_posture(frame, stream_pose, stream_gate)
+        # Cada cliente suscrito al video recibe el feedback calculado con su propia referencia
+        evaluations = {session.session_id: evaluate_stream_for_session(session, landmarks, posture)
+                       for session in sessions.socket_sessions()
+                       if video_subscriptions.is_subscribed(session.session_id)}
+        return frame, posture, landmarks, evaluations
+
+    def encode_and_emit(result):
+        frame, posture, landmarks, evaluations = result
+        frame_id, rooms = video_subscriptions.plan()
+        if not rooms:
+            return
+        # Tratar la etiqueta del modelo como la condición médica
+        condition = posture if posture else 'No detectada'
+        images = {}
+        for room, mode, quality, client_ids in rooms:
+            payload = {'frame_id': frame_id, 'mode': mode,
+                       'posture': posture or "No detectado", 'condition': condition}
+            if mode == 'landmarks':
+                payload['landmarks'] = (np.round(flat_xyz(landmarks), 4).tolist()
+                                        if landmarks is not None else None)
+                nbytes = len(json.dumps(payload))
+            else:
+                # Un JPEG por (modo, calidad) y frame, compartido por todas las salas que lo piden
+                if (mode, quality) not in images:
+                    images[(mode, quality)] = encode_data_uri(downscale(frame) if mode == 'downscaled' else frame,
+                                                              quality)
+                payload['image'] = images[(mode, quality)]
+                payload['quality'] = quality
+                nbytes = len(payload['image']) + 200
+            with thread_lock:
+                socketio.emit('video_feed', payload, to=room)
+                for client_id in client_ids:
+                    if client_id in evaluations:
+                        feedback_label, feedback_reason, metrics = evaluations[client_id]
+                        socketio.emit('video_verdict', {'frame_id': frame_id,
+                                                        'feedback': feedback_label,
+                                                        'reason': feedback_reason,
+                                                        'metrics': metrics}, to=client_id)
+            video_subscriptions.record_emit(client_ids, nbytes)
+
+    # Captura, inferencia y codificación/emisión en hilos separados: una etapa lenta
+    # descarta frames viejos en lugar de retrasar la cámara
+    video_pipeline = VideoPipeline(capture, infer, encode_and_emit,
+                                   queue_size=int(os.environ.get('VIDEO_QUEUE_SIZE', 2)), name='camara')
+    try:
+        video_pipeline.start()
+        video_pipeline.join()
+    finally:
+        cap.release()
+        if dedicated_pose:
+            stream_pose.close()
+        else:
+            tracking_pose_pool.discard(stream_pose)
 
 @app.route('/')
 def index():
@@ -591,103 +974,60 @@ def get_video(dataset, video):
 @socketio.on('set_reference_video')
 def handle_set_reference_video(data):
     """Recibe la ruta del video de referencia, extrae una secuencia de landmarks muestreada
-    y la guarda en `current_reference_sequence`. Se expone `reference_fps` para sincronización.
+    y la guarda en la sesión del cliente. Se expone `ref_fps` para sincronización.
     Parámetros esperados en `data`: 'video_path' y opcional 'target_fps' (por defecto 2).
     """
-    global current_reference_landmarks, current_reference_sequence, reference_fps, current_reference_index
+    session = get_socket_session()
+    sid = session.session_id
 
     video_path = data.get('video_path')
     if not video_path:
         return
+    if not boot.ready:
+        socketio.emit('reference_video_set', not_ready_payload(), to=sid)
+        return
 
     full_path = Path(video_path)
     if not full_path.exists():
-        socketio.emit('reference_video_set', {'success': False, 'message': 'Video no encontrado'})
+        socketio.emit('reference_video_set', {'success': False, 'message': 'Video no encontrado'}, to=sid)
         return
 
     try:
-        # Abrir el video
-        cap = cv2.VideoCapture(str(full_path))
-        if not cap.isOpened():
-            socketio.emit('reference_video_set', {'success': False, 'message': 'No se pudo abrir el video'})
-            return
-
-        # Configurar muestreo - extraer más frames para mejor detección
-        video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
         target_fps = float(data.get('target_fps', 3))  # Aumentado de 2 a 3 fps
-        reference_fps = max(1, int(target_fps))
-        step = max(1, int(round(video_fps / target_fps)))
-
-        seq = []
-        frame_idx = 0
-        max_samples = 600  # Duplicado de 300 a 600
-        samples = 0
-        skipped = 0  # Contador de frames sin detección
-
-        print(f"Procesando video de referencia: {video_path}")
-        print(f"Video FPS: {video_fps}, Target FPS: {target_fps}, Step: {step}")
-        
-        # Usar confianza más baja para detectar más poses
-        local_pose = mp.solutions.pose.Pose(static_image_mode=True, model_complexity=1,
-                                            min_detection_confidence=0.4)  # Reducido de 0.6 a 0.4
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_idx % step == 0:
-                # Procesar con MediaPipe
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = local_pose.process(frame_rgb)
-                if results.pose_landmarks:
-                    landmarks = [coord for landmark in results.pose_landmarks.landmark
-                                 for coord in [landmark.x, landmark.y, landmark.z]]
-                    seq.append(landmarks)
-                    samples += 1
-                    if samples >= max_samples:
-                        print(f"Límite de {max_samples} muestras alcanzado")
-                        break
-                else:
-                    skipped += 1
-            
-            frame_idx += 1
-        
-        print(f"Extracción completa - Frames procesados: {frame_idx}, Detecciones: {samples}, Sin detección: {skipped}")
-
-        cap.release()
         try:
-            local_pose.close()
-        except Exception:
-            pass
+            entry = reference_cache.get(full_path, target_fps=target_fps)
+        except ValueError as e:
+            socketio.emit('reference_video_set', {'success': False, 'message': str(e)}, to=sid)
+            return
+        seq = entry['sequence']
+        print(f"Referencia obtenida ({entry['origen']}): {len(seq)} frames")
 
-        if not seq:
-            socketio.emit('reference_video_set', {'success': False, 'message': 'No se detectaron landmarks en el video'})
+        if not len(seq):
+            socketio.emit('reference_video_set', {'success': False, 'message': 'No se detectaron landmarks en el video'}, to=sid)
             return
 
         # Guardar secuencia y primera referencia
-        current_reference_sequence = seq
-        current_reference_landmarks = seq[0]
-        current_reference_index = 0
+        with session.lock:
+            session.set_reference_sequence(seq, target_fps)
+            reference_fps = session.reference_fps
 
         socketio.emit('reference_video_set', {
             'success': True,
             'frames': len(seq),
             'ref_fps': reference_fps,
             'message': f'Se extrajeron {len(seq)} frames de referencia (muestreo {reference_fps} fps)'
-        })
+        }, to=sid)
 
     except Exception as e:
-        socketio.emit('reference_video_set', {'success': False, 'message': str(e)})
+        socketio.emit('reference_video_set', {'success': False, 'message': str(e)}, to=sid)
 
 
 @socketio.on('sync_reference_time')
 def handle_sync_reference_time(data):
     """Recibe {'current_time': seconds} del cliente para sincronizar el índice de referencia."""
-    global current_reference_index, reference_fps
     try:
-        t = float(data.get('current_time', 0))
-        idx = int(round(t * reference_fps))
-        current_reference_index = max(0, idx)
+        session = get_socket_session()
+        session.sync_time(data.get('current_time', 0))
     except Exception:
         pass
 
@@ -695,313 +1035,467 @@ def handle_sync_reference_time(data):
 @socketio.on('set_tolerance')
 def handle_set_tolerance(data):
     """Recibe {'tolerance': float} para ajustar la tolerancia de comparación en tiempo real."""
-    global current_tolerance
     try:
+        session = get_socket_session()
         t = float(data.get('tolerance', 1.0))
         # limitar rango razonable
         if t <= 0:
             return
-        current_tolerance = max(0.3, min(3.0, t))
-        socketio.emit('tolerance_updated', {'tolerance': current_tolerance})
+        session.tolerance = max(0.3, min(3.0, t))
+        socketio.emit('tolerance_updated', {'tolerance': session.tolerance}, to=session.session_id)
+    except Exception:
+        pass
+
+@socketio.on('set_alignment_mode')
+def handle_set_alignment_mode(data):
+    """Recibe {'mode': 'auto' | 'sync'}: fase estimada por el servidor o sincronizada por el cliente."""
+    try:
+        session = get_socket_session()
+        if set_session_alignment(session, data.get('mode')):
+            socketio.emit('alignment_mode_updated', {'alignment': session.alignment}, to=session.session_id)
     except Exception:
         pass
 
 @socketio.on('connect')
 def handle_connect():
     global thread
+    session = get_socket_session()
+    session.is_socket = True
+    if not LOCAL_CAMERA:
+        return
+    # Sin suscripción hasta 'subscribe_video': los clientes que solo evalúan (stream_frame)
+    # no reciben 'video_feed'
     with thread_lock:
         if thread is None:
             thread = socketio.start_background_task(video_stream)
 
 
+@socketio.on('subscribe_video')
+def handle_subscribe_video(data):
+    """Recibe {'mode': 'full' | 'downscaled' | 'landmarks'} y responde con 'video_subscription'
+    (modo, sala, calidad y fps del escalón inicial)."""
+    mode = data.get('mode', 'full') if isinstance(data, dict) else 'full'
+    try:
+        info = video_subscriptions.subscribe(request.sid, mode)
+        socketio.emit('video_subscription', {'success': True, **info}, to=request.sid)
+    except ValueError as e:
+        socketio.emit('video_subscription', {'success': False, 'message': str(e)}, to=request.sid)
+
+
+@socketio.on('video_ack')
+def handle_video_ack(data):
+    """Recibe {'frame_id': n} cuando el cliente ha mostrado un 'video_feed'."""
+    try:
+        video_subscriptions.ack(request.sid, int(data.get('frame_id')))
+    except Exception:
+        pass
+
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    video_subscriptions.unsubscribe(request.sid)
+    evaluation_channel.remove(request.sid)
+    sessions.remove(request.sid)
+
+
+NOT_READY_MESSAGE = 'Servidor arrancando, inténtalo de nuevo en unos segundos'
+# Rutas que responden sin esperar al arranque (vida/disponibilidad y la página principal)
+BOOT_EXEMPT_PATHS = {'/', '/api/live', '/api/ping', '/api/ready'}
+
+
+def not_ready_payload():
+    status = boot.status()
+    message = NOT_READY_MESSAGE if status['error'] is None else f"Arranque fallido: {status['error']}"
+    return {'success': False, 'ready': False, 'message': message, 'state': status['state']}
+
+
+@app.before_request
+def require_ready():
+    """Las rutas que usan el modelo, OpenCV o los grafos Pose responden 503 hasta que el
+    arranque en segundo plano termine."""
+    if (boot.ready or request.method == 'OPTIONS' or request.path in BOOT_EXEMPT_PATHS
+            or request.path.startswith('/static/')):
+        return None
+    return jsonify(not_ready_payload()), 503, {'Retry-After': '2'}
+
+
 @app.after_request
 def after_request(response):
     """Agregar headers CORS a todas las respuestas"""
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Session-Id,X-Reference-Video')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+def build_evaluation(session, landmarks, posture, reference_video_info=None):
+    """Evaluación completa de unos landmarks ya clasificados para un cliente: buffer de
+    suavizado, referencia (secuencia sincronizada, landmark único o índice del video),
+    evaluate_posture y comprobaciones de distancia/visibilidad. Devuelve el dict de respuesta
+    común a /api/evaluate_frame y /api/evaluate_landmarks."""
+    with session.lock:
+        # Actualizar el buffer circular de landmarks para suavizar ruido en llamadas HTTP
+        filtered = landmarks
+        try:
+            if landmarks is not None:
+                filtered = session.push_http_landmarks(landmarks)
+        except Exception as e:
+            print(f"[SUAVIZADO] Error en el buffer de {session.session_id}: {e}")
+        user_seq = session.http_smoother.window()
+        estimate_phase(session, user_seq)
+        dtw_metrics = None
+        if ONLINE_DTW and session.reference_sequence and filtered is not None:
+            dtw_metrics = push_online_dtw(session, 'http_dtw', filtered)
+        # Primero la secuencia sincronizada: completa (DTW temporal) si el buffer tiene 2+ frames,
+        # si no el frame del índice; o el landmark único de la imagen de referencia
+        ref_landmarks_to_use = session.evaluation_reference(user_seq)
+        reference_index = session.reference_index
+        tolerance = session.tolerance
+
+    # ⭐ Sin referencia en la sesión: buscar el frame del video de referencia si se proporciona información
+    if ref_landmarks_to_use is None and reference_video_info and reference_video_info.get('condition') and reference_video_info.get('video_name'):
+        # Intentar obtener el frame del video de referencia
+        condition = reference_video_info.get('condition')
+        video_name = reference_video_info.get('video_name')
+        current_time = float(reference_video_info.get('current_time', 0))
+        
+        # Buscar el video en el servidor
+        video_path = Path('dataset') / condition / video_name
+        
+        if video_path.exists():
+            try:
+                # Índice tiempo -> landmarks construido una vez por video (sin decodificar aquí)
+                ref_index = reference_indexes.get(video_path)
+                if ref_index is not None:
+                    ref_landmarks_to_use = ref_index.lookup(current_time)
+                else:
+                    print(f"Índice de referencia no disponible (en construcción o sin landmarks): {video_path.name}")
+            except Exception as e:
+                print(f"Error procesando frame de referencia: {e}")
+
+    # ⭐ Evaluar postura - manejar caso cuando no hay landmarks del usuario
+    if landmarks is None:
+        feedback_label = 'Sin evaluación'
+        feedback_reason = 'No se detectó postura. Asegúrate de estar visible en la cámara.'
+        metrics = {'avg_distance': None, 'max_distance': None}
+    elif not posture:
+        feedback_label = 'Sin evaluación'
+        feedback_reason = 'Postura no reconocida. Intenta ajustar tu posición.'
+        metrics = {'avg_distance': None, 'max_distance': None}
+    else:
+        # Log para debugging
+        if ref_landmarks_to_use is not None:
+            print(f"Evaluando con referencia: posture={posture}, ref_available=True")
+        else:
+            print(f"Evaluando sin referencia: posture={posture}, usando heurísticas")
+        
+        feedback_label, feedback_reason, metrics = evaluate_posture(landmarks, posture, ref_landmarks_to_use,
+                                                                    tolerance_scale=tolerance, user_sequence=user_seq,
+                                                                    reference_index=reference_index,
+                                                                    sequence_metrics=dtw_metrics)
+
+    # ⭐ Calcular tamaño de la pose para detectar distancia y visibilidad de cuerpo inferior
+    pose_size = None
+    distance_status = None  # 'too_close', 'too_far', 'optimal'
+    visible_lower_body = False
+    if landmarks is not None:
+        # Una sola conversión C del frame compacto a floats de Python (la respuesta es JSON)
+        pts = as_frame(landmarks)[:, :3].tolist()
+        if len(pts) >= 29:  # Asegurar que tenemos suficientes landmarks
+            LEFT_SHOULDER = 11
+            RIGHT_SHOULDER = 12
+            LEFT_HIP = 23
+            RIGHT_HIP = 24
+            LEFT_KNEE = 25
+            RIGHT_KNEE = 26
+            LEFT_ANKLE = 27
+            RIGHT_ANKLE = 28
+
+            # Calcular distancia promedio entre hombros y caderas (torso)
+            shoulder_center = ((pts[LEFT_SHOULDER][0] + pts[RIGHT_SHOULDER][0]) / 2,
+                               (pts[LEFT_SHOULDER][1] + pts[RIGHT_SHOULDER][1]) / 2)
+            hip_center = ((pts[LEFT_HIP][0] + pts[RIGHT_HIP][0]) / 2,
+                          (pts[LEFT_HIP][1] + pts[RIGHT_HIP][1]) / 2)
+
+            # Distancia del torso (normalizada 0-1)
+            torso_distance = np.sqrt((shoulder_center[0] - hip_center[0])**2 +
+                                     (shoulder_center[1] - hip_center[1])**2)
+            pose_size = float(torso_distance)
+
+            # Heurística de visibilidad de cuerpo inferior: validar x,y en [0,1] y span vertical suficiente
+            lower_idxs = [LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE]
+            def in_bounds(p):
+                return p is not None and 0.0 <= p[0] <= 1.0 and 0.0 <= p[1] <= 1.0
+            lower_points = [pts[i] if i < len(pts) else None for i in lower_idxs]
+            lower_in_bounds = all(in_bounds(p) for p in lower_points if p is not None)
+
+            # Span vertical entre caderas y tobillos promedio
+            ankles_y = [pts[LEFT_ANKLE][1], pts[RIGHT_ANKLE][1]] if in_bounds(pts[LEFT_ANKLE]) and in_bounds(pts[RIGHT_ANKLE]) else []
+            vertical_span = None
+            if lower_in_bounds and ankles_y:
+                avg_ankle_y = float(sum(ankles_y) / len(ankles_y))
+                vertical_span = avg_ankle_y - hip_center[1]
+                # Umbral muy relajado: 0.05 para aceptar la mayoría de encuadres
+                visible_lower_body = vertical_span > 0.05
+            else:
+                visible_lower_body = False
+
+            # Determinar estado de distancia (término medio):
+            # Óptimo solo si hay algo de cuerpo inferior visible o span vertical >= 0.04
+            if torso_distance > 0.35:
+                distance_status = 'too_close'
+            elif torso_distance < 0.12:
+                distance_status = 'too_far'
+            else:
+                # Dentro del rango, verificar visibilidad de piernas
+                if visible_lower_body or (vertical_span is not None and vertical_span >= 0.04):
+                    distance_status = 'optimal'
+                else:
+                    # Sin piernas visibles: no afirmar 'optimal'
+                    distance_status = 'too_far'
+
+    # Mapear a etiqueta amigable para cliente
+    distance_quality = None
+    if distance_status == 'too_close':
+        distance_quality = 'near'
+    elif distance_status == 'too_far':
+        distance_quality = 'far'
+    elif distance_status == 'optimal':
+        # Marcar óptima si la distancia es buena, independiente de visibilidad completa
+        distance_quality = 'optimal'
+    else:
+        distance_quality = 'far'
+
+    # Añadir is_good y una estimación simple de confianza basada en avg_distance
+    is_good = False
+    confidence = None
+    try:
+        if isinstance(metrics.get('avg_distance'), float) and metrics.get('avg_distance') is not None:
+            avg = float(metrics.get('avg_distance'))
+            # confianza: 1 - saturación del avg (valores empíricos)
+            confidence = max(0.0, min(1.0, 1.0 - (avg / (avg + 0.1))))
+        if isinstance(feedback_label, str):
+            low = feedback_label.lower()
+            if 'bien' in low or '✓' in feedback_label:
+                is_good = True
+    except Exception:
+        pass
+
+    # Inyectar visibilidad de cuerpo inferior en métricas
+    try:
+        if isinstance(metrics, dict):
+            metrics['visible_lower_body'] = visible_lower_body
+            metrics['lower_body_span'] = vertical_span if vertical_span is not None else None
+            metrics['torso_distance'] = pose_size
+    except Exception:
+        pass
+
+    # Integración opcional: ajustar feedback con Groq si hay API key
+    try:
+        metrics_payload = {
+            'avg_distance': metrics.get('avg_distance'),
+            'max_distance': metrics.get('max_distance'),
+            'distance_quality': distance_quality,
+            'visible_lower_body': visible_lower_body,
+            'pose_size': pose_size,
+        }
+        new_feedback, new_reason = groq_assess_movement(metrics_payload, feedback_label, feedback_reason)
+        feedback_label, feedback_reason = new_feedback, new_reason
+        is_good = (feedback_label == 'Bien')
+    except Exception:
+        pass
+
+    return {'success': True,
+            'posture': posture,
+            'feedback': feedback_label,
+            'reason': feedback_reason,
+            'metrics': metrics,
+            'pose_size': pose_size,
+            'distance_status': distance_status,
+            'distance_quality': distance_quality,
+            'is_good': is_good,
+            'confidence': confidence}
+
+
+def parse_landmarks(value):
+    """Landmarks enviados por el cliente -> frame (33, 4) float32 [x,y,z,visibility] o None.
+    Acepta la lista plana (99, o 132 con visibilidad x,y,z,v), 33 pares [x,y,z(,v)]
+    o 33 objetos {'x','y','z'(,'visibility')} como los de MediaPipe JS."""
+    if not isinstance(value, (list, tuple)) or not value:
+        return None
+    try:
+        if isinstance(value[0], dict):
+            value = [[p['x'], p['y'], p['z'], p.get('visibility', 1.0)] for p in value]
+        frame = as_frame(value)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if frame.shape[0] != 33 or not np.all(np.isfinite(frame)):
+        return None
+    return frame
+
+
+def evaluate_landmarks_payload(session, payload):
+    """Clasifica y evalúa landmarks calculados en el cliente (sin decodificar imagen ni
+    ejecutar MediaPipe). Retorna (respuesta, mensaje_error)."""
+    if not isinstance(payload, dict):
+        return None, 'No JSON payload'
+    landmarks = parse_landmarks(payload.get('landmarks'))
+    if landmarks is None:
+        return None, 'Se esperan 33 landmarks [x,y,z] (99 valores)'
+    posture = predict_landmarks(landmarks, session.motion_gate)
+    return build_evaluation(session, landmarks, posture, payload.get('reference_video')), None
+
+
 @app.route('/api/evaluate_frame', methods=['POST', 'OPTIONS'])
 def evaluate_frame():
     """Endpoint para evaluar una imagen enviada por la app móvil.
-    Espera JSON: {'image': 'data:image/jpeg;base64,...'}
+    Acepta:
+    - JSON: {'image': 'data:image/jpeg;base64,...', 'reference_video': {...}}
+    - Cuerpo binario (Content-Type image/jpeg): metadatos en la query
+      (?session_id=...&condition=...&video_name=...&current_time=...)
+    - multipart/form-data: archivo 'image' y los mismos campos en el formulario
     Devuelve: posture, feedback, reason, metrics
     """
     if request.method == 'OPTIONS':
         return jsonify({'success': True}), 200
     
     try:
-        payload = request.get_json()
-        if not payload:
-            return jsonify({'success': False, 'message': 'No JSON payload'}), 400
-
-        img_b64 = payload.get('image')
-        if not img_b64:
-            return jsonify({'success': False, 'message': 'No image provided'}), 400
-
-        # Soporta data URI o solo base64
-        if ',' in img_b64:
-            img_b64 = img_b64.split(',', 1)[1]
-
-        img_bytes = base64.b64decode(img_b64)
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        frame, payload, error = read_request_frame()
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
 
-        if frame is None:
-            return jsonify({'success': False, 'message': 'Invalid image data'}), 400
+        session = get_http_session()
 
         # Usar las funciones existentes para clasificar y evaluar
-        frame_proc, posture, landmarks = classify_posture(frame)
+        with session_pose(session) as pose_graph:
+            frame_proc, posture, landmarks = classify_posture(frame, pose_graph, session.motion_gate)
 
-        # Actualizar buffer corto de landmarks para suavizar ruido en llamadas HTTP
-        try:
-            global recent_user_landmarks_buffer
-            if landmarks:
-                recent_user_landmarks_buffer.append(landmarks)
-                if len(recent_user_landmarks_buffer) > 3:
-                    recent_user_landmarks_buffer.pop(0)
-        except Exception:
-            pass
+        return jsonify(build_evaluation(session, landmarks, posture, payload.get('reference_video')))
 
-        # ⭐ Procesar frame del video de referencia si se proporciona información
-        ref_landmarks_to_use = None
-        reference_video_info = payload.get('reference_video')
-        
-        # Primero intentar usar la secuencia sincronizada (más eficiente)
-        if current_reference_sequence:
-            idx = min(max(0, current_reference_index), len(current_reference_sequence)-1)
-            # Si tenemos un buffer de usuario reciente, preferimos comparar temporales (secuencia completa)
-            try:
-                if recent_user_landmarks_buffer and len(recent_user_landmarks_buffer) > 1:
-                    ref_landmarks_to_use = current_reference_sequence
-                else:
-                    ref_landmarks_to_use = current_reference_sequence[idx]
-            except Exception:
-                ref_landmarks_to_use = current_reference_sequence[idx]
-        elif current_reference_landmarks:
-            ref_landmarks_to_use = current_reference_landmarks
-        # Si no hay secuencia, intentar procesar el video en tiempo real
-        elif reference_video_info and reference_video_info.get('condition') and reference_video_info.get('video_name'):
-            # Intentar obtener el frame del video de referencia
-            condition = reference_video_info.get('condition')
-            video_name = reference_video_info.get('video_name')
-            current_time = float(reference_video_info.get('current_time', 0))
-            
-            # Buscar el video en el servidor
-            video_path = Path('dataset') / condition / video_name
-            
-            if video_path.exists():
-                try:
-                    # Abrir el video y obtener el frame en el tiempo especificado
-                    cap = cv2.VideoCapture(str(video_path))
-                    if cap.isOpened():
-                        # Calcular frame número basado en el tiempo
-                        video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-                        frame_number = int(current_time * video_fps)
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-                        
-                        ret, ref_frame = cap.read()
-                        if ret:
-                            # Procesar frame de referencia con MediaPipe
-                            ref_frame_rgb = cv2.cvtColor(ref_frame, cv2.COLOR_BGR2RGB)
-                            ref_results = pose.process(ref_frame_rgb)
-                            if ref_results.pose_landmarks:
-                                ref_landmarks_to_use = [coord for landmark in ref_results.pose_landmarks.landmark
-                                                       for coord in [landmark.x, landmark.y, landmark.z]]
-                        
-                        cap.release()
-                except Exception as e:
-                    print(f"Error procesando frame de referencia: {e}")
-
-        # ⭐ Evaluar postura - manejar caso cuando no hay landmarks del usuario
-        if not landmarks:
-            feedback_label = 'Sin evaluación'
-            feedback_reason = 'No se detectó postura. Asegúrate de estar visible en la cámara.'
-            metrics = {'avg_distance': None, 'max_distance': None}
-        elif not posture:
-            feedback_label = 'Sin evaluación'
-            feedback_reason = 'Postura no reconocida. Intenta ajustar tu posición.'
-            metrics = {'avg_distance': None, 'max_distance': None}
-        else:
-            # Log para debugging
-            if ref_landmarks_to_use:
-                print(f"Evaluando con referencia: posture={posture}, ref_available=True")
-            else:
-                print(f"Evaluando sin referencia: posture={posture}, usando heurísticas")
-            
-            feedback_label, feedback_reason, metrics = evaluate_posture(landmarks, posture, ref_landmarks_to_use, tolerance_scale=current_tolerance)
-
-        # ⭐ Calcular tamaño de la pose para detectar distancia y visibilidad de cuerpo inferior
-        pose_size = None
-        distance_status = None  # 'too_close', 'too_far', 'optimal'
-        visible_lower_body = False
-        if landmarks:
-            pts = [(landmarks[i], landmarks[i+1], landmarks[i+2]) for i in range(0, len(landmarks), 3)]
-            if len(pts) >= 29:  # Asegurar que tenemos suficientes landmarks
-                LEFT_SHOULDER = 11
-                RIGHT_SHOULDER = 12
-                LEFT_HIP = 23
-                RIGHT_HIP = 24
-                LEFT_KNEE = 25
-                RIGHT_KNEE = 26
-                LEFT_ANKLE = 27
-                RIGHT_ANKLE = 28
-
-                # Calcular distancia promedio entre hombros y caderas (torso)
-                shoulder_center = ((pts[LEFT_SHOULDER][0] + pts[RIGHT_SHOULDER][0]) / 2,
-                                   (pts[LEFT_SHOULDER][1] + pts[RIGHT_SHOULDER][1]) / 2)
-                hip_center = ((pts[LEFT_HIP][0] + pts[RIGHT_HIP][0]) / 2,
-                              (pts[LEFT_HIP][1] + pts[RIGHT_HIP][1]) / 2)
-
-                # Distancia del torso (normalizada 0-1)
-                torso_distance = np.sqrt((shoulder_center[0] - hip_center[0])**2 +
-                                         (shoulder_center[1] - hip_center[1])**2)
-                pose_size = float(torso_distance)
-
-                # Heurística de visibilidad de cuerpo inferior: validar x,y en [0,1] y span vertical suficiente
-                lower_idxs = [LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE]
-                def in_bounds(p):
-                    return p is not None and 0.0 <= p[0] <= 1.0 and 0.0 <= p[1] <= 1.0
-                lower_points = [pts[i] if i < len(pts) else None for i in lower_idxs]
-                lower_in_bounds = all(in_bounds(p) for p in lower_points if p is not None)
-
-                # Span vertical entre caderas y tobillos promedio
-                ankles_y = [pts[LEFT_ANKLE][1], pts[RIGHT_ANKLE][1]] if in_bounds(pts[LEFT_ANKLE]) and in_bounds(pts[RIGHT_ANKLE]) else []
-                vertical_span = None
-                if lower_in_bounds and ankles_y:
-                    avg_ankle_y = float(sum(ankles_y) / len(ankles_y))
-                    vertical_span = avg_ankle_y - hip_center[1]
-                    # Umbral muy relajado: 0.05 para aceptar la mayoría de encuadres
-                    visible_lower_body = vertical_span > 0.05
-                else:
-                    visible_lower_body = False
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
 
-                # Determinar estado de distancia (término medio):
-                # Óptimo solo si hay algo de cuerpo inferior visible o span vertical >= 0.04
-                if torso_distance > 0.35:
-                    distance_status = 'too_close'
-                elif torso_distance < 0.12:
-                    distance_status = 'too_far'
-                else:
-                    # Dentro del rango, verificar visibilidad de piernas
-                    if visible_lower_body or (vertical_span is not None and vertical_span >= 0.04):
-                        distance_status = 'optimal'
-                    else:
-                        # Sin piernas visibles: no afirmar 'optimal'
-                        distance_status = 'too_far'
-
-        # Mapear a etiqueta amigable para cliente
-        distance_quality = None
-        if distance_status == 'too_close':
-            distance_quality = 'near'
-        elif distance_status == 'too_far':
-            distance_quality = 'far'
-        elif distance_status == 'optimal':
-            # Marcar óptima si la distancia es buena, independiente de visibilidad completa
-            distance_quality = 'optimal'
-        else:
-            distance_quality = 'far'
 
-        # Añadir is_good y una estimación simple de confianza basada en avg_distance
-        is_good = False
-        confidence = None
-        try:
-            if isinstance(metrics.get('avg_distance'), float) and metrics.get('avg_distance') is not None:
-                avg = float(metrics.get('avg_distance'))
-                # confianza: 1 - saturación del avg (valores empíricos)
-                confidence = max(0.0, min(1.0, 1.0 - (avg / (avg + 0.1))))
-            if isinstance(feedback_label, str):
-                low = feedback_label.lower()
-                if 'bien' in low or '✓' in feedback_label:
-                    is_good = True
-        except Exception:
-            pass
+@app.route('/api/evaluate_landmarks', methods=['POST', 'OPTIONS'])
+def evaluate_landmarks():
+    """Evalúa landmarks calculados en el cliente (MediaPipe en el teléfono o en un equipo
+    de borde). Solo ejecuta clasificación, comparación con la referencia y comprobaciones
+    de distancia/visibilidad.
+    Espera JSON: {'landmarks': [x,y,z,...], 'reference_video': {...} (opcional)}
+    Devuelve el mismo esquema que /api/evaluate_frame.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({'success': True}), 200
 
-        # Inyectar visibilidad de cuerpo inferior en métricas
-        try:
-            if isinstance(metrics, dict):
-                metrics['visible_lower_body'] = visible_lower_body
-                metrics['lower_body_span'] = vertical_span if vertical_span is not None else None
-                metrics['torso_distance'] = pose_size
-        except Exception:
-            pass
+    try:
+        session = get_http_session()
+        result, error = evaluate_landmarks_payload(session, request.get_json(silent=True))
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
 
-        # Integración opcional: ajustar feedback con Groq si hay API key
-        try:
-            metrics_payload = {
-                'avg_distance': metrics.get('avg_distance'),
-                'max_distance': metrics.get('max_distance'),
-                'distance_quality': distance_quality,
-                'visible_lower_body': visible_lower_body,
-                'pose_size': pose_size,
-            }
-            new_feedback, new_reason = groq_assess_movement(metrics_payload, feedback_label, feedback_reason)
-            feedback_label, feedback_reason = new_feedback, new_reason
-            is_good = (feedback_label == 'Bien')
-        except Exception:
-            pass
-
-        return jsonify({'success': True,
-                        'posture': posture,
-                        'feedback': feedback_label,
-                        'reason': feedback_reason,
-                        'metrics': metrics,
-                        'pose_size': pose_size,
-                        'distance_status': distance_status,
-                        'distance_quality': distance_quality,
-                        'is_good': is_good,
-                        'confidence': confidence})
 
+@socketio.on('evaluate_landmarks')
+def handle_evaluate_landmarks(data):
+    """Versión Socket.IO de /api/evaluate_landmarks. Responde con 'landmarks_evaluation'
+    (mismo esquema; se devuelve 'request_id' si el cliente lo envía)."""
+    session = get_socket_session()
+    try:
+        if not boot.ready:
+            result, error = not_ready_payload(), None
+        else:
+            result, error = evaluate_landmarks_payload(session, data)
+        if error:
+            result = {'success': False, 'message': error}
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 500
+        result = {'success': False, 'message': str(e)}
+    if isinstance(data, dict) and 'request_id' in data:
+        result['request_id'] = data['request_id']
+    socketio.emit('landmarks_evaluation', result, to=session.session_id)
+
+
+def process_stream_frame(session_id, item, dropped):
+    """Evalúa el frame más reciente de un cliente del canal 'stream_frame' y le envía
+    'frame_evaluation' (mismo esquema que /api/evaluate_frame más frame_id y dropped)."""
+    session = sessions.get(session_id, create=False)
+    if session is None:
+        return
+    image, meta = item
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        frame = decode_image_bytes(image)
+    else:
+        frame = decode_image_b64(image)
+    if frame is None:
+        result = {'success': False, 'message': 'Invalid image data'}
+    else:
+        with session_pose(session) as pose_graph:
+            _, posture, landmarks = classify_posture(frame, pose_graph, session.motion_gate)
+        result = build_evaluation(session, landmarks, posture, meta.get('reference_video'))
+    result['frame_id'] = meta.get('frame_id')
+    result['dropped'] = dropped
+    socketio.emit('frame_evaluation', result, to=session_id)
+
+
+# Canal persistente: un frame en proceso por cliente y solo el más reciente en espera
+evaluation_channel = LatestFrameChannel(process_stream_frame,
+                                        workers=int(os.environ.get('STREAM_WORKERS', 0)) or POSE_POOL_SIZE,
+                                        name='evaluacion')
+
+
+@socketio.on('stream_frame')
+def handle_stream_frame(data):
+    """Frame del teléfono por la conexión Socket.IO: el JPEG como adjunto binario, o un dict
+    {'image': <bytes o base64>, 'frame_id': n, 'reference_video': {...}}.
+    Si el servidor va atrasado, los frames en espera se sustituyen por el nuevo. El ack
+    indica si se descartó uno; el cliente puede esperar a 'frame_evaluation' para enviar
+    el siguiente y así ajustar su ritmo a la capacidad del servidor."""
+    session = get_socket_session()
+    if isinstance(data, dict):
+        image, meta = data.get('image'), data
+    else:
+        image, meta = data, {}
+    if not image:
+        return {'queued': False, 'message': 'No image provided'}
+    if not boot.ready:
+        return {'queued': False, 'ready': False, 'message': NOT_READY_MESSAGE}
+    replaced = evaluation_channel.submit(session.session_id, (image, meta))
+    return {'queued': True, 'replaced': replaced, 'frame_id': meta.get('frame_id')}
 
 
 @app.route('/api/process_video_frames', methods=['POST', 'OPTIONS'])
 def process_video_frames():
     """Endpoint HTTP para procesar frames de video y extraer landmarks (para app móvil).
-    Espera JSON: {'frames': ['data:image/jpeg;base64,...', ...], 'target_fps': 2}
+    Acepta JSON: {'frames': ['data:image/jpeg;base64,...', ...], 'target_fps': 2},
+    multipart/form-data con varios archivos 'frames' (y 'target_fps' en el formulario)
+    o un único frame como cuerpo image/jpeg (?target_fps=2).
     Devuelve: {'success': True, 'landmarks_sequence': [[...], ...], 'ref_fps': 2}
     """
     if request.method == 'OPTIONS':
         return jsonify({'success': True}), 200
     
     try:
-        payload = request.get_json()
-        if not payload:
-            return jsonify({'success': False, 'message': 'No JSON payload'}), 400
+        frames, payload, error = iter_request_frames()
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
         
-        frames_b64 = payload.get('frames', [])
         target_fps = float(payload.get('target_fps', 2))
         
-        if not frames_b64:
-            return jsonify({'success': False, 'message': 'No frames provided'}), 400
-        
         seq = []
-        # Procesar cada frame
-        for frame_b64 in frames_b64:
-            try:
-                # Decodificar imagen
-                if ',' in frame_b64:
-                    frame_b64 = frame_b64.split(',', 1)[1]
-                
-                img_bytes = base64.b64decode(frame_b64)
-                nparr = np.frombuffer(img_bytes, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if frame is None:
+        # Procesar cada frame con un grafo estático del pool (trabajo puntual, sin tracking)
+        with static_pose_pool.checkout() as pose_graph:
+            for frame in frames:
+                try:
+                    # Procesar con MediaPipe
+                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    results = pose_graph.process(frame_rgb)
+                    if results.pose_landmarks:
+                        landmarks = [coord for landmark in results.pose_landmarks.landmark
+                                     for coord in [landmark.x, landmark.y, landmark.z]]
+                        seq.append(landmarks)
+                except Exception as e:
+                    print(f"Error procesando frame: {e}")
                     continue
-                
-                # Procesar con MediaPipe
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = pose.process(frame_rgb)
-                if results.pose_landmarks:
-                    landmarks = [coord for landmark in results.pose_landmarks.landmark
-                                 for coord in [landmark.x, landmark.y, landmark.z]]
-                    seq.append(landmarks)
-            except Exception as e:
-                print(f"Error procesando frame: {e}")
-                continue
         
         if not seq:
             return jsonify({'success': False, 'message': 'No se detectaron landmarks en los frames'}), 400
@@ -1021,13 +1515,11 @@ def process_video_frames():
 def set_reference_landmarks():
     """Endpoint HTTP para establecer la secuencia de landmarks como referencia (para app móvil).
     Espera JSON: {'landmarks_sequence': [[...], ...], 'ref_fps': 2}
-    Guarda la secuencia en current_reference_sequence.
+    Guarda la secuencia en la sesión del cliente.
     """
     if request.method == 'OPTIONS':
         return jsonify({'success': True}), 200
     
-    global current_reference_landmarks, current_reference_sequence, reference_fps, current_reference_index
-    
     try:
         payload = request.get_json()
         if not payload:
@@ -1040,10 +1532,9 @@ def set_reference_landmarks():
             return jsonify({'success': False, 'message': 'No landmarks sequence provided'}), 400
         
         # Guardar secuencia y primera referencia
-        current_reference_sequence = landmarks_seq
-        current_reference_landmarks = landmarks_seq[0] if landmarks_seq else None
-        current_reference_index = 0
-        reference_fps = ref_fps
+        session = get_http_session()
+        with session.lock:
+            session.set_reference_sequence(landmarks_seq, ref_fps)
         
         return jsonify({
             'success': True,
@@ -1060,13 +1551,11 @@ def set_reference_landmarks():
 def set_reference_video_http():
     """Endpoint HTTP para establecer el video de referencia (para app móvil).
     Espera JSON: {'condition': 'condicion', 'video_name': 'nombre_video.mp4', 'target_fps': 2}
-    Extrae landmarks del video y los guarda en current_reference_sequence.
+    Extrae landmarks del video y los guarda en la sesión del cliente.
     """
     if request.method == 'OPTIONS':
         return jsonify({'success': True}), 200
     
-    global current_reference_landmarks, current_reference_sequence, reference_fps, current_reference_index
-    
     try:
         payload = request.get_json()
         if not payload:
@@ -1099,67 +1588,23 @@ def set_reference_video_http():
             return jsonify({'success': False, 'message': f'Video no encontrado en rutas esperadas. Buscado: {video_name} en condition {condition}'}), 404
         
         print(f"INFO: Abriendo video de referencia: {video_path}")
-        # Abrir el video
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
-            print(f"ERROR: No se pudo abrir el video: {video_path}")
-            return jsonify({'success': False, 'message': f'No se pudo abrir el video: {video_path.name}'}), 400
-        
-        # Configurar muestreo - extraer más frames para mejor detección
-        video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
         target_fps = float(payload.get('target_fps', 3))  # Aumentado de 2 a 3 fps
-        reference_fps = max(1, int(target_fps))
-        step = max(1, int(round(video_fps / target_fps)))
-        
-        seq = []
-        frame_idx = 0
-        max_samples = 600  # Duplicado de 300 a 600
-        samples = 0
-        skipped = 0  # Contador de frames sin detección
-        
-        print(f"Procesando video de referencia: {video_path}")
-        print(f"Video FPS: {video_fps}, Target FPS: {target_fps}, Step: {step}")
-        
-        # Usar confianza más baja para detectar más poses
-        local_pose = mp.solutions.pose.Pose(static_image_mode=True, model_complexity=1,
-                                            min_detection_confidence=0.4)  # Reducido de 0.6 a 0.4
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_idx % step == 0:
-                # Procesar con MediaPipe
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = local_pose.process(frame_rgb)
-                if results.pose_landmarks:
-                    landmarks = [coord for landmark in results.pose_landmarks.landmark
-                                 for coord in [landmark.x, landmark.y, landmark.z]]
-                    seq.append(landmarks)
-                    samples += 1
-                    if samples >= max_samples:
-                        print(f"Límite de {max_samples} muestras alcanzado")
-                        break
-                else:
-                    skipped += 1
-            
-            frame_idx += 1
-        
-        print(f"Extracción completa - Frames procesados: {frame_idx}, Detecciones: {samples}, Sin detección: {skipped}")
-    
-        cap.release()
         try:
-            local_pose.close()
-        except Exception:
-            pass
+            entry = reference_cache.get(video_path, target_fps=target_fps)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return jsonify({'success': False, 'message': str(e)}), 400
+        seq = entry['sequence']
+        print(f"Referencia obtenida ({entry['origen']}): {len(seq)} frames")
         
-        if not seq:
+        if not len(seq):
             return jsonify({'success': False, 'message': 'No se detectaron landmarks en el video'}), 400
         
         # Guardar secuencia y primera referencia
-        current_reference_sequence = seq
-        current_reference_landmarks = seq[0]
-        current_reference_index = 0
+        session = get_http_session()
+        with session.lock:
+            session.set_reference_sequence(seq, target_fps)
+            reference_fps = session.reference_fps
         
         print(f"Video de referencia establecido: {len(seq)} frames extraídos")
         
@@ -1181,27 +1626,92 @@ def sync_reference_time_http():
         return jsonify({'success': True}), 200
     """Endpoint HTTP para sincronizar tiempo del video (para app móvil).
     Espera JSON: {'current_time': seconds}
-    Actualiza current_reference_index basado en el tiempo.
+    Actualiza el índice de referencia de la sesión basado en el tiempo.
     """
-    global current_reference_index, reference_fps
     try:
         payload = request.get_json()
         if not payload:
             return jsonify({'success': False}), 400
         
-        t = float(payload.get('current_time', 0))
-        idx = int(round(t * reference_fps))
-        current_reference_index = max(0, idx)
+        session = get_http_session()
+        index = session.sync_time(payload.get('current_time', 0))
         
-        return jsonify({'success': True, 'index': current_reference_index})
+        return jsonify({'success': True, 'index': index, 'alignment': session.alignment})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+def set_session_alignment(session, mode):
+    """Cambia el modo de alineación de la sesión ('auto' o 'sync'). Devuelve False si no es válido."""
+    if mode not in ('auto', 'sync'):
+        return False
+    with session.lock:
+        session.alignment = mode
+    return True
+
+
+@app.route('/api/set_alignment_mode', methods=['POST', 'OPTIONS'])
+def set_alignment_mode_http():
+    """Espera JSON: {'mode': 'auto' | 'sync'}. En 'auto' el servidor busca la fase de la
+    referencia y las llamadas a /api/sync_reference_time se ignoran."""
+    if request.method == 'OPTIONS':
+        return jsonify({'success': True}), 200
+    try:
+        payload = request.get_json(silent=True) or {}
+        session = get_http_session()
+        if not set_session_alignment(session, payload.get('mode')):
+            return jsonify({'success': False, 'message': "mode debe ser 'auto' o 'sync'"}), 400
+        return jsonify({'success': True, 'alignment': session.alignment})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/live', methods=['GET'])
 @app.route('/api/ping', methods=['GET'])
 def ping():
-    print("[PING] /api/ping llamado")
-    return jsonify({'success': True, 'message': 'pong'})
+    """Liveness: el proceso responde (aunque el arranque no haya terminado o haya fallado)."""
+    return jsonify({'success': True, 'message': 'pong', 'state': boot.state,
+                    'uptime_s': boot.status()['uptime_s'], 'pid': os.getpid()})
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness: 200 cuando el modelo y los grafos Pose están cargados y calentados,
+    503 mientras arranca o si una etapa obligatoria falló. Incluye los tiempos por etapa."""
+    status = boot.status()
+    return jsonify({'success': status['ready'], 'pid': os.getpid(), **status}), 200 if status['ready'] else 503
+
+@app.route('/api/warmup_status', methods=['GET'])
+def warmup_status():
+    """Progreso del precalentamiento de referencias del dataset."""
+    return jsonify({'success': True, 'warmup': reference_warmup.status(), 'cache': reference_cache.stats()})
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_status():
+    """Métricas de rendimiento del servidor."""
+    return jsonify({'success': True,
+                    'pose_pools': {'tracking': tracking_pose_pool.stats(),
+                                   'estatico': static_pose_pool.stats(),
+                                   'alquiler_tracking': lease_totals.stats()},
+                    'clasificador': posture_batcher.stats() if posture_batcher is not None else {'micro_lotes': False},
+                    'motor_clasificador': 'compilado' if compiled_forest is not None else 'scikit-learn',
+                    'compuerta_movimiento': {'activa': MOTION_GATE, **gate_totals.stats()},
+                    'canal_stream': evaluation_channel.stats(),
+                    'camara_local': video_pipeline.stats() if video_pipeline is not None else None,
+                    'suscripciones_video': video_subscriptions.stats()})
+
+@app.route('/api/sessions', methods=['GET'])
+def sessions_status():
+    """Sesiones activas y contadores de desalojo."""
+    return jsonify({'success': True, **sessions.stats()})
+
+@app.route('/api/jitter', methods=['GET'])
+def jitter_status():
+    """Jitter por articulación (crudo y filtrado) de los buffers de suavizado de la sesión."""
+    session = get_http_session()
+    return jsonify({'success': True,
+                    'session_id': session.session_id,
+                    'stream': session.stream_smoother.jitter_stats(per_joint=True),
+                    'http': session.http_smoother.jitter_stats(per_joint=True)})
 
 @app.route('/api/reference_landmarks', methods=['GET'])
 def get_reference_landmarks():
@@ -1209,35 +1719,85 @@ def get_reference_landmarks():
     Si hay una secuencia cargada, devuelve el frame actual; si no, intenta un landmark único.
     """
     try:
-        global current_reference_sequence, current_reference_index, current_reference_landmarks, reference_fps
-        if current_reference_sequence:
-            idx = min(max(0, current_reference_index), len(current_reference_sequence)-1)
-            ref = current_reference_sequence[idx]
+        session = get_http_session()
+        if session.reference_sequence:
+            seq = session.reference_sequence
+            idx = min(max(0, session.reference_index), len(seq)-1)
+            ref = to_lists(seq[idx])
             return jsonify({'success': True,
                             'landmarks': ref,
                             'index': idx,
-                            'ref_fps': reference_fps})
-        elif current_reference_landmarks:
+                            'ref_fps': session.reference_fps})
+        elif session.reference_landmarks is not None:
             return jsonify({'success': True,
-                            'landmarks': current_reference_landmarks,
+                            'landmarks': to_lists(session.reference_landmarks),
                             'index': 0,
-                            'ref_fps': reference_fps})
+                            'ref_fps': session.reference_fps})
         else:
             return jsonify({'success': False, 'message': 'No reference loaded'}), 404
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+def warm_pose_graphs():
+    """Etapa 'grafos_pose': crea POSE_WARM_GRAPHS grafos de cada pool y les pasa un frame
+    sintético, para que la primera petición real no pague la inicialización de MediaPipe."""
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    for pool in (tracking_pose_pool, static_pose_pool):
+        graphs = [pool.acquire() for _ in range(POSE_WARM_GRAPHS)]
+        try:
+            for graph in graphs:
+                graph.process(blank)
+        finally:
+            for graph in graphs:
+                pool.release(graph)
+
+
+def warmup_inference():
+    """Etapa 'calentamiento': recorre una vez el camino de una petición con datos sintéticos
+    (JPEG -> decodificación -> Pose -> clasificador -> evaluación) antes de declarar listo."""
+    ok, jpeg = cv2.imencode('.jpg', np.zeros((480, 640, 3), dtype=np.uint8))
+    frame = decode_image_bytes(jpeg.tobytes()) if ok else None
+    if frame is None:
+        raise RuntimeError('No se pudo codificar/decodificar el frame sintético')
+    with static_pose_pool.checkout() as graph:
+        classify_posture(frame, graph)
+    # La imagen vacía no produce landmarks: forzar el clasificador y la evaluación
+    # con un esqueleto sintético (todas las articulaciones en el centro del encuadre)
+    landmarks = np.full((33, 4), 0.5, dtype=np.float32)
+    posture = predict_landmarks(landmarks)
+    if posture is None:
+        raise RuntimeError('El clasificador no devolvió etiqueta en el calentamiento')
+    evaluate_posture(landmarks, posture)
+
+
+def start_reference_warmup():
+    if os.environ.get('WARMUP_ON_START', '1') != '0':
+        print("[BOOT] Precalentando referencias del dataset en segundo plano...")
+        reference_warmup.start()
+
+
+boot.stage('importaciones', import_heavy_modules)
+boot.stage('modelo', load_model)
+boot.stage('bosque_compilado', load_compiled_forest, required=False)
+boot.stage('servicios', create_services)
+boot.stage('grafos_pose', warm_pose_graphs)
+boot.stage('calentamiento', warmup_inference, required=False)
+boot.on_ready(start_reference_warmup)
+
+
 if __name__ == '__main__':
     # Banner de arranque en consola
     print("\n========================================")
     print("Backend Modelo - Flask + SocketIO")
     print("Puerto: 5000 | Host: 0.0.0.0")
-    print("Endpoints principales: /api/ping, /api/video/<dataset>/<video>")
+    print("Endpoints principales: /api/live, /api/ready, /api/video/<dataset>/<video>, /api/warmup_status")
     print("========================================\n")
     # Usar socketio.run para mantener soporte SocketIO + Flask routes HTTP
     try:
-        print("[BOOT] Iniciando servidor...")
+        # Modelo, grafos Pose y calentamiento en segundo plano; el puerto se abre ya
+        boot.start()
+        print("[BOOT] Iniciando servidor (disponibilidad en /api/ready)...")
         socketio.run(app, host='0.0.0.0', port=5000, debug=False, allow_unsafe_werkzeug=True)
     except Exception as e:
         import traceback
@@ -0,0 +1,134 @@
+"""
+Arranque por etapas del servidor.
+
+Importar OpenCV/MediaPipe, cargar el modelo y crear los grafos Pose lleva varios segundos;
+hacerlo al importar `app.py` retrasa la apertura del puerto y un fallo terminaba el proceso
+con `exit(1)`. `BootSequence` ejecuta esas etapas en un hilo en segundo plano mientras el
+servidor ya escucha:
+
+- cada etapa registra su estado ('pendiente', 'en_curso', 'ok', 'error', 'omitida'), cuándo
+  empezó respecto al inicio del proceso y cuánto tardó;
+- una etapa obligatoria que falla detiene el arranque (las siguientes quedan 'omitida') y el
+  servidor queda vivo pero no listo, con el error visible en el estado;
+- una etapa opcional que falla solo deja un aviso;
+- al terminar sin errores se marca como listo y se llaman los callbacks `on_ready`.
+
+`run(until=...)` permite ejecutar solo las primeras etapas: el servidor pre-fork carga el
+modelo en el proceso maestro y cada worker completa el resto tras el fork con `start()`.
+
+`status()` es lo que exponen los endpoints de vida (/api/live) y disponibilidad (/api/ready).
+"""
+
+import threading
+import time
+import traceback
+
+
+class BootSequence:
+    """Etapas de arranque con tiempos, ejecutadas en orden en un hilo de fondo."""
+
+    def __init__(self, t0=None, name='arranque'):
+        self.name = name
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self._stages = []
+        self._on_ready = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self.ready = False
+        self.error = None
+        self.ready_at = None
+
+    def _elapsed_ms(self, since=None):
+        return round((time.perf_counter() - (self.t0 if since is None else since)) * 1000, 1)
+
+    def record(self, name, t_start, t_end=None):
+        """Registra una etapa ya ejecutada fuera de la secuencia (p. ej. importaciones de Flask)."""
+        t_end = time.perf_counter() if t_end is None else t_end
+        with self._lock:
+            self._stages.append({'name': name, 'fn': None, 'required': True, 'state': 'ok',
+                                 'started_ms': round((t_start - self.t0) * 1000, 1),
+                                 'elapsed_ms': round((t_end - t_start) * 1000, 1), 'error': None})
+
+    def stage(self, name, fn, required=True):
+        """Añade una etapa `fn()` al final de la secuencia."""
+        with self._lock:
+            self._stages.append({'name': name, 'fn': fn, 'required': required, 'state': 'pendiente',
+                                 'started_ms': None, 'elapsed_ms': None, 'error': None})
+
+    def on_ready(self, callback):
+        self._on_ready.append(callback)
+
+    def _set(self, stage, **fields):
+        with self._lock:
+            stage.update(fields)
+
+    def run(self, until=None):
+        """Ejecuta las etapas pendientes en el hilo actual. Con `until` se detiene tras esa
+        etapa y devuelve True si no hubo errores; sin él, True si el servidor queda listo."""
+        for stage in [s for s in self._stages if s['state'] == 'pendiente']:
+            if self.error is not None:
+                self._set(stage, state='omitida')
+                continue
+            t_start = time.perf_counter()
+            self._set(stage, state='en_curso', started_ms=self._elapsed_ms())
+            print(f"[BOOT] Etapa '{stage['name']}'...")
+            try:
+                stage['fn']()
+            except Exception as e:
+                self._set(stage, state='error', error=str(e), elapsed_ms=self._elapsed_ms(t_start))
+                if stage['required']:
+                    print(f"[BOOT][ERROR] Falló la etapa '{stage['name']}': {e}")
+                    traceback.print_exc()
+                    self.error = f"{stage['name']}: {e}"
+                else:
+                    print(f"[BOOT][WARN] Etapa opcional '{stage['name']}' falló: {e}")
+            else:
+                self._set(stage, state='ok', elapsed_ms=self._elapsed_ms(t_start))
+                print(f"[BOOT] ✓ {stage['name']} ({stage['elapsed_ms']:.0f} ms)")
+            if stage['name'] == until and self.error is None:
+                return True
+
+        if self.error is None:
+            self.ready_at = self._elapsed_ms()
+            self.ready = True
+            print(f"[BOOT] ✓ Servidor listo en {self.ready_at / 1000:.1f} s")
+            for callback in self._on_ready:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"[BOOT][WARN] Error en callback de arranque: {e}")
+        self._done.set()
+        return self.ready
+
+    def start(self):
+        """Lanza run() en un hilo daemon (una sola vez)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Espera a que termine el arranque. True si quedó listo; False si falló o se agotó
+        `timeout`."""
+        self._done.wait(timeout)
+        return self.ready
+
+    @property
+    def state(self):
+        if self.ready:
+            return 'listo'
+        if self.error is not None:
+            return 'error'
+        return 'arrancando'
+
+    def status(self):
+        with self._lock:
+            stages = [{k: v for k, v in s.items() if k != 'fn'} for s in self._stages]
+        return {'ready': self.ready,
+                'state': self.state,
+                'error': self.error,
+                'uptime_s': round(time.perf_counter() - self.t0, 1),
+                'ready_ms': self.ready_at,
+                'stages': stages}
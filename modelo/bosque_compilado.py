@@ -0,0 +1,241 @@
+"""
+Evaluador compilado del RandomForest de posturas.
+
+Para una sola muestra, `RandomForestClassifier.predict` dedica casi todo su tiempo a validar
+la entrada y a despachar los 400 árboles uno por uno desde Python. Aquí el bosque se aplana
+en arrays NumPy contiguos con todos los nodos de todos los árboles (característica, umbral,
+hijo izquierdo, hijo derecho y probabilidades de la hoja) y se recorre con un índice de nodo
+por (muestra, árbol): en cada nivel se avanzan todos a la vez, así que el coste es
+`profundidad` operaciones vectorizadas, tanto para una muestra como para un lote.
+
+Las hojas apuntan a sí mismas, de modo que basta iterar `max_depth` veces. Las comparaciones
+se hacen como en scikit-learn (entrada convertida a float32 y comparada con el umbral
+float64), por lo que las predicciones coinciden con `modelo.predict`; `check_equivalence` lo
+comprueba sobre un conjunto de muestras.
+
+Se guarda como `.npz` o, para el servidor pre-fork, como `.joblib` sin comprimir: ese formato
+se abre con `mmap_mode='r'` y todos los workers comparten las páginas de los arrays.
+
+Uso:
+    python bosque_compilado.py --modelo modelo_posturas.pkl --salida modelo_compilado.npz \
+        --dataset dataset_posturas.lmk
+"""
+
+import argparse
+import csv
+import os
+
+import numpy as np
+
+from almacen_landmarks import LandmarkStore
+
+FORMAT_VERSION = 1
+
+
+def is_forest(modelo):
+    """True si `modelo` es un bosque de árboles de decisión (RandomForest / ExtraTrees) que se
+    puede aplanar."""
+    estimators = getattr(modelo, 'estimators_', None)
+    return (isinstance(estimators, list) and len(estimators) > 0
+            and all(hasattr(est, 'tree_') for est in estimators))
+
+
+def flatten_forest(modelo):
+    """RandomForestClassifier entrenado -> dict de arrays del bosque aplanado."""
+    trees = [est.tree_ for est in modelo.estimators_]
+    n_classes = len(modelo.classes_)
+    sizes = [t.node_count for t in trees]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+    total = int(sum(sizes))
+
+    feature = np.zeros(total, dtype=np.int32)
+    threshold = np.zeros(total, dtype=np.float64)
+    left = np.zeros(total, dtype=np.int32)
+    right = np.zeros(total, dtype=np.int32)
+    value = np.zeros((total, n_classes), dtype=np.float64)
+    max_depth = 0
+    for t, off in zip(trees, offsets.tolist()):
+        n = t.node_count
+        sl = slice(off, off + n)
+        nodes = np.arange(off, off + n, dtype=np.int32)
+        is_leaf = t.children_left == -1
+        feature[sl] = np.where(is_leaf, 0, t.feature)
+        threshold[sl] = np.where(is_leaf, 0.0, t.threshold)
+        left[sl] = np.where(is_leaf, nodes, t.children_left + off)
+        right[sl] = np.where(is_leaf, nodes, t.children_right + off)
+        # Igual que DecisionTreeClassifier.predict_proba: fracciones por clase normalizadas
+        v = t.value[:, 0, :n_classes].astype(np.float64)
+        norm = v.sum(axis=1, keepdims=True)
+        norm[norm == 0.0] = 1.0
+        value[sl] = v / norm
+        max_depth = max(max_depth, int(t.max_depth))
+    return {'version': np.int32(FORMAT_VERSION),
+            'roots': offsets,
+            'feature': feature,
+            'threshold': threshold,
+            'left': left,
+            'right': right,
+            'value': value,
+            'classes': np.asarray(modelo.classes_),
+            'max_depth': np.int32(max_depth),
+            'n_features': np.int32(modelo.n_features_in_)}
+
+
+class CompiledForest:
+    """Bosque aplanado con predict/predict_proba vectorizados sobre todos los árboles."""
+
+    def __init__(self, arrays):
+        if int(arrays['version']) != FORMAT_VERSION:
+            raise ValueError(f"versión de bosque compilado no soportada: {int(arrays['version'])}")
+        self.roots = np.ascontiguousarray(arrays['roots'], dtype=np.int32)
+        self.feature = np.ascontiguousarray(arrays['feature'], dtype=np.int32)
+        self.threshold = np.ascontiguousarray(arrays['threshold'], dtype=np.float64)
+        self.left = np.ascontiguousarray(arrays['left'], dtype=np.int32)
+        self.right = np.ascontiguousarray(arrays['right'], dtype=np.int32)
+        self.value = np.ascontiguousarray(arrays['value'], dtype=np.float64)
+        self.classes_ = np.asarray(arrays['classes'])
+        self.max_depth = int(arrays['max_depth'])
+        self.n_features = int(arrays['n_features'])
+
+    @classmethod
+    def from_model(cls, modelo):
+        return cls(flatten_forest(modelo))
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Carga un `.npz` o un `.joblib`; en este último `mmap_mode` ('r') mapea los arrays
+        del archivo en lugar de copiarlos en memoria."""
+        if str(path).endswith('.joblib'):
+            import joblib
+            return cls(joblib.load(path, mmap_mode=mmap_mode))
+        with np.load(path, allow_pickle=False) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def arrays(self):
+        return {'version': np.int32(FORMAT_VERSION), 'roots': self.roots, 'feature': self.feature,
+                'threshold': self.threshold, 'left': self.left, 'right': self.right, 'value': self.value,
+                'classes': self.classes_, 'max_depth': np.int32(self.max_depth),
+                'n_features': np.int32(self.n_features)}
+
+    def save(self, path):
+        if str(path).endswith('.joblib'):
+            import joblib
+            joblib.dump(self.arrays(), path)  # sin comprimir: se puede abrir con mmap_mode
+        else:
+            np.savez(path, **self.arrays())
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Índice global de la hoja alcanzada por cada (muestra, árbol): array (n, n_trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f'se esperaban {self.n_features} características, llegaron {X.shape[1]}')
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        return self.value[leaves].sum(axis=1) / self.n_trees
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def check_equivalence(compiled, modelo, X):
+    """Compara `compiled.predict` con `modelo.predict` sobre X. Devuelve (coincidencias, total)."""
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    ours = compiled.predict(X)
+    theirs = modelo.predict(X)
+    return int(np.sum(ours == theirs)), len(X)
+
+
+def probe_samples(n_features, dataset_path=None, n_random=256, seed=0):
+    """Muestras para la comprobación: filas del dataset de entrenamiento (almacén .lmk o CSV)
+    si existe, más ruido alrededor de ellas (o aleatorias si no hay dataset)."""
+    rng = np.random.default_rng(seed)
+    X = None
+    if dataset_path and LandmarkStore.exists(dataset_path):
+        X = np.asarray(LandmarkStore.open(dataset_path).load()['features'][:, :n_features])
+    elif dataset_path and os.path.exists(dataset_path):
+        with open(dataset_path, newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # cabecera
+            X = np.array([row[:n_features] for row in reader if len(row) > n_features],
+                         dtype=np.float32).reshape(-1, n_features)
+    if X is not None:
+        picks = X[rng.integers(0, len(X), n_random)] if len(X) else np.zeros((0, n_features), np.float32)
+        noisy = picks + rng.normal(0.0, 0.05, picks.shape).astype(np.float32)
+        return np.concatenate([X, noisy])
+    return rng.normal(0.0, 1.0, (n_random, n_features)).astype(np.float32)
+
+
+def load_or_export(modelo, path='modelo_compilado.npz', model_path=None, mmap_mode=None):
+    """Carga el bosque compilado de `path` si es más reciente que `model_path`; si no,
+    lo aplana desde `modelo` y lo guarda (y, con `mmap_mode`, lo vuelve a abrir mapeado)."""
+    try:
+        if os.path.exists(path) and (model_path is None or not os.path.exists(model_path)
+                                     or os.path.getmtime(path) >= os.path.getmtime(model_path)):
+            compiled = CompiledForest.load(path, mmap_mode=mmap_mode)
+            if compiled.n_trees == len(modelo.estimators_):
+                return compiled
+    except Exception as e:
+        print(f"[BOSQUE] No se pudo leer {path}: {e}")
+    compiled = CompiledForest.from_model(modelo)
+    try:
+        compiled.save(path)
+        if mmap_mode:
+            compiled = CompiledForest.load(path, mmap_mode=mmap_mode)
+    except Exception as e:
+        print(f"[BOSQUE] No se pudo guardar {path}: {e}")
+    return compiled
+
+
+def main():
+    import time
+    import joblib
+
+    parser = argparse.ArgumentParser(description='Exportar el RandomForest a arrays planos y verificarlo')
+    parser.add_argument('--modelo', default='modelo_posturas.pkl', help='Modelo scikit-learn entrenado')
+    parser.add_argument('--salida', default='modelo_compilado.npz', help='Archivo .npz de salida')
+    parser.add_argument('--dataset', default='dataset_posturas.lmk',
+                        help='Almacén .lmk (o CSV) de muestras para comprobar equivalencia')
+    args = parser.parse_args()
+
+    modelo = joblib.load(args.modelo)
+    compiled = CompiledForest.from_model(modelo)
+    compiled.save(args.salida)
+    print(f"Bosque exportado a {args.salida}: {compiled.n_trees} árboles, {compiled.n_nodes} nodos, "
+          f"profundidad {compiled.max_depth}")
+
+    X = probe_samples(compiled.n_features, args.dataset)
+    ok, total = check_equivalence(compiled, modelo, X)
+    print(f"Predicciones idénticas: {ok}/{total}")
+
+    sample = X[:1]
+    for name, fn in (('scikit-learn', modelo.predict), ('compilado', compiled.predict)):
+        fn(sample)
+        t0 = time.perf_counter()
+        for _ in range(50):
+            fn(sample)
+        print(f"  {name}: {(time.perf_counter() - t0) / 50 * 1000:.2f} ms por muestra")
+    if ok != total:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
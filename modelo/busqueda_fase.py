@@ -0,0 +1,116 @@
+"""
+Búsqueda automática de la fase de la referencia que corresponde a los últimos frames del usuario.
+
+En vez de depender de que el cliente envíe `sync_reference_time`, se busca en toda la
+secuencia de referencia el tramo que mejor encaja con el buffer reciente del usuario
+(subsequence matching). Para que sea barato hacerlo en cada frame:
+
+- Cada frame se reduce a un vector de XY centrado en la pelvis y escalado por el torso.
+- La DTW exacta se restringe a una banda Sakoe-Chiba de ancho `band`.
+- Antes de calcularla, una cota inferior LB_Keogh (distancia de cada frame del usuario a la
+  envolvente min/max de la referencia en ±band) descarta los candidatos que no pueden
+  mejorar al mejor encontrado. Las cotas de todos los candidatos se calculan vectorizadas.
+"""
+
+import numpy as np
+
+from landmarks_compactos import ReferenceSequence, as_sequence, torso_normalized
+
+
+def pose_features(frames):
+    """Frames (listas planas, arrays (33, 4) o ReferenceSequence) -> (T, 66) XY centrado en la
+    pelvis y escalado por el torso."""
+    if isinstance(frames, ReferenceSequence):
+        feats = frames.normalized
+    else:
+        feats, _ = torso_normalized(as_sequence(frames)[:, :, :2])
+    return feats.reshape(len(feats), -1)
+
+
+def banded_dtw(query, candidate, band, best_so_far=np.inf):
+    """DTW con banda Sakoe-Chiba entre dos secuencias de vectores (distancia euclídea por frame).
+    Abandona en cuanto una fila entera supera `best_so_far` y devuelve inf."""
+    n, m = len(query), len(candidate)
+    cost = np.linalg.norm(query[:, None, :] - candidate[None, :, :], axis=2).tolist()
+    inf = float('inf')
+    prev = [inf] * (m + 1)
+    prev[0] = 0.0
+    for i in range(1, n + 1):
+        row = [inf] * (m + 1)
+        lo = max(1, i - band)
+        hi = min(m, i + band)
+        row_min = inf
+        for j in range(lo, hi + 1):
+            best = min(prev[j - 1], prev[j], row[j - 1])
+            if best < inf:
+                row[j] = cost[i - 1][j - 1] + best
+                if row[j] < row_min:
+                    row_min = row[j]
+        if row_min >= best_so_far:
+            return inf
+        prev = row
+    return prev[m]
+
+
+class PhaseSearcher:
+    """Busca en una secuencia de referencia la fase que mejor encaja con el buffer del usuario."""
+
+    def __init__(self, reference_frames, band=2):
+        self.band = max(0, int(band))
+        self.features = pose_features(reference_frames)
+        # Envolvente de Keogh sobre toda la secuencia: min/max en [t - band, t + band]
+        n = len(self.features)
+        self.upper = self.features.copy()
+        self.lower = self.features.copy()
+        for k in range(1, self.band + 1):
+            self.upper[:n - k] = np.maximum(self.upper[:n - k], self.features[k:])
+            self.upper[k:] = np.maximum(self.upper[k:], self.features[:n - k])
+            self.lower[:n - k] = np.minimum(self.lower[:n - k], self.features[k:])
+            self.lower[k:] = np.minimum(self.lower[k:], self.features[:n - k])
+        self.searches = 0
+        self.candidates = 0
+        self.dtw_computed = 0
+
+    def __len__(self):
+        return len(self.features)
+
+    def lower_bounds(self, query):
+        """LB_Keogh de `query` (m, D) para cada inicio s en [0, T - m]."""
+        m = len(query)
+        n_cand = len(self.features) - m + 1
+        lb = np.zeros(n_cand)
+        for i in range(m):
+            q = query[i]
+            up = self.upper[i:i + n_cand]
+            low = self.lower[i:i + n_cand]
+            excess = np.where(q > up, q - up, np.where(q < low, low - q, 0.0))
+            lb += np.sqrt((excess ** 2).sum(axis=1))
+        return lb
+
+    def search(self, user_frames):
+        """Devuelve (índice de referencia alineado con el último frame del usuario, coste DTW),
+        o (None, inf) si la consulta es más larga que la referencia."""
+        query = pose_features(user_frames)
+        m = len(query)
+        if m == 0 or m > len(self.features):
+            return None, float('inf')
+        lb = self.lower_bounds(query)
+        order = np.argsort(lb, kind='stable')
+        best_start, best_cost = None, float('inf')
+        computed = 0
+        for s in order.tolist():
+            if lb[s] >= best_cost:
+                break  # el resto de candidatos tiene cota aún mayor
+            cost = banded_dtw(query, self.features[s:s + m], self.band, best_cost)
+            computed += 1
+            if cost < best_cost:
+                best_start, best_cost = s, cost
+        self.searches += 1
+        self.candidates += len(lb)
+        self.dtw_computed += computed
+        return best_start + m - 1, best_cost
+
+    def stats(self):
+        return {'searches': self.searches,
+                'band': self.band,
+                'pruned_ratio': round(1.0 - self.dtw_computed / self.candidates, 3) if self.candidates else 0.0}
@@ -0,0 +1,111 @@
+"""
+Caché incremental de landmarks por archivo del dataset de entrenamiento.
+
+Cada imagen o video de `dataset/<condición>/` se identifica por el hash SHA-1 de su
+contenido, no por su ruta: renombrar o mover un archivo no obliga a reprocesarlo y un
+archivo modificado se vuelve a extraer aunque conserve el nombre. Las filas de landmarks
+normalizadas de cada archivo, con su frame, segundo y confianza del detector, se guardan en
+`cache_dataset/<hash>_<parámetros>.npz`, donde los parámetros (fps, ancho de decodificación,
+versión de la normalización) forman parte del nombre para que cambiar `--fps` no mezcle
+resultados.
+
+Para no leer todos los videos en cada ejecución solo para hashearlos, `index.json` recuerda
+el hash de cada ruta junto a su tamaño y mtime; si no cambian, se reutiliza el hash.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIR = Path('cache_dataset')
+CACHE_VERSION = 3  # 3: los videos del pool guardan también frame y confianza
+INDEX_FILE = 'index.json'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-1 del contenido del archivo, leído por bloques."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DatasetCache:
+    """Filas de landmarks por archivo, indexadas por hash de contenido y parámetros de extracción."""
+
+    def __init__(self, cache_dir=CACHE_DIR, **params):
+        self.cache_dir = Path(cache_dir)
+        self.params = dict(params, version=CACHE_VERSION)
+        self.tag = hashlib.sha1(json.dumps(self.params, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self._index = {}
+        self._index_dirty = False
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(self.cache_dir / INDEX_FILE, encoding='utf-8') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def digest(self, path):
+        """Hash del contenido, reutilizando el del índice si tamaño y mtime no cambiaron."""
+        st = os.stat(path)
+        key = str(Path(path).resolve())
+        entry = self._index.get(key)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['sha1']
+        digest = file_digest(path)
+        self._index[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': digest}
+        self._index_dirty = True
+        return digest
+
+    def _entry_path(self, digest):
+        return self.cache_dir / f'{digest}_{self.tag}.npz'
+
+    def get(self, path):
+        """Dict {'rows' (n, 99), 'frames', 'timestamps', 'confidences'} guardado para el archivo,
+        o None si no está en caché. Un archivo sin detecciones se guarda con n = 0 y también
+        cuenta como acierto."""
+        entry = self._entry_path(self.digest(path))
+        if entry.exists():
+            try:
+                with np.load(entry) as data:
+                    result = {k: data[k] for k in ('rows', 'frames', 'timestamps', 'confidences')}
+                self.hits += 1
+                return result
+            except Exception as e:
+                print(f"[CACHE] Entrada corrupta {entry.name}: {e}")
+        self.misses += 1
+        return None
+
+    def put(self, path, rows, frames=None, timestamps=None, confidences=None):
+        entry = self._entry_path(self.digest(path))
+        n = len(rows)
+        rows = np.asarray(rows, dtype=np.float64).reshape(n, -1) if n else np.zeros((0, 99))
+        frames = np.full(n, -1, np.int32) if frames is None else np.asarray(frames, dtype=np.int32)
+        timestamps = np.full(n, np.nan) if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+        confidences = np.full(n, np.nan) if confidences is None else np.asarray(confidences, dtype=np.float64)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = entry.with_suffix('.tmp.npz')
+            np.savez(tmp, rows=rows, frames=frames, timestamps=timestamps, confidences=confidences)
+            os.replace(tmp, entry)
+        except Exception as e:
+            print(f"[CACHE] No se pudo guardar {entry.name}: {e}")
+
+    def save_index(self):
+        if not self._index_dirty:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_dir / (INDEX_FILE + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+            os.replace(tmp, self.cache_dir / INDEX_FILE)
+            self._index_dirty = False
+        except Exception as e:
+            print(f"[CACHE] No se pudo guardar el índice: {e}")
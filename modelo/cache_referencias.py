@@ -0,0 +1,254 @@
+"""
+Caché persistente de secuencias de landmarks de videos de referencia.
+
+Cada secuencia extraída se guarda en disco como un archivo binario compacto (.npz con
+float32, frames (T, 33, 4)) cuyo nombre depende de la ruta del video, `target_fps` y `max_samples`. Junto a
+los datos se guardan el tamaño y el mtime del video: si el archivo cambia, la entrada se
+invalida automáticamente y se vuelve a extraer. Encima del disco hay una capa LRU en
+memoria para servir al instante las referencias más usadas; en memoria cada entrada es una
+`ReferenceSequence` compartida por todas las sesiones que usan ese video.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from decodificador import DecodeStats, iter_sampled_frames
+from landmarks_compactos import FRAME_SHAPE, ReferenceSequence, as_sequence, frame_from_results
+
+CACHE_DIR = Path('cache_landmarks')
+CACHE_VERSION = 2
+DEFAULT_MAX_SAMPLES = 600
+
+
+def create_reference_pose():
+    """Grafo MediaPipe en modo imagen estática usado para extraer referencias."""
+    # Usar confianza más baja para detectar más poses
+    return mp.solutions.pose.Pose(static_image_mode=True, model_complexity=1,
+                                  min_detection_confidence=0.4)
+
+
+def extract_reference_sequence(video_path, target_fps=3, max_samples=DEFAULT_MAX_SAMPLES, pose=None):
+    """Extrae landmarks muestreados a `target_fps` de un video.
+    Devuelve (frames, timestamps): frames es un array (T, 33, 4) float32 [x,y,z,visibility]
+    y timestamps los segundos de cada muestra.
+    Si se pasa `pose` se reutiliza ese grafo; si no, se crea y se cierra uno local.
+    Lanza ValueError si el video no se puede abrir.
+    """
+    stats = DecodeStats()
+    frames = iter_sampled_frames(video_path, target_fps=target_fps, stats=stats)
+
+    seq = []
+    timestamps = []
+    samples = 0
+    skipped = 0  # Contador de frames sin detección
+
+    print(f"Procesando video de referencia: {video_path}")
+    print(f"Video FPS: {stats.video_fps}, Target FPS: {target_fps}, Step: {stats.step}")
+
+    local_pose = pose if pose is not None else create_reference_pose()
+    try:
+        for frame_idx, timestamp, frame in frames:
+            # Procesar con MediaPipe
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            results = local_pose.process(frame_rgb)
+            if results.pose_landmarks:
+                seq.append(frame_from_results(results.pose_landmarks))
+                timestamps.append(timestamp)
+                samples += 1
+                if samples >= max_samples:
+                    print(f"Límite de {max_samples} muestras alcanzado")
+                    break
+            else:
+                skipped += 1
+    finally:
+        frames.close()
+        if pose is None:
+            try:
+                local_pose.close()
+            except Exception:
+                pass
+
+    print(f"Extracción completa - Frames procesados: {stats.frames_read}, Detecciones: {samples}, Sin detección: {skipped}")
+    print(f"Decodificación: {stats}")
+    frames = np.stack(seq) if seq else np.zeros((0,) + FRAME_SHAPE, dtype=np.float32)
+    return frames, timestamps
+
+
+class ReferenceCache:
+    """Caché de dos niveles (memoria LRU + disco) para secuencias de referencia.
+
+    `get()` devuelve un dict {'sequence': ReferenceSequence, 'timestamps': array, 'origen': str}
+    donde origen es 'memoria', 'disco' o 'extraccion'. El extractor puede devolver listas
+    planas [x,y,z,...] o arrays (T, 33, 4).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_memory_entries=32, extractor=extract_reference_sequence):
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_entries = max(1, int(max_memory_entries))
+        self.extractor = extractor
+        self._memory = OrderedDict()   # clave -> (size, mtime_ns, ReferenceSequence)
+        self._lock = threading.Lock()
+        self._key_locks = {}           # evita extraer dos veces el mismo video en paralelo
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(video_path, target_fps, max_samples):
+        resolved = str(Path(video_path).resolve())
+        return (resolved, round(float(target_fps), 3), int(max_samples))
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1('|'.join(str(k) for k in key).encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{digest}.npz'
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def _remember(self, key, size, mtime_ns, sequence):
+        with self._lock:
+            self._memory[key] = (size, mtime_ns, sequence)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key, size, mtime_ns):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] != size or entry[1] != mtime_ns:
+                # El video cambió: invalidar
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry
+
+    def _disk_valid(self, key, size, mtime_ns):
+        path = self._disk_path(key)
+        if not path.exists():
+            return False
+        try:
+            # np.load es perezoso: solo se leen los campos de cabecera
+            with np.load(path) as data:
+                return (int(data['version']) == CACHE_VERSION and int(data['video_size']) == size
+                        and int(data['video_mtime_ns']) == mtime_ns)
+        except Exception:
+            return False
+
+    def _load_disk(self, key, size, mtime_ns):
+        path = self._disk_path(key)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                if (int(data['version']) != CACHE_VERSION or int(data['video_size']) != size
+                        or int(data['video_mtime_ns']) != mtime_ns):
+                    stale = True
+                else:
+                    stale = False
+                    frames = data['frames']
+                    timestamps = data['timestamps']
+        except Exception as e:
+            print(f"[CACHE] Entrada corrupta {path.name}: {e}")
+            stale = True
+        if stale:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        return ReferenceSequence(frames, timestamps)
+
+    def _save_disk(self, key, size, mtime_ns, sequence):
+        path = self._disk_path(key)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Un temporal por proceso: varios workers pueden guardar la misma referencia a la vez
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp.npz')
+            np.savez(tmp,
+                     version=np.int64(CACHE_VERSION),
+                     video=np.array(key[0]),
+                     target_fps=np.float64(key[1]),
+                     video_size=np.int64(size),
+                     video_mtime_ns=np.int64(mtime_ns),
+                     frames=sequence.frames,
+                     timestamps=sequence.timestamps.astype(np.float32))
+            # Escritura atómica para no dejar archivos a medias si el proceso muere
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[CACHE] No se pudo guardar {path.name}: {e}")
+
+    def get(self, video_path, target_fps=3, max_samples=DEFAULT_MAX_SAMPLES):
+        st = os.stat(video_path)
+        size, mtime_ns = st.st_size, st.st_mtime_ns
+        key = self._key(video_path, target_fps, max_samples)
+
+        entry = self._from_memory(key, size, mtime_ns)
+        if entry is not None:
+            self.hits_memory += 1
+            return {'sequence': entry[2], 'timestamps': entry[2].timestamps, 'origen': 'memoria'}
+
+        with self._key_lock(key):
+            # Otro hilo pudo haberla cargado mientras esperábamos
+            entry = self._from_memory(key, size, mtime_ns)
+            if entry is not None:
+                self.hits_memory += 1
+                return {'sequence': entry[2], 'timestamps': entry[2].timestamps, 'origen': 'memoria'}
+
+            sequence = self._load_disk(key, size, mtime_ns)
+            if sequence is not None:
+                self.hits_disk += 1
+                origen = 'disco'
+            else:
+                self.misses += 1
+                landmarks, timestamps = self.extractor(video_path, target_fps=target_fps,
+                                                       max_samples=max_samples)
+                sequence = ReferenceSequence(as_sequence(landmarks), timestamps)
+                self._save_disk(key, size, mtime_ns, sequence)
+                origen = 'extraccion'
+
+            self._remember(key, size, mtime_ns, sequence)
+            return {'sequence': sequence, 'timestamps': sequence.timestamps, 'origen': origen}
+
+    def store(self, video_path, landmarks, timestamps, target_fps=3, max_samples=DEFAULT_MAX_SAMPLES):
+        """Guarda una secuencia extraída fuera de la caché (p. ej. en otro proceso)."""
+        st = os.stat(video_path)
+        key = self._key(video_path, target_fps, max_samples)
+        sequence = ReferenceSequence(as_sequence(landmarks), timestamps)
+        with self._key_lock(key):
+            self._save_disk(key, st.st_size, st.st_mtime_ns, sequence)
+            self._remember(key, st.st_size, st.st_mtime_ns, sequence)
+
+    def contains(self, video_path, target_fps=3, max_samples=DEFAULT_MAX_SAMPLES):
+        """Indica si hay una entrada válida (memoria o disco) sin extraer nada."""
+        st = os.stat(video_path)
+        key = self._key(video_path, target_fps, max_samples)
+        if self._from_memory(key, st.st_size, st.st_mtime_ns) is not None:
+            return True
+        return self._disk_valid(key, st.st_size, st.st_mtime_ns)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._memory)
+        return {'memory_entries': entries,
+                'max_memory_entries': self.max_memory_entries,
+                'hits_memory': self.hits_memory,
+                'hits_disk': self.hits_disk,
+                'misses': self.misses}
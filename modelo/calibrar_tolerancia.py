@@ -1,6 +1,11 @@
 """
 Script de calibración: extrae landmarks de un video y los compara consigo mismos
 para obtener métricas de distancia mínima esperada y recomendaciones de tolerancia.
+
+Los landmarks extraídos se guardan en el almacén binario `calibracion_<fps>fps.lmk`: volver a
+calibrar el mismo video los lee de ahí al instante en lugar de pasarlo otra vez por MediaPipe.
+El almacén recuerda el tamaño y mtime de cada video; si el archivo cambió, sus filas se
+borran y se vuelve a extraer.
 """
 
 import cv2
@@ -8,41 +13,57 @@ import mediapipe as mp
 import numpy as np
 from pathlib import Path
 import statistics
+from decodificador import DecodeStats, iter_sampled_frames
+from almacen_landmarks import LandmarkStore
 
 # Configurar MediaPipe
 mp_pose = mp.solutions.pose
 pose = mp_pose.Pose(min_detection_confidence=0.5)
 
 def extract_landmarks_from_video(video_path, target_fps=2):
-    """Extrae landmarks de un video muestreado."""
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
+    """Extrae landmarks de un video muestreado. Devuelve (landmarks, frames, timestamps)."""
+    stats = DecodeStats()
+    try:
+        frames = iter_sampled_frames(video_path, target_fps=target_fps, stats=stats)
+    except ValueError:
         print(f"❌ No se pudo abrir {video_path}")
-        return []
-    
-    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    step = max(1, int(round(video_fps / target_fps)))
+        return [], [], []
     
     seq = []
-    frame_idx = 0
+    frame_ids = []
+    timestamps = []
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        if frame_idx % step == 0:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(frame_rgb)
-            
-            if results.pose_landmarks:
-                landmarks = [coord for landmark in results.pose_landmarks.landmark
-                           for coord in [landmark.x, landmark.y, landmark.z]]
-                seq.append(landmarks)
+    for frame_idx, timestamp, frame in frames:
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = pose.process(frame_rgb)
         
-        frame_idx += 1
-    
-    cap.release()
+        if results.pose_landmarks:
+            landmarks = [coord for landmark in results.pose_landmarks.landmark
+                       for coord in [landmark.x, landmark.y, landmark.z]]
+            seq.append(landmarks)
+            frame_ids.append(frame_idx)
+            timestamps.append(timestamp)
+    
+    print(f"   Decodificación: {stats}")
+    return seq, frame_ids, timestamps
+
+def load_landmarks(video_path, target_fps=2):
+    """Landmarks del video desde el almacén de calibración; si no están o el video cambió
+    (tamaño o mtime distintos), los extrae y reemplaza sus filas."""
+    store = LandmarkStore(f'calibracion_{target_fps}fps.lmk', normalized=False)
+    source = Path(video_path).resolve().as_posix()
+    st = Path(video_path).stat()
+    stamp = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if store.stamp(source) == stamp:
+        data = store.load(sources=[source])
+        order = np.argsort(data['frames'], kind='stable')
+        print(f"   Leídos del almacén {store.path.name}")
+        return data['features'][order].tolist()
+    if store.remove_sources([source]):
+        print(f"   El video cambió: se descartan sus landmarks de {store.path.name}")
+    seq, frame_ids, timestamps = extract_landmarks_from_video(video_path, target_fps=target_fps)
+    store.append(seq, Path(video_path).parent.name, sources=source, frames=frame_ids, timestamps=timestamps)
+    store.set_stamp(source, stamp)
     return seq
 
 def calc_distance(lm1, lm2):
@@ -62,7 +83,7 @@ def calc_distance(lm1, lm2):
 def calibrate_from_video(video_path):
     """Prueba: compara frames del mismo video entre sí."""
     print(f"\n📹 Extrayendo landmarks de {Path(video_path).name}...")
-    landmarks_seq = extract_landmarks_from_video(video_path, target_fps=2)
+    landmarks_seq = load_landmarks(video_path, target_fps=2)
     
     if len(landmarks_seq) < 2:
         print("❌ No se extrajeron suficientes frames.")
@@ -0,0 +1,128 @@
+"""
+Canal de evaluación continua por Socket.IO con descarte de frames atrasados.
+
+En lugar de que el teléfono abra una petición HTTP cada 1.5 s, envía frames por una
+conexión persistente tan rápido como quiera. Cada cliente tiene un único hueco "pendiente":
+si llega un frame nuevo mientras el anterior sigue esperando, el viejo se descarta y se
+procesa siempre el más reciente. Como mucho hay un frame en proceso por cliente, así que
+la frecuencia de feedback la marca la capacidad del servidor y no un temporizador.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _ClientSlot:
+    __slots__ = ('pending', 'busy', 'received', 'processed', 'dropped')
+
+    def __init__(self):
+        self.pending = None     # (item, t_llegada) del frame más reciente sin procesar
+        self.busy = False       # True mientras un hilo drena este cliente
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+
+
+class LatestFrameChannel:
+    """Reparte frames por cliente entre `workers` hilos, procesando solo el más reciente.
+
+    `process_fn(client_id, item, dropped)` se llama fuera de cualquier lock; `dropped` es el
+    número de frames descartados de ese cliente desde el último procesado.
+    """
+
+    def __init__(self, process_fn, workers=4, name='canal'):
+        self.process_fn = process_fn
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)),
+                                            thread_name_prefix=f'canal-{name}')
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=2000)   # llegada -> fin de proceso (segundos)
+        self._completions = deque(maxlen=5000)
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def submit(self, client_id, item):
+        """Encola `item` como el frame pendiente del cliente. Devuelve True si sustituyó
+        a otro frame que aún no se había empezado a procesar."""
+        now = time.perf_counter()
+        with self._lock:
+            slot = self._clients.get(client_id)
+            if slot is None:
+                slot = self._clients[client_id] = _ClientSlot()
+            replaced = slot.pending is not None
+            if replaced:
+                slot.dropped += 1
+                self.dropped += 1
+            slot.pending = (item, now)
+            slot.received += 1
+            self.received += 1
+            start = not slot.busy
+            if start:
+                slot.busy = True
+        if start:
+            self._executor.submit(self._drain, client_id, slot)
+        return replaced
+
+    def _drain(self, client_id, slot):
+        last_dropped = slot.dropped
+        while True:
+            with self._lock:
+                if slot.pending is None or self._clients.get(client_id) is not slot:
+                    slot.busy = False
+                    slot.pending = None
+                    return
+                (item, t_arrival), slot.pending = slot.pending, None
+                dropped, last_dropped = slot.dropped - last_dropped, slot.dropped
+            try:
+                self.process_fn(client_id, item, dropped)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"[CANAL] Error procesando frame de {client_id}: {e}")
+            done = time.perf_counter()
+            with self._lock:
+                slot.processed += 1
+                self.processed += 1
+                self._latencies.append(done - t_arrival)
+                self._completions.append(done)
+
+    def remove(self, client_id):
+        """Olvida al cliente; un frame pendiente suyo ya no se procesará."""
+        with self._lock:
+            self._clients.pop(client_id, None)
+
+    def client_stats(self, client_id):
+        with self._lock:
+            slot = self._clients.get(client_id)
+            if slot is None:
+                return None
+            return {'received': slot.received, 'processed': slot.processed,
+                    'dropped': slot.dropped, 'busy': slot.busy}
+
+    def stats(self, window_s=10.0):
+        now = time.perf_counter()
+        with self._lock:
+            lat = sorted(self._latencies)
+            recent = sum(1 for t in self._completions if now - t <= window_s)
+            clients = len(self._clients)
+            received, processed, dropped, errors = self.received, self.processed, self.dropped, self.errors
+
+        def pct(p):
+            return round(1000.0 * lat[min(len(lat) - 1, int(p * len(lat)))], 2) if lat else None
+        return {'clients': clients,
+                'received': received,
+                'processed': processed,
+                'dropped': dropped,
+                'errors': errors,
+                'drop_rate': round(dropped / received, 3) if received else 0.0,
+                'evaluations_per_s': round(recent / window_s, 2),
+                'latency_ms_p50': pct(0.50),
+                'latency_ms_p99': pct(0.99)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
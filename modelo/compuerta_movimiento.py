@@ -0,0 +1,141 @@
+"""
+Clasificación con compuerta de movimiento e histéresis temporal.
+
+Mientras el paciente mantiene la postura, reclasificar cada frame solo gasta CPU y hace que
+la etiqueta parpadee entre clases por el ruido del detector. `MotionGate` se coloca delante
+del clasificador de una sesión:
+
+- Normaliza los landmarks XY (centrados en la pelvis y escalados por el torso) y mide el
+  desplazamiento medio por articulación respecto al último frame *clasificado*.
+- Si ese movimiento no supera `epsilon` reutiliza la última predicción; reclasifica cuando
+  hay movimiento significativo o cuando la predicción tiene más de `max_skip` frames o
+  `max_age` segundos.
+- La etiqueta emitida se estabiliza por votación: solo cambia cuando otra clase reúne al
+  menos `switch_votes` de las últimas `vote_window` predicciones reales.
+
+`GateTotals` acumula los contadores de todas las compuertas para /api/metrics.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+from landmarks_compactos import torso_normalized
+
+
+class GateTotals:
+    """Contadores compartidos por todas las compuertas del servidor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.classified = 0
+        self.label_switches = 0
+
+    def add(self, classified, switched):
+        with self._lock:
+            self.frames += 1
+            self.classified += int(classified)
+            self.label_switches += int(switched)
+
+    def stats(self):
+        with self._lock:
+            skipped = self.frames - self.classified
+            return {'frames': self.frames,
+                    'classified': self.classified,
+                    'skipped': skipped,
+                    'skip_rate': round(skipped / self.frames, 3) if self.frames else 0.0,
+                    'label_switches': self.label_switches}
+
+
+class MotionGate:
+    """Compuerta de reclasificación y votación de etiquetas para un flujo de frames."""
+
+    def __init__(self, epsilon=0.02, max_skip=10, max_age=1.0, vote_window=5, switch_votes=None, totals=None):
+        self.epsilon = float(epsilon)
+        self.max_skip = max(0, int(max_skip))
+        self.max_age = float(max_age)
+        self.vote_window = max(1, int(vote_window))
+        self.switch_votes = int(switch_votes) if switch_votes else self.vote_window // 2 + 1
+        self.totals = totals
+        self._lock = threading.Lock()
+        self._votes = deque(maxlen=self.vote_window)
+        self._anchor = None         # XY normalizado del último frame clasificado
+        self._anchor_t = 0.0
+        self._since = 0             # frames reutilizados desde la última clasificación
+        self.label = None           # etiqueta emitida (estable)
+        self.raw_label = None       # última predicción real del clasificador
+        self.frames = 0
+        self.classified = 0
+        self.label_switches = 0
+        self.last_motion = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._votes.clear()
+            self._anchor = None
+            self._since = 0
+            self.label = None
+            self.raw_label = None
+
+    def _needs_classification(self, xy, now):
+        if self._anchor is None or self.raw_label is None:
+            return True
+        self.last_motion = float(np.linalg.norm(xy - self._anchor, axis=1).mean())
+        return (self.last_motion > self.epsilon
+                or self._since >= self.max_skip
+                or now - self._anchor_t >= self.max_age)
+
+    def _vote(self, posture):
+        """Añade una predicción real y devuelve True si cambia la etiqueta emitida."""
+        self._votes.append(posture)
+        if self.label is None:
+            self.label = posture
+            return False
+        top, count = Counter(self._votes).most_common(1)[0]
+        if top != self.label and count >= self.switch_votes:
+            self.label = top
+            self.label_switches += 1
+            return True
+        return False
+
+    def classify(self, landmarks, predict_fn):
+        """Etiqueta para `landmarks` (33, 4): llama a `predict_fn(landmarks)` solo si hace falta.
+        El clasificador corre fuera del lock: el ancla se fija antes, así que los frames que
+        llegan mientras tanto se comparan ya con este."""
+        now = time.monotonic()
+        xy = torso_normalized(np.asarray(landmarks)[None, :, :2])[0][0]
+        with self._lock:
+            classified = self._needs_classification(xy, now)
+            self.frames += 1
+            if classified:
+                self._anchor = xy
+                self._anchor_t = now
+                self._since = 0
+                self.classified += 1
+            else:
+                self._since += 1
+                label = self.label
+        switched = False
+        if classified:
+            posture = predict_fn(landmarks)
+            with self._lock:
+                if posture is not None:
+                    self.raw_label = posture
+                    switched = self._vote(posture)
+                label = self.label
+        if self.totals is not None:
+            self.totals.add(classified, switched)
+        return label
+
+    def stats(self):
+        skipped = self.frames - self.classified
+        return {'frames': self.frames,
+                'classified': self.classified,
+                'skip_rate': round(skipped / self.frames, 3) if self.frames else 0.0,
+                'label_switches': self.label_switches,
+                'label': self.label,
+                'raw_label': self.raw_label,
+                'last_motion': round(self.last_motion, 4)}
@@ -0,0 +1,209 @@
+"""
+Decodificación muestreada de videos compartida por el servidor y los scripts offline.
+
+`iter_sampled_frames` recorre un video y entrega solo uno de cada `step` frames como un
+generador de (frame_idx, timestamp_s, frame_bgr). Con OpenCV los frames descartados se
+avanzan con `grab()` sin llegar a decodificarlos a imagen (`retrieve()`), que es lo caro.
+Si OpenCV no puede abrir el video, o si se pide una resolución reducida y hay ffmpeg en
+el PATH, se decodifica con un pipe de ffmpeg usando los filtros `fps` y `scale`.
+"""
+
+import json
+import shutil
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+FFMPEG = shutil.which('ffmpeg')
+FFPROBE = shutil.which('ffprobe')
+
+
+class DecodeStats:
+    """Contadores de una decodificación: frames avanzados, entregados y fps de decodificación."""
+
+    def __init__(self):
+        self.backend = None
+        self.video_fps = None
+        self.step = None
+        self.frames_read = 0      # frames avanzados en el stream (grab o leídos del pipe)
+        self.frames_yielded = 0   # frames entregados al llamador
+        self.decode_time = 0.0    # segundos dentro del decodificador (sin el trabajo del llamador)
+
+    @property
+    def decode_fps(self):
+        return self.frames_read / self.decode_time if self.decode_time > 0 else 0.0
+
+    def as_dict(self):
+        return {'backend': self.backend,
+                'video_fps': self.video_fps,
+                'step': self.step,
+                'frames_read': self.frames_read,
+                'frames_yielded': self.frames_yielded,
+                'decode_time_s': round(self.decode_time, 3),
+                'decode_fps': round(self.decode_fps, 1)}
+
+    def __str__(self):
+        return (f"[{self.backend}] {self.frames_yielded}/{self.frames_read} frames entregados, "
+                f"{self.decode_fps:.1f} fps de decodificación")
+
+
+def sampling_step(video_fps, target_fps):
+    """Paso entre frames muestreados (misma regla que usaban todos los scripts)."""
+    return max(1, int(round((video_fps or 30.0) / target_fps)))
+
+
+def _scaled_size(width, height, max_width):
+    if not max_width or width <= max_width:
+        return width, height
+    new_w = int(max_width) - int(max_width) % 2
+    new_h = int(round(height * new_w / width))
+    return new_w, new_h - new_h % 2
+
+
+def _probe(video_path):
+    """(width, height, fps) del primer stream de video según ffprobe, con rotación aplicada."""
+    if not FFPROBE:
+        return None
+    try:
+        out = subprocess.run([FFPROBE, '-v', 'error', '-select_streams', 'v:0',
+                              '-show_entries', 'stream=width,height,avg_frame_rate:stream_side_data=rotation',
+                              '-of', 'json', str(video_path)],
+                             capture_output=True, timeout=20, check=True).stdout
+        stream = json.loads(out)['streams'][0]
+        width, height = int(stream['width']), int(stream['height'])
+        num, _, den = stream.get('avg_frame_rate', '30/1').partition('/')
+        fps = float(num) / float(den or 1) if float(num) > 0 else 30.0
+        rotation = 0
+        for side in stream.get('side_data_list', []) or []:
+            rotation = int(side.get('rotation', rotation))
+        if abs(rotation) % 180 == 90:
+            width, height = height, width
+        return width, height, fps
+    except Exception:
+        return None
+
+
+def _iter_opencv(cap, step, start_frame, end_frame, max_width, stats):
+    video_fps = stats.video_fps
+    idx = start_frame
+    t0 = time.perf_counter()
+    try:
+        while end_frame is None or idx < end_frame:
+            if not cap.grab():
+                break
+            stats.frames_read += 1
+            if idx % step == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                if max_width and frame.shape[1] > max_width:
+                    w, h = _scaled_size(frame.shape[1], frame.shape[0], max_width)
+                    frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+                stats.decode_time += time.perf_counter() - t0
+                stats.frames_yielded += 1
+                yield idx, idx / video_fps, frame
+                t0 = time.perf_counter()
+            idx += 1
+        stats.decode_time += time.perf_counter() - t0
+    finally:
+        cap.release()
+
+
+def _iter_ffmpeg(video_path, step, start_frame, end_frame, max_width, stats, probe):
+    width, height, video_fps = probe
+    out_w, out_h = _scaled_size(width, height, max_width)
+    out_fps = video_fps / step
+    # Alinear el inicio a la rejilla de muestreo para que los índices coincidan con OpenCV
+    first = -(-start_frame // step) * step
+    cmd = [FFMPEG, '-v', 'error', '-nostdin']
+    if first > 0:
+        cmd += ['-ss', f'{first / video_fps:.6f}']
+    cmd += ['-i', str(video_path)]
+    if end_frame is not None:
+        cmd += ['-t', f'{max(0, end_frame - first) / video_fps:.6f}']
+    cmd += ['-an', '-vf', f'fps={out_fps:.6f},scale={out_w}:{out_h}',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+    frame_bytes = out_w * out_h * 3
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=frame_bytes)
+    k = 0
+    t0 = time.perf_counter()
+    try:
+        while True:
+            buf = proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            idx = first + k * step
+            if end_frame is not None and idx >= end_frame:
+                break
+            frame = np.frombuffer(buf, np.uint8).reshape((out_h, out_w, 3))
+            stats.frames_read += step
+            stats.decode_time += time.perf_counter() - t0
+            stats.frames_yielded += 1
+            yield idx, idx / video_fps, frame
+            t0 = time.perf_counter()
+            k += 1
+        stats.decode_time += time.perf_counter() - t0
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+def iter_sampled_frames(video_path, target_fps=1, start_frame=0, end_frame=None,
+                        max_width=None, backend='auto', stats=None):
+    """Generador de (frame_idx, timestamp_s, frame_bgr) con un frame de cada
+    round(video_fps / target_fps), igual que `frame_idx % step == 0` en el bucle clásico.
+
+    - start_frame/end_frame: rango [inicio, fin) de frames del video a recorrer.
+    - max_width: reduce la resolución de los frames entregados (ffmpeg la reduce al decodificar).
+    - backend: 'opencv', 'ffmpeg' o 'auto' (ffmpeg si se pide max_width o si OpenCV falla).
+    - stats: DecodeStats opcional que se rellena mientras se consume el generador.
+    Lanza ValueError si el video no se puede abrir con ningún backend.
+    """
+    stats = stats if stats is not None else DecodeStats()
+    use_ffmpeg = backend == 'ffmpeg' or (backend == 'auto' and max_width and FFMPEG)
+
+    if not use_ffmpeg:
+        cap = cv2.VideoCapture(str(video_path))
+        if cap.isOpened():
+            stats.backend = 'opencv'
+            stats.video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            stats.step = sampling_step(stats.video_fps, target_fps)
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            return _iter_opencv(cap, stats.step, start_frame, end_frame, max_width, stats)
+        cap.release()
+        if backend == 'opencv' or not FFMPEG:
+            raise ValueError(f'No se pudo abrir el video: {video_path}')
+
+    probe = _probe(video_path) if FFMPEG else None
+    if probe is None:
+        if backend == 'auto':
+            # ffmpeg no disponible o no reconoce el archivo: intentar con OpenCV
+            return iter_sampled_frames(video_path, target_fps, start_frame, end_frame,
+                                       max_width, backend='opencv', stats=stats)
+        raise ValueError(f'No se pudo abrir el video con ffmpeg: {video_path}')
+    stats.backend = 'ffmpeg'
+    stats.video_fps = probe[2]
+    stats.step = sampling_step(stats.video_fps, target_fps)
+    return _iter_ffmpeg(video_path, stats.step, start_frame, end_frame, max_width, stats, probe)
+
+
+def video_info(video_path):
+    """Devuelve {'fps', 'frame_count', 'width', 'height'} o None si no se puede abrir."""
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        if cap.isOpened():
+            return {'fps': cap.get(cv2.CAP_PROP_FPS) or 30.0,
+                    'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+                    'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+                    'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)}
+    finally:
+        cap.release()
+    probe = _probe(video_path)
+    if probe is None:
+        return None
+    return {'fps': probe[2], 'frame_count': 0, 'width': probe[0], 'height': probe[1]}
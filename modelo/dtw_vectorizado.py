@@ -0,0 +1,175 @@
+"""
+Motor DTW vectorizado para comparar secuencias de landmarks.
+
+La distancia entre dos frames es la media de las distancias punto a punto (XY) con ambos
+frames centrados en la pelvis y escalados por la longitud del torso (la misma normalización
+que `busqueda_fase.pose_features`), de modo que los umbrales de `evaluate_posture` se expresan
+en unidades de torso tanto para secuencias como para frames sueltos. Aquí se calculan todas
+las parejas (usuario i, referencia j) a la vez y la matriz DTW acumulada se rellena por
+antidiagonales (todas las celdas con i + j constante dependen solo de las dos antidiagonales
+anteriores).
+
+`StreamingDTW` mantiene el estado entre frames de una sesión para no recalcular la ventana
+completa en cada llamada.
+"""
+
+import numpy as np
+
+from landmarks_compactos import ReferenceSequence, as_frame, as_sequence, torso_normalized
+
+
+def normalized_xy(frames):
+    """Frames (listas planas, arrays (33, 4), ReferenceSequence...) -> (XY normalizado por el
+    torso (T, N, 2), máscara (T,) de frames con torso válido)."""
+    if isinstance(frames, ReferenceSequence):
+        return frames.normalized, frames.valid
+    return torso_normalized(as_sequence(frames)[:, :, :2])
+
+
+def point_distances(user_frame, ref_frame):
+    """Distancias (N,) punto a punto entre dos frames normalizados por el torso; inf si alguno
+    no tiene torso válido."""
+    (a,), (a_ok,) = torso_normalized(as_frame(user_frame)[None, :, :2])
+    (b,), (b_ok,) = torso_normalized(as_frame(ref_frame)[None, :, :2])
+    if not (a_ok and b_ok):
+        return np.full(len(a), np.inf)
+    return np.linalg.norm(a - b, axis=1)
+
+
+def frame_distances(user_frames, ref_frames):
+    """Matriz (na, nb) con la distancia media por punto entre el frame de usuario i y el frame
+    de referencia j (normalizados por el torso). Parejas sin torso válido o con datos no
+    finitos valen inf."""
+    a, a_ok = normalized_xy(user_frames)
+    b, b_ok = normalized_xy(ref_frames)
+    dists = np.linalg.norm(a[:, None, :, :] - b[None, :, :, :], axis=3).mean(axis=2)
+    dists[~(a_ok[:, None] & b_ok[None, :]) | ~np.isfinite(dists)] = np.inf
+    return dists
+
+
+def accumulate_dtw(fd):
+    """Matriz DTW acumulada (na+1, nb+1) para costes por celda `fd`, rellenada por antidiagonales."""
+    na, nb = fd.shape
+    acc = np.full((na + 1, nb + 1), np.inf)
+    acc[0, 0] = 0.0
+    for k in range(2, na + nb + 1):
+        i = np.arange(max(1, k - nb), min(na, k - 1) + 1)
+        j = k - i
+        best = np.minimum(np.minimum(acc[i - 1, j], acc[i, j - 1]), acc[i - 1, j - 1])
+        acc[i, j] = fd[i - 1, j - 1] + best
+    return acc
+
+
+def backtrack_path(acc):
+    """Camino óptimo desde (na, nb) hasta el origen; en empate prefiere diagonal, luego
+    vertical y luego horizontal (igual que el cálculo original)."""
+    rows = acc.tolist()
+    i = len(rows) - 1
+    j = len(rows[0]) - 1
+    path = []
+    while i > 0 and j > 0:
+        path.append((i - 1, j - 1))
+        diag, up, left = rows[i - 1][j - 1], rows[i - 1][j], rows[i][j - 1]
+        if diag <= up and diag <= left:
+            i, j = i - 1, j - 1
+        elif up <= left:
+            i = i - 1
+        else:
+            j = j - 1
+    path.reverse()
+    return path
+
+
+def dtw_compare(user_seq, ref_seq):
+    """DTW entre la secuencia del usuario y una ventana de referencia.
+    Devuelve (avg_distance, max_distance, path_len, total_cost) sobre los costes del camino."""
+    if len(user_seq) == 0 or len(ref_seq) == 0:
+        return None, None, 0, float('inf')
+    fd = frame_distances(user_seq, ref_seq)
+    acc = accumulate_dtw(fd)
+    path = backtrack_path(acc)
+    if not path:
+        return None, None, 0, float('inf')
+    idx = np.array(path)
+    costs = fd[idx[:, 0], idx[:, 1]]
+    return float(np.mean(costs)), float(np.max(costs)), len(path), float(acc[-1, -1])
+
+
+class StreamingDTW:
+    """DTW en línea (final abierto) de un flujo de frames del usuario contra una secuencia de
+    referencia.
+
+    Guarda la última fila de costes acumulados y la extiende con cada frame nuevo calculando
+    solo las celdas de una ventana de `window` frames de referencia alrededor de `center`
+    (O(window) por frame). Los caminos solo empiezan en el borde izquierdo de la ventana (por
+    donde el usuario entra en ese tramo de la referencia): en el primer frame y cuando la
+    ventana retrocede o salta y esa celda no tiene vecinas; el resto de celdas se alcanzan
+    desde sus vecinas.
+
+    `forgetting` (0-1] multiplica el coste acumulado (y el peso del camino) de los frames
+    anteriores para que el alineamiento siga a los movimientos recientes. El final del camino
+    se elige por coste medio por paso (coste / peso), no por coste bruto, para que un camino
+    recién empezado no gane siempre a uno establecido. Las métricas avg/max se calculan sobre
+    los pasos alineados con los últimos `horizon` frames del usuario, la misma longitud que el
+    buffer que usa `dtw_compare`: con `forgetting=1.0` y tras `horizon` frames desde `reset`,
+    el resultado coincide con `dtw_compare(buffer, ventana[:j + 1])` para el final j elegido.
+    """
+
+    def __init__(self, reference_frames, window=9, forgetting=0.85, horizon=3):
+        self.reference = (reference_frames if isinstance(reference_frames, ReferenceSequence)
+                          else ReferenceSequence(reference_frames))
+        self.window = max(1, int(window))
+        self.forgetting = float(forgetting)
+        self.horizon = max(1, int(horizon))
+        self.reset()
+
+    def __len__(self):
+        return len(self.reference)
+
+    def reset(self):
+        self._row = {}      # j -> (coste acumulado, peso del camino, pasos recientes (frame, coste))
+        self.frames = 0
+
+    def _window_bounds(self, center):
+        n = len(self.reference)
+        win = min(n, self.window)
+        if center is None:
+            return 0, n
+        start = max(0, int(center) - win // 2)
+        return start, min(n, start + win)
+
+    def push(self, landmarks, center=None):
+        """Añade un frame del usuario y devuelve (avg_distance, max_distance, path_len,
+        total_cost, ref_position) del mejor camino que termina en este frame; path_len cuenta
+        los pasos dentro del horizonte."""
+        lo, hi = self._window_bounds(center)
+        d = frame_distances([landmarks], self.reference[lo:hi])[0].tolist()
+        prev = self._row
+        decay = self.forgetting
+        frame = self.frames
+        oldest = frame - self.horizon + 1
+        row = {}
+        for k, j in enumerate(range(lo, hi)):
+            cost = d[k]
+            best = None
+            best_cost = float('inf')
+            # Empates: diagonal, vertical, horizontal (mismo orden que el DTW completo)
+            for cand, factor in ((prev.get(j - 1), decay), (prev.get(j), decay), (row.get(j - 1), 1.0)):
+                if cand is not None and cand[0] * factor < best_cost:
+                    best_cost = cand[0] * factor
+                    best = (best_cost, cand[1] * factor, cand[2])
+            if best is None:
+                if j != lo:
+                    continue                     # inalcanzable: solo se entra por el borde izquierdo
+                best = (0.0, 0.0, ())            # nuevo inicio de camino
+            steps = tuple(step for step in best[2] if step[0] >= oldest) + ((frame, cost),)
+            row[j] = (best[0] + cost, best[1] + 1.0, steps)
+        self._row = row
+        self.frames += 1
+
+        j_best = min(row, key=lambda j: row[j][0] / row[j][1])
+        total, _, steps = row[j_best]
+        recent = [c for _, c in steps]
+        if not np.isfinite(recent).all():
+            return None, None, len(recent), float('inf'), j_best
+        return float(np.mean(recent)), float(np.max(recent)), len(recent), float(total), j_best
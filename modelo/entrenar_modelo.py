@@ -1,7 +1,7 @@
 import os
 import cv2
 import argparse
-import pandas as pd
+from concurrent.futures import as_completed
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
@@ -11,37 +11,43 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report
 import joblib
 from tqdm import tqdm
+from decodificador import DecodeStats, iter_sampled_frames
+from extraccion_paralela import ExtractionPool
+from cache_dataset import DatasetCache
+from almacen_landmarks import LandmarkStore, store_to_csv
+from bosque_compilado import CompiledForest, check_equivalence, is_forest
 
 
-# Detectar clases en dataset/ (usar carpetas existentes)
-if not os.path.exists('dataset'):
-    print("Error: no existe la carpeta 'dataset/'")
-    exit()
+detector = None  # PoseLandmarker del proceso principal (se crea en main)
 
-posturas = [d for d in os.listdir('dataset') if os.path.isdir(os.path.join('dataset', d))]
-if not posturas:
-    print("Error: no se encontraron subcarpetas en 'dataset/'")
-    exit()
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+NORMALIZATION_VERSION = 1  # subir si cambia normalize_landmarks para invalidar la caché
+DATASET_STORE = 'dataset_posturas.lmk'
 
-print(f"Clases detectadas en dataset/: {posturas}")
 
-# Parse CLI args
-parser = argparse.ArgumentParser(description='Entrenar modelo desde dataset (imagenes y videos)')
-parser.add_argument('--videos-only', action='store_true', help='Procesar sólo archivos de video y omitir imágenes')
-parser.add_argument('--fps', type=int, default=3, help='Frames por segundo a extraer de cada video (default: 3)')
-args = parser.parse_args()
-
-# Preparar MediaPipe PoseLandmarker
-base_options = python.BaseOptions(model_asset_path='pose_landmarker.task')
-options = vision.PoseLandmarkerOptions(
-    base_options=base_options,
-    min_pose_detection_confidence=0.5
-)
-detector = vision.PoseLandmarker.create_from_options(options)
+def normalize_landmarks(landmarks):
+    """Normalización: centrar en los hombros y escalar por tamaño de torso (hombros↔caderas).
+    Recibe y devuelve una lista plana [x,y,z,...].
+    """
+    pts = [[landmarks[i], landmarks[i + 1], landmarks[i + 2]] for i in range(0, len(landmarks), 3)]
+    if len(pts) >= 25:
+        LS, RS, LH, RH = 11, 12, 23, 24
+        shoulder_center = ((pts[LS][0] + pts[RS][0]) / 2, (pts[LS][1] + pts[RS][1]) / 2)
+        hip_center = ((pts[LH][0] + pts[RH][0]) / 2, (pts[LH][1] + pts[RH][1]) / 2)
+        torso = ((shoulder_center[0] - hip_center[0]) ** 2 + (shoulder_center[1] - hip_center[1]) ** 2) ** 0.5
+        scale = torso if torso > 1e-3 else 1.0
+        # Centrar y escalar
+        cx, cy = shoulder_center
+        for i in range(len(pts)):
+            pts[i][0] = (pts[i][0] - cx) / scale
+            pts[i][1] = (pts[i][1] - cy) / scale
+    return [coord for p in pts for coord in p]
 
 
-def process_image_frame(frame):
-    """Procesa un frame (BGR) y devuelve lista de landmarks [x,y,z,...] o None.
+def detect_frame(frame):
+    """Procesa un frame (BGR) y devuelve (landmarks normalizados [x,y,z,...], confianza) o
+    (None, None). La confianza es la visibilidad media de los 33 puntos.
     Aplica normalización por escala de torso para robustez.
     """
     try:
@@ -49,118 +55,235 @@ def process_image_frame(frame):
         imagen_mp = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
         resultado = detector.detect(imagen_mp)
         if resultado.pose_landmarks:
-            pts = [[lm.x, lm.y, lm.z] for lm in resultado.pose_landmarks[0]]
-            # Normalización: escalar por tamaño de torso (hombros↔caderas)
-            if len(pts) >= 25:
-                LS, RS, LH, RH = 11, 12, 23, 24
-                shoulder_center = ((pts[LS][0] + pts[RS][0]) / 2, (pts[LS][1] + pts[RS][1]) / 2)
-                hip_center = ((pts[LH][0] + pts[RH][0]) / 2, (pts[LH][1] + pts[RH][1]) / 2)
-                torso = ((shoulder_center[0] - hip_center[0]) ** 2 + (shoulder_center[1] - hip_center[1]) ** 2) ** 0.5
-                scale = torso if torso > 1e-3 else 1.0
-                # Centrar y escalar
-                cx, cy = shoulder_center
-                for i in range(len(pts)):
-                    pts[i][0] = (pts[i][0] - cx) / scale
-                    pts[i][1] = (pts[i][1] - cy) / scale
-            landmarks = [coord for p in pts for coord in p]
-            return landmarks
+            pose = resultado.pose_landmarks[0]
+            landmarks = [coord for lm in pose for coord in [lm.x, lm.y, lm.z]]
+            confidence = sum(lm.visibility or 0.0 for lm in pose) / len(pose)
+            return normalize_landmarks(landmarks), confidence
     except Exception:
-        return None
-    return None
+        return None, None
+    return None, None
+
+
+def process_image_frame(frame):
+    """Procesa un frame (BGR) y devuelve lista de landmarks [x,y,z,...] normalizados o None."""
+    return detect_frame(frame)[0]
 
 
-def extract_frames_from_video(video_path, target_fps=1):
-    """Extrae frames desde un video a target_fps (frames por segundo).
-    Devuelve lista de frames (BGR).
+def iter_video_landmarks(video_path, target_fps=1, max_width=None):
+    """Generador de (frame_idx, timestamp, landmarks normalizados, confianza) de un video a
+    target_fps (frames por segundo). Cada frame se decodifica, se procesa y se descarta antes
+    de leer el siguiente, así que nunca hay más de un frame del video en memoria.
     """
-    frames = []
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        return frames
-
-    orig_fps = cap.get(cv2.CAP_PROP_FPS) or 30
-    step = max(1, int(round(orig_fps / target_fps)))
-
-    idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if idx % step == 0:
-            frames.append(frame)
-        idx += 1
-
-    cap.release()
-    return frames
-
-
-# 1) Procesar dataset (imágenes y videos) y generar dataset_posturas.csv
-print("\nProcesando dataset (imágenes y videos)...")
-dataset = []
-columnas = [f'lm_{i}_{coord}' for i in range(33) for coord in ['x', 'y', 'z']]
-
-for postura in posturas:
-    path = os.path.join('dataset', postura)
-    archivos = [f for f in os.listdir(path) if f.lower().endswith(('.jpg', '.jpeg', '.png', '.mp4', '.avi', '.mov', '.mkv', '.webm'))]
-    print(f"\nAnalizando: {postura} -> {len(archivos)} archivos")
-
-    for nombre in tqdm(archivos, desc=postura):
-        ruta = os.path.join(path, nombre)
+    stats = DecodeStats()
+    try:
+        frames = iter_sampled_frames(video_path, target_fps=target_fps, max_width=max_width, stats=stats)
+    except ValueError:
+        print(f"WARN: No se pudieron extraer frames de {video_path}")
+        return
+    for frame_idx, timestamp, frame in frames:
+        landmarks, confidence = detect_frame(frame)
+        if landmarks:
+            yield frame_idx, timestamp, landmarks, confidence
+    if stats.frames_yielded:
+        print(f"  {os.path.basename(video_path)}: {stats}")
+
+
+def extract_file_rows(ruta, args):
+    """Landmarks normalizados de una imagen o un video, en el proceso principal.
+    Devuelve un dict con 'rows', 'frames', 'timestamps' y 'confidences' (como DatasetCache)."""
+    if ruta.lower().endswith(IMAGE_EXTENSIONS):
+        frame = cv2.imread(ruta)
+        landmarks, confidence = detect_frame(frame) if frame is not None else (None, None)
+        if frame is not None and not landmarks:
+            print(f"WARN: No se detectó postura en imagen {ruta}")
+        if not landmarks:
+            return {'rows': [], 'frames': [], 'timestamps': [], 'confidences': []}
+        return {'rows': [landmarks], 'frames': [-1], 'timestamps': [float('nan')], 'confidences': [confidence]}
+    found = list(iter_video_landmarks(ruta, target_fps=args.fps, max_width=args.max_width))
+    return {'rows': [f[2] for f in found], 'frames': [f[0] for f in found],
+            'timestamps': [f[1] for f in found], 'confidences': [f[3] for f in found]}
+
+
+def build_dataset(posturas, args, store):
+    """Recorre dataset/<postura>/ y reconstruye `store` con las filas de todos los archivos,
+    en orden y con su procedencia (archivo, frame, segundo, confianza).
+
+    Los archivos ya procesados con los mismos parámetros se leen de la caché por hash de
+    contenido; el resto se procesa: los videos en el pool de procesos (un video por
+    trabajador, cada uno con su PoseLandmarker) y las imágenes en el proceso principal.
+    """
+    cache = DatasetCache(fps=args.fps, max_width=args.max_width, normalization=NORMALIZATION_VERSION)
+
+    archivos = []  # (postura, ruta) en el orden del dataset
+    for postura in posturas:
+        path = os.path.join('dataset', postura)
+        extensiones = VIDEO_EXTENSIONS if args.videos_only else IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+        nombres = sorted(f for f in os.listdir(path) if f.lower().endswith(extensiones))
+        print(f"Analizando: {postura} -> {len(nombres)} archivos")
+        archivos.extend((postura, os.path.join(path, nombre)) for nombre in nombres)
+
+    filas = {}
+    pendientes = []
+    for postura, ruta in archivos:
         try:
-            if not args.videos_only and nombre.lower().endswith(('.jpg', '.jpeg', '.png')):
-                frame = cv2.imread(ruta)
-                if frame is None:
-                    continue
-                landmarks = process_image_frame(frame)
-                if landmarks:
-                    dataset.append(landmarks + [postura])
-                else:
-                    print(f"WARN: No se detectó postura en imagen {ruta}")
-
-            else:
-                # Video: extraer frames y procesarlos
-                frames = extract_frames_from_video(ruta, target_fps=args.fps)
-                if not frames:
-                    print(f"WARN: No se pudieron extraer frames de {ruta}")
+            rows = None if args.no_cache else cache.get(ruta)
+        except OSError as e:
+            print(f"ERROR: Error leyendo {ruta}: {e}")
+            continue
+        if rows is not None:
+            filas[ruta] = rows
+        else:
+            pendientes.append(ruta)
+    print(f"\n{len(archivos)} archivos: {cache.hits} en caché, {len(pendientes)} por procesar")
+
+    videos = [r for r in pendientes if r.lower().endswith(VIDEO_EXTENSIONS)]
+    imagenes = [r for r in pendientes if not r.lower().endswith(VIDEO_EXTENSIONS)]
+    pool = None
+    if args.workers > 1 and len(videos) > 1:
+        pool = ExtractionPool(workers=min(args.workers, len(videos)), detector='tasks')
+
+    try:
+        futures = {}
+        if pool is not None:
+            futures = {pool.submit_video(ruta, target_fps=args.fps, max_width=args.max_width): ruta
+                       for ruta in videos}
+            videos = []
+
+        # Imágenes (y videos si no hay pool) en el proceso principal mientras el pool trabaja
+        for ruta in tqdm(imagenes + videos, desc='archivos'):
+            try:
+                filas[ruta] = extract_file_rows(ruta, args)
+            except Exception as e:
+                print(f"ERROR: Error procesando {ruta}: {str(e)}")
+                continue
+            cache.put(ruta, **filas[ruta])
+
+        if futures:
+            for fut in tqdm(as_completed(futures), total=len(futures), desc='videos'):
+                ruta = futures[fut]
+                try:
+                    _, seq, timestamps, frames, confidences = fut.result()
+                except Exception as e:
+                    print(f"ERROR: Error procesando {ruta}: {str(e)}")
                     continue
-                for f in frames:
-                    landmarks = process_image_frame(f)
-                    if landmarks:
-                        dataset.append(landmarks + [postura])
+                if not seq:
+                    print(f"WARN: No se detectaron landmarks en {ruta}")
+                filas[ruta] = {'rows': [normalize_landmarks(landmarks) for landmarks in seq],
+                               'frames': frames, 'timestamps': timestamps, 'confidences': confidences}
+                cache.put(ruta, **filas[ruta])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        cache.save_index()
+
+    store.clear(normalized=True)
+    for postura, ruta in archivos:
+        data = filas.get(ruta)
+        if data is None or not len(data['rows']):
+            continue
+        store.append(data['rows'], postura, sources=os.path.relpath(ruta, 'dataset').replace(os.sep, '/'),
+                     frames=data['frames'], timestamps=data['timestamps'], confidences=data['confidences'])
+    return store
+
+
+def main():
+    global detector
+
+    # Detectar clases en dataset/ (usar carpetas existentes)
+    if not os.path.exists('dataset'):
+        print("Error: no existe la carpeta 'dataset/'")
+        exit()
+
+    posturas = [d for d in os.listdir('dataset') if os.path.isdir(os.path.join('dataset', d))]
+    if not posturas:
+        print("Error: no se encontraron subcarpetas en 'dataset/'")
+        exit()
+
+    print(f"Clases detectadas en dataset/: {posturas}")
+
+    # Parse CLI args
+    parser = argparse.ArgumentParser(description='Entrenar modelo desde dataset (imagenes y videos)')
+    parser.add_argument('--videos-only', action='store_true', help='Procesar sólo archivos de video y omitir imágenes')
+    parser.add_argument('--fps', type=int, default=3, help='Frames por segundo a extraer de cada video (default: 3)')
+    parser.add_argument('--max-width', type=int, default=None, help='Decodificar videos a este ancho máximo (usa ffmpeg si está disponible)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help='Procesos para extraer videos en paralelo, uno por trabajador (1 = secuencial)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignorar la caché de cache_dataset/ y reprocesar todo')
+    parser.add_argument('--solo-entrenar', action='store_true',
+                        help=f'No procesar dataset/: entrenar directamente con {DATASET_STORE}')
+    parser.add_argument('--csv', default=None, help='Exportar también el dataset a este CSV (formato clásico)')
+    parser.add_argument('--seleccion', action='store_true',
+                        help='Probar varias familias y tamaños de modelo y elegir el más preciso dentro del presupuesto de latencia')
+    parser.add_argument('--presupuesto-ms', type=float, default=float(os.environ.get('LATENCY_BUDGET_MS', 5.0)),
+                        help='Latencia p99 máxima por frame (una muestra) para --seleccion (default: 5 ms)')
+    parser.add_argument('--jobs', type=int, default=-1, help='Procesos para entrenar los candidatos de --seleccion')
+    args = parser.parse_args()
+
+    if args.solo_entrenar:
+        if not LandmarkStore.exists(DATASET_STORE):
+            print(f"Error: no existe {DATASET_STORE}; ejecuta sin --solo-entrenar para generarlo")
+            exit()
+        store = LandmarkStore.open(DATASET_STORE)
+    else:
+        # Preparar MediaPipe PoseLandmarker
+        base_options = python.BaseOptions(model_asset_path='pose_landmarker.task')
+        options = vision.PoseLandmarkerOptions(
+            base_options=base_options,
+            min_pose_detection_confidence=0.5
+        )
+        detector = vision.PoseLandmarker.create_from_options(options)
 
-        except Exception as e:
-            print(f"ERROR: Error procesando {ruta}: {str(e)}")
+        # 1) Procesar dataset (imágenes y videos) y reconstruir el almacén binario
+        print("\nProcesando dataset (imágenes y videos)...")
+        store = build_dataset(posturas, args, LandmarkStore(DATASET_STORE, normalized=True))
 
+    if not len(store):
+        print("\nERROR: No se pudo generar el dataset. Asegúrate de tener imágenes o videos procesables en dataset/")
+        exit()
+    print(f"\nDataset {DATASET_STORE}: {len(store)} muestras validas")
+    if args.csv:
+        store_to_csv(DATASET_STORE, args.csv)
+        print(f"Dataset exportado también a {args.csv}")
 
-# Guardar o cargar dataset
-if dataset:
-    df = pd.DataFrame(dataset, columns=columnas + ['clase'])
-    df.to_csv('dataset_posturas.csv', index=False)
-    print(f"\nDataset generado con {len(df)} muestras validas")
-else:
-    print("\nERROR: No se pudo generar el dataset. Asegúrate de tener imágenes o videos procesables en dataset/")
-    exit()
+    # 2) Entrenar modelo con el almacén (columnas memory-mapped, sin parsear texto)
+    print("\nEntrenando modelo con el dataset generado...")
+    if len(store) < 50:
+        print(f"Advertencia: Dataset muy pequeño ({len(store)} muestras). Se recomiendan al menos 50 por clase.")
 
+    data = store.load()
+    encoder = LabelEncoder()
+    X = data['features']
+    y = encoder.fit_transform(data['labels'].astype(str))
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# 2) Entrenar modelo con el CSV generado
-print("\nEntrenando modelo con el dataset generado...")
-if len(df) < 50:
-    print(f"Advertencia: Dataset muy pequeño ({len(df)} muestras). Se recomiendan al menos 50 por clase.")
+    if args.seleccion:
+        # Barrido de modelos: precisión frente a latencia por frame y memoria
+        from seleccion_modelo import save_table, select_model, sweep
+        print(f"\nBarrido de modelos (presupuesto p99 por frame: {args.presupuesto_ms} ms)...")
+        filas, modelos = sweep(X_train, y_train, X_test, y_test, n_jobs=args.jobs)
+        elegido = select_model(filas, args.presupuesto_ms)
+        tabla_csv, _ = save_table(filas, args.presupuesto_ms)
+        print(f"\nModelo elegido: {elegido} (tabla completa en {tabla_csv})")
+        modelo = modelos[elegido]
+    else:
+        modelo = RandomForestClassifier(n_estimators=400, max_depth=12, min_samples_leaf=2, random_state=42)
+        modelo.fit(X_train, y_train)
 
-encoder = LabelEncoder()
-df['clase_num'] = encoder.fit_transform(df['clase'])
+    y_pred = modelo.predict(X_test)
+    print("\nReporte de clasificación:")
+    print(classification_report(y_test, y_pred, target_names=encoder.classes_))
 
-X = df.drop(['clase', 'clase_num'], axis=1)
-y = df['clase_num']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    joblib.dump(modelo, 'modelo_posturas.pkl')
+    joblib.dump(encoder, 'encoder.pkl')
+    print("\nModelo guardado como 'modelo_posturas.pkl'")
 
-modelo = RandomForestClassifier(n_estimators=400, max_depth=12, min_samples_leaf=2, random_state=42)
-modelo.fit(X_train, y_train)
+    # Exportar el bosque aplanado que usa app.py y comprobar que predice lo mismo
+    if is_forest(modelo):
+        compilado = CompiledForest.from_model(modelo)
+        compilado.save('modelo_compilado.npz')
+        ok, total = check_equivalence(compilado, modelo, X)
+        print(f"Bosque compilado guardado como 'modelo_compilado.npz' ({ok}/{total} predicciones idénticas)")
 
-y_pred = modelo.predict(X_test)
-print("\nReporte de clasificación:")
-print(classification_report(y_test, y_pred, target_names=encoder.classes_))
 
-joblib.dump(modelo, 'modelo_posturas.pkl')
-joblib.dump(encoder, 'encoder.pkl')
-print("\nModelo guardado como 'modelo_posturas.pkl'")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Extracción de landmarks en paralelo usando varios núcleos.
+
+Un video se divide en rangos de frames alineados a la rejilla de muestreo y cada rango se
+procesa en un proceso trabajador con su propio detector en modo imagen estática. Como
+cada frame se procesa de forma independiente, unir los rangos en orden da exactamente la
+misma secuencia que la extracción secuencial, en una fracción del tiempo.
+
+Detectores soportados:
+- 'solutions': mp.solutions.pose.Pose(static_image_mode=True), el que usa el servidor.
+- 'tasks': PoseLandmarker con `pose_landmarker.task`, el de los scripts offline.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from decodificador import DecodeStats, iter_sampled_frames, sampling_step, video_info
+
+_worker_detector = None        # detector propio de cada proceso trabajador
+_worker_detector_kind = None
+
+
+def _init_worker(detector_kind='solutions', model_asset_path='pose_landmarker.task'):
+    global _worker_detector, _worker_detector_kind
+    _worker_detector_kind = detector_kind
+    if detector_kind == 'tasks':
+        from mediapipe.tasks import python
+        from mediapipe.tasks.python import vision
+        base_options = python.BaseOptions(model_asset_path=model_asset_path)
+        options = vision.PoseLandmarkerOptions(base_options=base_options, min_pose_detection_confidence=0.5)
+        _worker_detector = vision.PoseLandmarker.create_from_options(options)
+    else:
+        from cache_referencias import create_reference_pose
+        _worker_detector = create_reference_pose()
+
+
+def _detect(frame):
+    """(landmarks [x,y,z,...], visibilidad media) del frame con el detector del proceso, o
+    (None, None)."""
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if _worker_detector_kind == 'tasks':
+        import mediapipe as mp
+        resultado = _worker_detector.detect(mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb))
+        pose = resultado.pose_landmarks[0] if resultado.pose_landmarks else None
+    else:
+        results = _worker_detector.process(frame_rgb)
+        pose = results.pose_landmarks.landmark if results.pose_landmarks else None
+    if not pose:
+        return None, None
+    landmarks = [coord for lm in pose for coord in [lm.x, lm.y, lm.z]]
+    return landmarks, sum(lm.visibility or 0.0 for lm in pose) / len(pose)
+
+
+def _process_range(video_path, target_fps, start_frame, end_frame, max_width, max_samples=None):
+    """Procesa [start_frame, end_frame) y devuelve (detecciones, frames_muestreados, stats);
+    cada detección es (frame_idx, timestamp, landmarks, confianza). Con `max_samples` deja de
+    decodificar en cuanto tiene ese número de detecciones."""
+    stats = DecodeStats()
+    found = []
+    sampled = 0
+    for frame_idx, timestamp, frame in iter_sampled_frames(video_path, target_fps=target_fps,
+                                                           start_frame=start_frame, end_frame=end_frame,
+                                                           max_width=max_width, stats=stats):
+        sampled += 1
+        try:
+            landmarks, confidence = _detect(frame)
+        except Exception:
+            landmarks = None
+        if landmarks:
+            found.append((frame_idx, timestamp, landmarks, confidence))
+            if max_samples and len(found) >= max_samples:
+                break
+    return found, sampled, stats.as_dict()
+
+
+def _process_video(video_path, target_fps, max_samples, max_width):
+    """Procesa un video completo en el trabajador (precalentamiento y entrenamiento). Devuelve
+    (video_path, secuencia, timestamps, frames, confianzas)."""
+    found, _, _ = _process_range(video_path, target_fps, 0, None, max_width, max_samples)
+    return (video_path, [f[2] for f in found], [f[1] for f in found],
+            [f[0] for f in found], [f[3] for f in found])
+
+
+def plan_chunks(frame_count, step, n_chunks):
+    """Divide [0, frame_count) en hasta n_chunks rangos cuyos límites son múltiplos de step."""
+    samples = -(-frame_count // step)
+    n_chunks = max(1, min(n_chunks, samples))
+    per_chunk = -(-samples // n_chunks)
+    ranges = []
+    for i in range(n_chunks):
+        start = i * per_chunk * step
+        if start >= frame_count:
+            break
+        ranges.append((start, min(frame_count, (i + 1) * per_chunk * step)))
+    return ranges
+
+
+class ExtractionPool:
+    """Pool de procesos persistente; cada trabajador mantiene su propio detector.
+
+    Se crea perezosamente en el primer uso para no pagar el arranque de los procesos si
+    nunca se necesita. Usar como context manager en scripts o cerrar con `shutdown()`.
+    """
+
+    def __init__(self, workers=None, detector='solutions', model_asset_path='pose_landmarker.task'):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.detector = detector
+        self.model_asset_path = model_asset_path
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # 'spawn' evita heredar hilos/grafos MediaPipe del proceso padre
+            ctx = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                 initializer=_init_worker,
+                                                 initargs=(self.detector, self.model_asset_path))
+        return self._executor
+
+    def submit_video(self, video_path, target_fps=3, max_samples=None, max_width=None):
+        """Encola un video completo en un solo trabajador. El futuro devuelve
+        (video_path, secuencia, timestamps, frames, confianzas)."""
+        return self._pool().submit(_process_video, str(video_path), target_fps, max_samples, max_width)
+
+    def extract(self, video_path, target_fps=3, max_samples=None, max_width=None, chunks=None,
+                provenance=False):
+        """Extrae la secuencia de un video repartiendo rangos de tiempo entre los trabajadores.
+        Devuelve (secuencia, timestamps) en orden, o (secuencia, timestamps, frames, confianzas)
+        con `provenance=True`. Lanza ValueError si el video no se abre.
+        """
+        info = video_info(video_path)
+        if info is None:
+            raise ValueError(f'No se pudo abrir el video: {os.path.basename(str(video_path))}')
+        step = sampling_step(info['fps'], target_fps)
+        frame_count = info['frame_count']
+        if frame_count > 0:
+            ranges = plan_chunks(frame_count, step, chunks or self.workers)
+        else:
+            ranges = [(0, None)]  # duración desconocida: un solo rango
+
+        t0 = time.perf_counter()
+        pool = self._pool()
+        # Ningún rango puede aportar más de max_samples detecciones al resultado
+        futures = [pool.submit(_process_range, str(video_path), target_fps, start, end, max_width, max_samples)
+                   for start, end in ranges]
+        seq, timestamps, frames, confidences = [], [], [], []
+        sampled = 0
+        decoded = 0
+        for fut in futures:  # en orden de rango
+            found, n, stats = fut.result()
+            sampled += n
+            decoded += stats['frames_read']
+            for frame_idx, timestamp, landmarks, confidence in found:
+                seq.append(landmarks)
+                timestamps.append(timestamp)
+                frames.append(frame_idx)
+                confidences.append(confidence)
+        if max_samples and len(seq) > max_samples:
+            print(f"Límite de {max_samples} muestras alcanzado")
+            seq, timestamps = seq[:max_samples], timestamps[:max_samples]
+            frames, confidences = frames[:max_samples], confidences[:max_samples]
+        elapsed = time.perf_counter() - t0
+        print(f"Extracción paralela ({len(ranges)} rangos, {self.workers} procesos) - "
+              f"Frames decodificados: {decoded}, Muestreados: {sampled}, Detecciones: {len(seq)}, "
+              f"{elapsed:.2f}s")
+        if provenance:
+            return seq, timestamps, frames, confidences
+        return seq, timestamps
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
+
+
+def extract_landmarks_parallel(video_path, target_fps=3, workers=None, detector='solutions',
+                               max_samples=None, max_width=None):
+    """Atajo para extraer un único video con un pool temporal."""
+    with ExtractionPool(workers=workers, detector=detector) as pool:
+        return pool.extract(video_path, target_fps=target_fps, max_samples=max_samples, max_width=max_width)
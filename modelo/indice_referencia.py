@@ -0,0 +1,114 @@
+"""
+Índice de acceso aleatorio tiempo → landmarks para videos de referencia.
+
+A partir de la secuencia muestreada de la caché (landmarks + timestamps) se construye una
+rejilla uniforme en el tiempo. Buscar los landmarks de un instante `t` es entonces O(1):
+se calcula la posición en la rejilla y se interpola linealmente entre las dos muestras
+vecinas, sin abrir el video ni ejecutar MediaPipe en la petición.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+class ReferenceIndex:
+    """Rejilla uniforme (n, D) float32 de landmarks interpolados a `grid_fps`."""
+
+    def __init__(self, landmarks, timestamps, grid_fps=10.0, frame_shape=None):
+        data = np.asarray(landmarks, dtype=np.float32)
+        times = np.asarray(timestamps, dtype=np.float64)
+        if data.ndim != 2 or len(data) == 0 or len(times) != len(data):
+            raise ValueError('Se necesitan landmarks (T, D) y T timestamps')
+        self.grid_fps = float(grid_fps)
+        self.start = float(times[0])
+        self.duration = float(times[-1])
+        n = int(np.floor((self.duration - self.start) * self.grid_fps)) + 1
+        grid_times = self.start + np.arange(n) / self.grid_fps
+        # Interpolación por columna sobre los instantes muestreados (huecos sin detección incluidos)
+        self.grid = np.empty((n, data.shape[1]), dtype=np.float32)
+        for c in range(data.shape[1]):
+            self.grid[:, c] = np.interp(grid_times, times, data[:, c])
+        self.samples = len(data)
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+
+    def __len__(self):
+        return len(self.grid)
+
+    def lookup(self, t):
+        """Landmarks interpolados en el instante t (segundos), acotado al video. Devuelve un
+        array float32 con forma `frame_shape` (p. ej. (33, 4)) o plano si no se indicó."""
+        pos = (float(t) - self.start) * self.grid_fps
+        last = len(self.grid) - 1
+        if pos <= 0 or last == 0:
+            row = self.grid[0]
+        elif pos >= last:
+            row = self.grid[last]
+        else:
+            i = int(pos)
+            frac = pos - i
+            row = (1.0 - frac) * self.grid[i] + frac * self.grid[i + 1]
+        return row.reshape(self.frame_shape) if self.frame_shape is not None else row
+
+
+class ReferenceIndexStore:
+    """Índices por video construidos una sola vez en segundo plano.
+
+    `get()` nunca bloquea: si el índice aún no existe lanza su construcción (desde la
+    caché de referencias) y devuelve None, para que la petición siga sin referencia.
+    Un video sin detecciones también se recuerda (índice None) y no se vuelve a decodificar
+    hasta que cambie su tamaño o fecha de modificación.
+    """
+
+    def __init__(self, cache, target_fps=3, grid_fps=10.0, max_entries=64):
+        self.cache = cache
+        self.target_fps = target_fps
+        self.grid_fps = grid_fps
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()   # ruta resuelta -> (size, mtime_ns, ReferenceIndex o None)
+        self._building = set()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, st, index):
+        with self._lock:
+            self._indexes[key] = (st.st_size, st.st_mtime_ns, index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+
+    def _build(self, key, video_path):
+        try:
+            st = Path(video_path).stat()
+            entry = self.cache.get(video_path, target_fps=self.target_fps)
+            sequence = entry['sequence']
+            if len(sequence):
+                # Rejilla sobre la vista (T, 132) de la secuencia compacta; lookup devuelve (33, 4)
+                index = ReferenceIndex(sequence.flat(), entry['timestamps'], grid_fps=self.grid_fps,
+                                       frame_shape=sequence.frames.shape[1:])
+                self._remember(key, st, index)
+                print(f"[INDICE] {Path(video_path).name}: {entry['origen']}, {index.samples} muestras -> {len(index)} celdas")
+            else:
+                # Resultado negativo: sin reconstruir en cada petición mientras el archivo no cambie
+                self._remember(key, st, None)
+                print(f"[INDICE] Sin landmarks en {Path(video_path).name}")
+        except Exception as e:
+            print(f"[INDICE][ERROR] {video_path}: {e}")
+        finally:
+            with self._lock:
+                self._building.discard(key)
+
+    def get(self, video_path):
+        key = str(Path(video_path).resolve())
+        st = Path(video_path).stat()
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                self._indexes.move_to_end(key)
+                return entry[2]
+            if key in self._building:
+                return None
+            self._building.add(key)
+        threading.Thread(target=self._build, args=(key, video_path), name='indice-referencia', daemon=True).start()
+        return None
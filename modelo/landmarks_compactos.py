@@ -0,0 +1,124 @@
+"""
+Representación compacta de landmarks para el camino de evaluación.
+
+Un frame es un array float32 contiguo (33, 4) con columnas x, y, z, visibility; una secuencia
+es (T, 33, 4). Los resultados de MediaPipe se vuelcan directamente en ese array y las demás
+etapas (clasificador, DTW, búsqueda de fase, índices) leen vistas del mismo bloque en lugar de
+reconstruir listas de tuplas. Solo se convierte a listas al responder en JSON.
+
+`ReferenceSequence` añade a la secuencia de referencia los datos que la comparación necesita
+una y otra vez (XY y XY normalizado por el torso), calculados una sola vez y compartidos por
+todas las sesiones que usan ese video.
+"""
+
+import numpy as np
+
+N_POINTS = 33
+POINT_DIMS = 4      # x, y, z, visibility
+FRAME_SHAPE = (N_POINTS, POINT_DIMS)
+LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP = 11, 12, 23, 24
+
+
+def frame_from_results(pose_landmarks):
+    """`results.pose_landmarks` de mp.solutions.pose -> array (33, 4) float32."""
+    lms = pose_landmarks.landmark
+    return np.fromiter((v for lm in lms for v in (lm.x, lm.y, lm.z, lm.visibility)),
+                       dtype=np.float32, count=len(lms) * POINT_DIMS).reshape(len(lms), POINT_DIMS)
+
+
+def as_frame(value):
+    """Frame en cualquier formato conocido -> (33, 4) float32 (sin copia si ya lo es).
+    Acepta arrays (33, 4) / (33, 3), listas planas de 99 ([x,y,z,...], visibilidad 1)
+    o de 132 ([x,y,z,v,...])."""
+    arr = np.asarray(value, dtype=np.float32)
+    if arr.shape == FRAME_SHAPE:
+        return arr
+    if arr.ndim == 1:
+        if arr.size == N_POINTS * POINT_DIMS:
+            return arr.reshape(FRAME_SHAPE)
+        arr = arr.reshape(-1, 3)
+    if arr.ndim == 2 and arr.shape[1] == 3:
+        frame = np.ones((arr.shape[0], POINT_DIMS), dtype=np.float32)
+        frame[:, :3] = arr
+        return frame
+    raise ValueError(f'Forma de landmarks no soportada: {arr.shape}')
+
+
+def as_sequence(value):
+    """Secuencia de frames -> (T, 33, 4) float32 (sin copia si ya lo es)."""
+    if isinstance(value, ReferenceSequence):
+        return value.frames
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], np.ndarray):
+        return np.stack([as_frame(f) for f in value])
+    arr = np.asarray(value, dtype=np.float32)
+    if arr.ndim == 3 and arr.shape[1:] == FRAME_SHAPE:
+        return arr
+    if arr.ndim == 2 and arr.shape[1] == N_POINTS * POINT_DIMS:
+        return arr.reshape((len(arr),) + FRAME_SHAPE)
+    if arr.ndim == 2 and arr.shape[1] == N_POINTS * 3:
+        seq = np.ones((len(arr),) + FRAME_SHAPE, dtype=np.float32)
+        seq[:, :, :3] = arr.reshape(len(arr), N_POINTS, 3)
+        return seq
+    if arr.size == 0:
+        return np.zeros((0,) + FRAME_SHAPE, dtype=np.float32)
+    raise ValueError(f'Forma de secuencia no soportada: {arr.shape}')
+
+
+def torso_normalized(xy, eps=1e-6):
+    """XY (T, 33, 2) -> (XY centrado en la pelvis y escalado por el torso, máscara (T,) de frames
+    con torso válido). Los frames sin torso se dejan con escala 1."""
+    xy = np.asarray(xy, dtype=np.float64)
+    hip = (xy[:, LEFT_HIP] + xy[:, RIGHT_HIP]) / 2.0
+    shoulder = (xy[:, LEFT_SHOULDER] + xy[:, RIGHT_SHOULDER]) / 2.0
+    torso = np.linalg.norm(shoulder - hip, axis=1)
+    valid = np.isfinite(torso) & (torso > eps)
+    torso = np.where(valid, torso, 1.0)
+    return (xy - hip[:, None, :]) / torso[:, None, None], valid
+
+
+def flat_xyz(frame):
+    """Vector (99,) [x,y,z,...] para el clasificador (única copia: 99 floats)."""
+    return np.ascontiguousarray(frame[:, :3]).reshape(-1)
+
+
+def to_lists(data):
+    """Frame o secuencia -> listas planas [x,y,z,...] para respuestas JSON."""
+    arr = as_sequence(data) if isinstance(data, ReferenceSequence) else np.asarray(data)
+    if arr.ndim == 2:
+        return arr[:, :3].reshape(-1).tolist()
+    return arr[:, :, :3].reshape(len(arr), -1).tolist()
+
+
+class ReferenceSequence:
+    """Secuencia de referencia (T, 33, 4) con XY y XY normalizado por el torso precalculados.
+    Indexar con un entero devuelve la vista del frame; con un slice, otra ReferenceSequence
+    que comparte los mismos arrays."""
+
+    def __init__(self, frames, timestamps=None):
+        self.frames = as_sequence(frames)
+        self.timestamps = (np.asarray(timestamps, dtype=np.float64) if timestamps is not None
+                           else np.arange(len(self.frames), dtype=np.float64))
+        self.xy = self.frames[:, :, :2].astype(np.float64)
+        self.normalized, self.valid = torso_normalized(self.xy)  # (T, 33, 2), (T,)
+
+    @classmethod
+    def _view(cls, parent, sl):
+        view = cls.__new__(cls)
+        for attr in ('frames', 'timestamps', 'xy', 'normalized', 'valid'):
+            setattr(view, attr, getattr(parent, attr)[sl])
+        return view
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return ReferenceSequence._view(self, item)
+        return self.frames[item]
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def flat(self):
+        """Vista (T, 132) del bloque contiguo, para interpolar por columnas."""
+        return self.frames.reshape(len(self.frames), -1)
@@ -0,0 +1,118 @@
+"""
+Micro-lotes para el clasificador de posturas.
+
+Con un RandomForest de 400 árboles, `modelo.predict([x])` para una sola muestra gasta la
+mayor parte del tiempo en validación y despacho de Python, no en recorrer los árboles.
+`MicroBatcher` junta durante unos milisegundos los vectores que llegan de peticiones
+concurrentes (evaluate_frame, el canal stream_frame, video_stream), ejecuta un único predict vectorizado
+y devuelve a cada llamador su resultado mediante un Future.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Agrupa llamadas a `predict_fn(X) -> etiquetas` en lotes de hasta `max_batch` filas,
+    esperando como mucho `max_wait_ms` desde que llega la primera muestra del lote."""
+
+    def __init__(self, predict_fn, max_batch=32, max_wait_ms=3.0, name='clasificador'):
+        self.predict_fn = predict_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._pending = deque()         # (features, future, t_submit)
+        self._cond = threading.Condition()
+        self._closed = False
+        # Métricas
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=2000)   # segundos por muestra (submit -> resultado)
+        self._completions = deque(maxlen=5000)  # instantes de finalización (throughput reciente)
+        self.batches = 0
+        self.samples = 0
+        self.max_batch_seen = 0
+        self.predict_time = 0.0
+        self._thread = threading.Thread(target=self._run, name=f'microlotes-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        fut = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('MicroBatcher cerrado')
+            self._pending.append((features, fut, time.perf_counter()))
+            self._cond.notify()
+        return fut
+
+    def predict(self, features, timeout=None):
+        """Etiqueta de una muestra (bloquea hasta que su lote se procese)."""
+        return self.submit(features).result(timeout=timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(self.max_batch, len(self._pending))
+            return [self._pending.popleft() for _ in range(n)]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                X = np.asarray([item[0] for item in batch], dtype=np.float32)
+                labels = self.predict_fn(X)
+            except Exception as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                continue
+            t1 = time.perf_counter()
+            for (_, fut, _), label in zip(batch, labels):
+                fut.set_result(label)
+            with self._stats_lock:
+                self.batches += 1
+                self.samples += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self.predict_time += t1 - t0
+                for _, _, t_submit in batch:
+                    self._latencies.append(t1 - t_submit)
+                    self._completions.append(t1)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+
+    def stats(self, window_s=10.0):
+        now = time.perf_counter()
+        with self._stats_lock:
+            lat = np.array(self._latencies) * 1000.0 if self._latencies else None
+            recent = sum(1 for t in self._completions if now - t <= window_s)
+            batches, samples = self.batches, self.samples
+            predict_time = self.predict_time
+            max_seen = self.max_batch_seen
+        return {'max_batch': self.max_batch,
+                'max_wait_ms': round(self.max_wait * 1000.0, 2),
+                'batches': batches,
+                'samples': samples,
+                'avg_batch_size': round(samples / batches, 2) if batches else 0.0,
+                'max_batch_seen': max_seen,
+                'avg_predict_ms_per_batch': round(1000.0 * predict_time / batches, 3) if batches else 0.0,
+                'throughput_per_s': round(recent / window_s, 2),
+                'latency_ms_p50': round(float(np.percentile(lat, 50)), 3) if lat is not None else None,
+                'latency_ms_p99': round(float(np.percentile(lat, 99)), 3) if lat is not None else None}
@@ -0,0 +1,216 @@
+"""
+Pipeline por etapas para la cámara local del servidor (captura -> inferencia -> emisión).
+
+Antes `video_stream` leía la cámara, detectaba la pose, evaluaba, codificaba el JPEG y lo
+emitía en un único bucle: si una etapa se retrasaba, la cámara dejaba de leerse, los frames se
+acumulaban en el buffer del driver y el feedback llegaba cada vez más tarde. Aquí cada etapa
+corre en su propio hilo:
+
+- captura: lee la cámara sin pausa y escribe en un hueco de "último frame" (capacidad 1);
+- inferencia: toma siempre el frame más reciente, detecta, clasifica y evalúa;
+- codificación/emisión: codifica el JPEG y emite el resultado.
+
+Las etapas se unen con `DropOldestQueue`, colas acotadas que al llenarse descartan el elemento
+más antiguo, así que ninguna etapa bloquea a la anterior y la latencia extremo a extremo
+queda acotada por la etapa más lenta en vez de crecer con la cola. `stats()` da, por etapa,
+fps, latencia de proceso p50/p99 y descartes, y la latencia de captura a emisión.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class DropOldestQueue:
+    """Cola acotada en la que `put` nunca bloquea: si está llena descarta el más antiguo."""
+
+    def __init__(self, maxsize=1):
+        self.maxsize = max(1, int(maxsize))
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        """Añade `item`. Devuelve True si para ello descartó otro."""
+        with self._cond:
+            dropped = len(self._items) >= self.maxsize
+            if dropped:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        return dropped
+
+    def get(self, timeout=None):
+        """Siguiente elemento, o None si se agota `timeout` o la cola está cerrada y vacía."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+def _percentile_ms(values, p):
+    return round(1000.0 * values[min(len(values) - 1, int(p * len(values)))], 2) if values else None
+
+
+class StageStats:
+    """Contadores de una etapa: elementos procesados, errores, fps y latencia de proceso."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=2000)
+        self._completions = deque(maxlen=5000)
+        self.processed = 0
+        self.errors = 0
+
+    def record(self, t_start, t_end, ok=True):
+        with self._lock:
+            self.processed += 1
+            self.errors += int(not ok)
+            self._latencies.append(t_end - t_start)
+            self._completions.append(t_end)
+
+    def stats(self, window_s=5.0):
+        now = time.perf_counter()
+        with self._lock:
+            lat = sorted(self._latencies)
+            recent = sum(1 for t in self._completions if now - t <= window_s)
+            processed, errors = self.processed, self.errors
+        return {'processed': processed,
+                'errors': errors,
+                'fps': round(recent / window_s, 2),
+                'latency_ms_p50': _percentile_ms(lat, 0.50),
+                'latency_ms_p99': _percentile_ms(lat, 0.99)}
+
+
+class VideoPipeline:
+    """Tres hilos (captura, inferencia, emisión) unidos por colas con descarte del más antiguo.
+
+    - `capture_fn()` devuelve el siguiente frame, o None cuando la fuente se termina.
+    - `infer_fn(frame)` devuelve el resultado de la inferencia para ese frame.
+    - `emit_fn(result)` codifica y envía el resultado.
+    """
+
+    def __init__(self, capture_fn, infer_fn, emit_fn, queue_size=2, name='camara'):
+        self.capture_fn = capture_fn
+        self.infer_fn = infer_fn
+        self.emit_fn = emit_fn
+        self.name = name
+        self._frames = DropOldestQueue(1)            # hueco del último frame capturado
+        self._results = DropOldestQueue(queue_size)  # inferencia -> emisión
+        self._stop = threading.Event()
+        self._threads = []
+        self._e2e_lock = threading.Lock()
+        self._end_to_end = deque(maxlen=2000)
+        self.capture = StageStats('captura')
+        self.inference = StageStats('inferencia')
+        self.emit = StageStats('emision')
+
+    def start(self):
+        for target, stage in ((self._capture_loop, 'captura'), (self._inference_loop, 'inferencia'),
+                              (self._emit_loop, 'emision')):
+            thread = threading.Thread(target=target, name=f'{self.name}-{stage}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._frames.close()
+        self._results.close()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def _capture_loop(self):
+        frame_id = 0
+        try:
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    frame = self.capture_fn()
+                except Exception as e:
+                    print(f"[PIPELINE] Error capturando frame: {e}")
+                    frame = None
+                if frame is None:
+                    break
+                t_read = time.perf_counter()   # la latencia extremo a extremo cuenta desde aquí
+                self.capture.record(t0, t_read)
+                self._frames.put((frame_id, t_read, frame))
+                frame_id += 1
+        finally:
+            # Fin de la fuente: las demás etapas terminan cuando se vacían sus colas
+            self._frames.close()
+
+    def _inference_loop(self):
+        try:
+            while True:
+                item = self._frames.get(timeout=0.5)
+                if item is None:
+                    if self._frames.closed or self._stop.is_set():
+                        break
+                    continue
+                frame_id, t_capture, frame = item
+                t0 = time.perf_counter()
+                try:
+                    result = self.infer_fn(frame)
+                    ok = True
+                except Exception as e:
+                    print(f"[PIPELINE] Error en la inferencia del frame {frame_id}: {e}")
+                    result, ok = None, False
+                self.inference.record(t0, time.perf_counter(), ok)
+                if ok:
+                    self._results.put((frame_id, t_capture, result))
+        finally:
+            self._results.close()
+
+    def _emit_loop(self):
+        while True:
+            item = self._results.get(timeout=0.5)
+            if item is None:
+                if self._results.closed or self._stop.is_set():
+                    break
+                continue
+            frame_id, t_capture, result = item
+            t0 = time.perf_counter()
+            try:
+                self.emit_fn(result)
+                ok = True
+            except Exception as e:
+                print(f"[PIPELINE] Error emitiendo el frame {frame_id}: {e}")
+                ok = False
+            t_end = time.perf_counter()
+            self.emit.record(t0, t_end, ok)
+            if ok:
+                with self._e2e_lock:
+                    self._end_to_end.append(t_end - t_capture)
+
+    def stats(self):
+        with self._e2e_lock:
+            e2e = sorted(self._end_to_end)
+        return {'running': self.running,
+                'captura': self.capture.stats(),
+                'inferencia': {**self.inference.stats(), 'dropped': self._frames.dropped},
+                'emision': {**self.emit.stats(), 'dropped': self._results.dropped,
+                            'queue': len(self._results), 'queue_size': self._results.maxsize},
+                'end_to_end_ms_p50': _percentile_ms(e2e, 0.50),
+                'end_to_end_ms_p99': _percentile_ms(e2e, 0.99)}
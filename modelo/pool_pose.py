@@ -0,0 +1,128 @@
+"""
+Pool de grafos MediaPipe Pose para evaluar frames en paralelo.
+
+Un objeto `mp.solutions.pose.Pose` no es seguro entre hilos: si todas las peticiones usan
+el mismo, el servidor queda serializado en un solo grafo. `PosePool` mantiene hasta `size`
+grafos (creados bajo demanda) que se piden con `checkout()` y se devuelven al terminar.
+
+- Modo tracking: las sesiones de streaming alquilan un grafo en exclusiva (afinidad) para
+  que el seguimiento entre frames sea del mismo usuario. Al cerrar la sesión, o tras unos
+  segundos sin frames, el grafo se descarta, así la siguiente sesión no hereda su estado de
+  seguimiento.
+- Modo estático: trabajo puntual (frames sueltos, lotes) con grafos sin estado.
+"""
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mediapipe as mp
+
+
+def create_tracking_pose():
+    return mp.solutions.pose.Pose(
+        min_detection_confidence=0.4,  # Reducido para detectar más movimientos
+        min_tracking_confidence=0.4     # Reducido para mejor seguimiento
+    )
+
+
+def create_static_pose():
+    return mp.solutions.pose.Pose(static_image_mode=True, model_complexity=1,
+                                  min_detection_confidence=0.4)
+
+
+class PosePool:
+    """Pool acotado de grafos Pose con préstamo y devolución."""
+
+    def __init__(self, factory, size=None, name='pose'):
+        self.factory = factory
+        self.size = max(1, int(size or os.cpu_count() or 2))
+        self.name = name
+        self._idle = queue.LifoQueue()  # LIFO: reutilizar el grafo más "caliente"
+        self._lock = threading.Lock()
+        self._created = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def _try_create(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def acquire(self, timeout=None):
+        """Devuelve un grafo libre; espera hasta `timeout` segundos (None = sin límite).
+        Devuelve None si se agota el tiempo."""
+        try:
+            graph = self._idle.get_nowait()
+        except queue.Empty:
+            graph = self._try_create()
+            if graph is None:
+                t0 = time.perf_counter()
+                try:
+                    graph = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+                finally:
+                    with self._lock:
+                        self.waits += 1
+                        self.wait_time += time.perf_counter() - t0
+        with self._lock:
+            self.checkouts += 1
+        return graph
+
+    def try_acquire(self):
+        """Como acquire() pero sin esperar: None si no hay grafos libres ni se pueden crear."""
+        try:
+            graph = self._idle.get_nowait()
+        except queue.Empty:
+            graph = self._try_create()
+            if graph is None:
+                return None
+        with self._lock:
+            self.checkouts += 1
+        return graph
+
+    def release(self, graph):
+        if graph is not None:
+            self._idle.put(graph)
+
+    def discard(self, graph):
+        """Cierra un grafo prestado en lugar de devolverlo (libera su hueco en el pool)."""
+        if graph is None:
+            return
+        try:
+            graph.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        graph = self.acquire(timeout=timeout)
+        if graph is None:
+            raise TimeoutError(f'No hay grafos {self.name} libres')
+        try:
+            yield graph
+        finally:
+            self.release(graph)
+
+    def stats(self):
+        with self._lock:
+            return {'size': self.size,
+                    'created': self._created,
+                    'idle': self._idle.qsize(),
+                    'in_use': self._created - self._idle.qsize(),
+                    'checkouts': self.checkouts,
+                    'waits': self.waits,
+                    'avg_wait_ms': round(1000 * self.wait_time / self.waits, 2) if self.waits else 0.0}
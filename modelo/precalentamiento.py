@@ -0,0 +1,132 @@
+"""
+Precalentamiento de la caché de referencias al arrancar el servidor.
+
+Recorre `dataset/<condición>/<video>` y extrae en un pool de procesos la secuencia de
+landmarks de cada video que todavía no esté en la caché. Cada proceso trabajador del
+`ExtractionPool` crea un único grafo MediaPipe al iniciar y lo reutiliza para todos sus
+videos. El progreso se expone con `status()` para que el servidor lo publique en un endpoint.
+"""
+
+import threading
+import time
+from concurrent.futures import as_completed
+from pathlib import Path
+
+from extraccion_paralela import ExtractionPool
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+
+
+def list_dataset_videos(dataset_dir='dataset'):
+    """Devuelve las rutas de todos los videos en dataset/<condición>/, ordenadas."""
+    dataset_dir = Path(dataset_dir)
+    if not dataset_dir.exists():
+        return []
+    videos = []
+    for condition in sorted(d for d in dataset_dir.iterdir() if d.is_dir()):
+        videos.extend(sorted(f for f in condition.iterdir()
+                             if f.is_file() and f.suffix.lower() in VIDEO_EXTENSIONS))
+    return videos
+
+
+class ReferenceWarmup:
+    """Extrae en segundo plano todas las referencias del dataset hacia `cache`."""
+
+    def __init__(self, cache, dataset_dir='dataset', target_fps=3, max_samples=600, pool=None, workers=None):
+        self.cache = cache
+        self.dataset_dir = dataset_dir
+        self.target_fps = target_fps
+        self.max_samples = max_samples
+        self.pool = pool
+        self.workers = pool.workers if pool is not None else workers
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {
+            'state': 'pendiente',  # pendiente | en_progreso | completado | error
+            'total': 0,
+            'ya_en_cache': 0,
+            'extraidos': 0,
+            'fallidos': 0,
+            'workers': self.workers,
+            'started_at': None,
+            'finished_at': None,
+            'elapsed_s': None,
+            'errores': [],
+        }
+
+    def _update(self, **kwargs):
+        with self._lock:
+            self._status.update(kwargs)
+
+    def _increment(self, field):
+        with self._lock:
+            self._status[field] += 1
+
+    def status(self):
+        with self._lock:
+            st = dict(self._status)
+            st['errores'] = list(self._status['errores'])
+        done = st['ya_en_cache'] + st['extraidos'] + st['fallidos']
+        st['pendientes'] = max(0, st['total'] - done)
+        st['progreso'] = round(done / st['total'], 3) if st['total'] else (1.0 if st['state'] == 'completado' else 0.0)
+        if st['started_at'] and st['finished_at'] is None:
+            st['elapsed_s'] = round(time.time() - st['started_at'], 2)
+        return st
+
+    def start(self):
+        """Lanza el precalentamiento en un hilo daemon; el servidor sigue atendiendo."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='warmup-referencias', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        started = time.time()
+        self._update(state='en_progreso', started_at=started)
+        try:
+            videos = list_dataset_videos(self.dataset_dir)
+            pending = []
+            for v in videos:
+                try:
+                    if self.cache.contains(v, target_fps=self.target_fps, max_samples=self.max_samples):
+                        self._increment('ya_en_cache')
+                        continue
+                except OSError:
+                    pass
+                pending.append(str(v))
+            self._update(total=len(videos))
+            print(f"[WARMUP] {len(videos)} videos en dataset, {len(pending)} por extraer")
+
+            if pending:
+                own_pool = self.pool is None
+                pool = ExtractionPool(workers=self.workers) if own_pool else self.pool
+                self._update(workers=pool.workers)
+                try:
+                    futures = {pool.submit_video(v, target_fps=self.target_fps, max_samples=self.max_samples): v
+                               for v in pending}
+                    for fut in as_completed(futures):
+                        video = futures[fut]
+                        try:
+                            path, seq, timestamps, _, _ = fut.result()
+                            self.cache.store(path, seq, timestamps, target_fps=self.target_fps,
+                                             max_samples=self.max_samples)
+                            self._increment('extraidos')
+                        except Exception as e:
+                            print(f"[WARMUP][ERROR] {video}: {e}")
+                            with self._lock:
+                                self._status['fallidos'] += 1
+                                self._status['errores'].append({'video': video, 'error': str(e)})
+                finally:
+                    if own_pool:
+                        pool.shutdown()
+
+            finished = time.time()
+            self._update(state='completado', finished_at=finished, elapsed_s=round(finished - started, 2))
+            print(f"[WARMUP] ✓ Referencias listas en {finished - started:.1f}s")
+        except Exception as e:
+            finished = time.time()
+            self._update(state='error', finished_at=finished, elapsed_s=round(finished - started, 2))
+            with self._lock:
+                self._status['errores'].append({'video': None, 'error': str(e)})
+            print(f"[WARMUP][ERROR] Falló el precalentamiento: {e}")
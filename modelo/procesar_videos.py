@@ -1,52 +1,40 @@
 import os
 import cv2
 import argparse
-import pandas as pd
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 from tqdm import tqdm
-
-# -- Helpers copied from entrenar_modelo.py
-
-def extract_frames_from_video(video_path, target_fps=1):
-    frames = []
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        return frames
-    orig_fps = cap.get(cv2.CAP_PROP_FPS) or 30
-    step = max(1, int(round(orig_fps / target_fps)))
-    idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if idx % step == 0:
-            frames.append(frame)
-        idx += 1
-    cap.release()
-    return frames
+from decodificador import DecodeStats, iter_sampled_frames
+from extraccion_paralela import ExtractionPool
+from almacen_landmarks import LandmarkStore, store_to_csv
 
 
 def process_frame_landmarks(frame, detector):
+    """(landmarks [x,y,z,...], visibilidad media) del frame, o (None, None)."""
     try:
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         imagen_mp = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
         resultado = detector.detect(imagen_mp)
         if resultado.pose_landmarks:
-            landmarks = [coord for landmark in resultado.pose_landmarks[0] for coord in [landmark.x, landmark.y, landmark.z]]
-            return landmarks
+            pose = resultado.pose_landmarks[0]
+            landmarks = [coord for landmark in pose for coord in [landmark.x, landmark.y, landmark.z]]
+            return landmarks, sum(lm.visibility or 0.0 for lm in pose) / len(pose)
     except Exception as e:
-        return None
-    return None
+        return None, None
+    return None, None
 
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Procesar videos para extraer frames y generar CSV con landmarks')
+    parser = argparse.ArgumentParser(description='Procesar videos para extraer frames y generar un almacén de landmarks')
     parser.add_argument('--input-dir', type=str, default='dataset', help='Carpeta raíz con subcarpetas por clase que contienen videos')
     parser.add_argument('--fps', type=int, default=1, help='FPS a extraer de cada video')
+    parser.add_argument('--max-width', type=int, default=None, help='Decodificar videos a este ancho máximo (usa ffmpeg si está disponible)')
     parser.add_argument('--save-frames', action='store_true', help='Guardar frames extraídos en disco (subcarpeta frames/)')
-    parser.add_argument('--output', type=str, default='dataset_posturas_videos.csv', help='Archivo CSV de salida')
+    parser.add_argument('--output', type=str, default='dataset_posturas_videos.lmk', help='Almacén binario de salida (directorio .lmk)')
+    parser.add_argument('--append', action='store_true', help='Añadir al almacén existente en vez de reconstruirlo')
+    parser.add_argument('--csv', type=str, default=None, help='Exportar también a este CSV (formato clásico)')
+    parser.add_argument('--workers', type=int, default=1, help='Procesos para extraer cada video por rangos en paralelo (no compatible con --save-frames)')
     args = parser.parse_args()
 
     # Configurar MediaPipe
@@ -54,6 +42,14 @@ if __name__ == '__main__':
     options = vision.PoseLandmarkerOptions(base_options=base_options, min_pose_detection_confidence=0.5)
     detector = vision.PoseLandmarker.create_from_options(options)
 
+    # Extracción paralela por rangos: cada proceso crea su propio PoseLandmarker
+    pool = None
+    if args.workers > 1:
+        if args.save_frames:
+            print("WARN: --save-frames requiere los frames en este proceso; se usa extracción secuencial")
+        else:
+            pool = ExtractionPool(workers=args.workers, detector='tasks')
+
     # Recorrer input dir
     if not os.path.exists(args.input_dir):
         print(f"Error: {args.input_dir} no existe")
@@ -67,8 +63,10 @@ if __name__ == '__main__':
 
     print(f"Clases detectadas: {classes}")
 
-    dataset = []
-    columnas = [f'lm_{i}_{coord}' for i in range(33) for coord in ['x','y','z']]
+    # Landmarks crudos (sin normalizar); cada video se añade en cuanto termina
+    store = LandmarkStore(args.output, normalized=False)
+    if not args.append:
+        store.clear(normalized=False)
     video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
 
     for cls in classes:
@@ -77,24 +75,51 @@ if __name__ == '__main__':
         print(f"Procesando {len(videos)} videos para clase '{cls}'")
         for v in tqdm(videos, desc=f"{cls}"):
             vpath = os.path.join(cls_path, v)
-            frames = extract_frames_from_video(vpath, target_fps=args.fps)
-            if not frames:
+            source = f"{cls}/{v}"
+            if pool is not None:
+                try:
+                    seq, timestamps, frame_ids, confidences = pool.extract(
+                        vpath, target_fps=args.fps, max_width=args.max_width, provenance=True)
+                except ValueError:
+                    seq, timestamps, frame_ids, confidences = [], [], [], []
+                if not seq:
+                    print(f"WARN: No se detectaron landmarks en {vpath}")
+                store.append(seq, cls, sources=source, frames=frame_ids, timestamps=timestamps,
+                             confidences=confidences)
+                continue
+            stats = DecodeStats()
+            try:
+                frames = iter_sampled_frames(vpath, target_fps=args.fps, max_width=args.max_width, stats=stats)
+            except ValueError:
                 print(f"WARN: No se pudieron extraer frames de {vpath}")
                 continue
             if args.save_frames:
                 frames_dir = os.path.join(cls_path, 'frames', os.path.splitext(v)[0])
                 os.makedirs(frames_dir, exist_ok=True)
-            for i, f in enumerate(frames):
-                lands = process_frame_landmarks(f, detector)
+            rows, frame_ids, timestamps, confidences = [], [], [], []
+            # Cada frame se procesa (y se guarda si se pide) antes de decodificar el siguiente
+            for i, (frame_idx, timestamp, f) in enumerate(frames):
+                lands, confidence = process_frame_landmarks(f, detector)
                 if lands:
-                    dataset.append(lands + [cls])
+                    rows.append(lands)
+                    frame_ids.append(frame_idx)
+                    timestamps.append(timestamp)
+                    confidences.append(confidence)
                     if args.save_frames:
                         fname = os.path.join(frames_dir, f"frame_{i:04d}.jpg")
                         cv2.imwrite(fname, f)
+            if stats.frames_yielded:
+                print(f"  {v}: {stats}")
+            store.append(rows, cls, sources=source, frames=frame_ids, timestamps=timestamps,
+                         confidences=confidences)
+
+    if pool is not None:
+        pool.shutdown()
 
-    if dataset:
-        df = pd.DataFrame(dataset, columns=columnas + ['clase'])
-        df.to_csv(args.output, index=False)
-        print(f"CSV generado: {args.output} con {len(df)} filas")
+    if len(store):
+        print(f"Almacén generado: {args.output} con {len(store)} filas")
+        if args.csv:
+            store_to_csv(args.output, args.csv)
+            print(f"CSV exportado: {args.csv}")
     else:
         print("No se generó dataset: no se detectaron landmarks en los videos")
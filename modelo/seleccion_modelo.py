@@ -0,0 +1,144 @@
+"""
+Selección de modelo con presupuesto de latencia.
+
+El clasificador de posturas se ejecuta en cada frame en vivo, así que elegirlo solo por
+precisión no basta. `sweep` entrena en paralelo una rejilla de candidatos (bosques de
+distintos tamaños y profundidades, gradient boosting y modelos lineales), y después mide en
+el proceso principal, uno a uno y sin competir por CPU:
+
+- precisión y F1 macro sobre el conjunto de prueba,
+- latencia p50/p99 de `predict` con una sola muestra y con un lote,
+- memoria del modelo serializado.
+
+Para los bosques la latencia de servicio es la del evaluador compilado (`bosque_compilado`),
+que es lo que usa `app.py`; la de scikit-learn se guarda también como referencia.
+`select_model` elige el más preciso cuyo p99 por muestra cabe en el presupuesto por frame
+y `save_table` guarda la tabla completa junto a los artefactos.
+"""
+
+import csv
+import json
+import pickle
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import LinearSVC
+
+from bosque_compilado import CompiledForest, is_forest
+
+
+def default_candidates(random_state=42):
+    """Rejilla por defecto: lista de (nombre, estimador sin entrenar)."""
+    candidates = []
+    for n in (50, 100, 200, 400):
+        for depth in (8, 12, None):
+            candidates.append((f'rf_{n}_d{depth or "max"}',
+                               RandomForestClassifier(n_estimators=n, max_depth=depth, min_samples_leaf=2,
+                                                      random_state=random_state)))
+    for n in (100, 200):
+        candidates.append((f'extra_{n}_d12',
+                           ExtraTreesClassifier(n_estimators=n, max_depth=12, min_samples_leaf=2,
+                                                random_state=random_state)))
+    for iters in (100, 300):
+        for depth in (3, 6):
+            candidates.append((f'hgb_{iters}_d{depth}',
+                               HistGradientBoostingClassifier(max_iter=iters, max_depth=depth,
+                                                              random_state=random_state)))
+    candidates.append(('logreg', make_pipeline(StandardScaler(), LogisticRegression(max_iter=2000))))
+    candidates.append(('linear_svc', make_pipeline(StandardScaler(), LinearSVC(dual=False))))
+    return candidates
+
+
+def _fit(name, estimator, X_train, y_train):
+    t0 = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    return name, estimator, time.perf_counter() - t0
+
+
+def _percentiles_ms(fn, X, repeats):
+    fn(X)  # calentar cachés
+    times = np.empty(repeats)
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        fn(X)
+        times[i] = time.perf_counter() - t0
+    return float(np.percentile(times, 50) * 1000), float(np.percentile(times, 99) * 1000)
+
+
+def measure_latency(predict_fn, X, repeats=200, batch_size=32):
+    """Latencias p50/p99 (ms) de `predict_fn` para una muestra y para un lote de `batch_size`."""
+    rng = np.random.default_rng(0)
+    single = X[rng.integers(0, len(X))][None, :]
+    batch = X[rng.integers(0, len(X), batch_size)]
+    s50, s99 = _percentiles_ms(predict_fn, single, repeats)
+    b50, b99 = _percentiles_ms(predict_fn, batch, max(10, repeats // 4))
+    return {'single_p50_ms': round(s50, 3), 'single_p99_ms': round(s99, 3),
+            'batch_p50_ms': round(b50, 3), 'batch_p99_ms': round(b99, 3), 'batch_size': batch_size}
+
+
+def sweep(X_train, y_train, X_test, y_test, candidates=None, n_jobs=-1, repeats=200, batch_size=32):
+    """Entrena los candidatos en paralelo y devuelve (filas de la tabla, modelos entrenados por nombre)."""
+    candidates = candidates or default_candidates()
+    X_test = np.ascontiguousarray(X_test, dtype=np.float32)
+    fitted = Parallel(n_jobs=n_jobs)(delayed(_fit)(name, est, X_train, y_train) for name, est in candidates)
+
+    rows, models = [], {}
+    for name, model, fit_s in fitted:
+        models[name] = model
+        y_pred = model.predict(X_test)
+        row = {'model': name,
+               'family': type(model[-1] if hasattr(model, 'steps') else model).__name__,
+               'accuracy': round(float(accuracy_score(y_test, y_pred)), 4),
+               'f1_macro': round(float(f1_score(y_test, y_pred, average='macro')), 4),
+               'fit_s': round(fit_s, 2),
+               'memory_mb': round(len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 2 ** 20, 2)}
+        sk = measure_latency(model.predict, X_test, repeats, batch_size)
+        row.update({f'sklearn_{k}': v for k, v in sk.items() if k != 'batch_size'})
+        if is_forest(model):
+            compiled = CompiledForest.from_model(model)
+            lat = measure_latency(compiled.predict, X_test, repeats, batch_size)
+            row['engine'] = 'compilado'
+            row['memory_mb'] = round(sum(getattr(compiled, a).nbytes for a in
+                                         ('roots', 'feature', 'threshold', 'left', 'right', 'value')) / 2 ** 20, 2)
+        else:
+            lat = sk
+            row['engine'] = 'scikit-learn'
+        row.update(lat)
+        rows.append(row)
+        print(f"  {name:<16} acc={row['accuracy']:.3f}  p50={row['single_p50_ms']:.2f}ms  "
+              f"p99={row['single_p99_ms']:.2f}ms  [{row['engine']}]")
+    return rows, models
+
+
+def select_model(rows, budget_ms):
+    """Nombre del modelo más preciso con p99 por muestra <= budget_ms (desempate: menor p50).
+    Si ninguno cabe en el presupuesto, el más rápido. Marca la fila elegida con 'selected'."""
+    within = [r for r in rows if r['single_p99_ms'] <= budget_ms]
+    if within:
+        best = max(within, key=lambda r: (r['accuracy'], r['f1_macro'], -r['single_p50_ms']))
+    else:
+        print(f"WARN: ningún modelo cumple el presupuesto de {budget_ms} ms; se elige el más rápido")
+        best = min(rows, key=lambda r: r['single_p99_ms'])
+    for r in rows:
+        r['within_budget'] = r['single_p99_ms'] <= budget_ms
+        r['selected'] = r is best
+    return best['model']
+
+
+def save_table(rows, budget_ms, path_stem='seleccion_modelo'):
+    """Guarda la tabla de compromisos en `<stem>.csv` y `<stem>.json` (con el presupuesto)."""
+    rows = sorted(rows, key=lambda r: (-r['accuracy'], r['single_p99_ms']))
+    fields = list(dict.fromkeys(k for r in rows for k in r))
+    with open(f'{path_stem}.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(f'{path_stem}.json', 'w', encoding='utf-8') as f:
+        json.dump({'budget_ms': budget_ms, 'models': rows}, f, indent=2)
+    return f'{path_stem}.csv', f'{path_stem}.json'
@@ -0,0 +1,123 @@
+"""
+Servidor de producción pre-fork (Linux / macOS) con gunicorn.
+
+`python app.py` usa el servidor de desarrollo de Werkzeug en un solo proceso, y escalarlo con
+procesos independientes duplica en cada uno el bosque de 400 árboles. Aquí:
+
+- El proceso maestro importa `app.py` y ejecuta solo las etapas de arranque sin hilos ni
+  grafos: importaciones, modelo y bosque compilado. Con MODEL_MMAP (activo por defecto) los
+  arrays se abren con joblib `mmap_mode='r'` y el bosque compilado se guarda como
+  `modelo_compilado.joblib`, así que tras el fork todos los workers comparten esas páginas.
+- Cada worker completa el arranque después del fork, en segundo plano: pools de grafos Pose
+  propios, micro-lotes, pool de extracción y calentamiento. /api/ready responde por worker.
+
+Por defecto arranca un solo worker con 32 hilos. gunicorn reparte cada petición al worker
+que la acepta, y ningún proxy delante puede fijar un cliente a un worker concreto:
+
+- Socket.IO por sondeo largo (el `io()` de templates/index.html empieza así) hace el
+  handshake y los sondeos en peticiones distintas; con varios workers caen en procesos
+  diferentes y el servidor responde "Invalid session". La cola de Redis no lo evita: solo
+  reenvía emits entre workers, no comparte las sesiones de Engine.IO.
+- Las sesiones de evaluación (referencia cargada, buffers de suavizado, DTW) viven en el
+  worker que atiende la petición; con varios workers, las peticiones HTTP de un mismo
+  `X-Session-Id` verían estados distintos.
+
+Por eso `--workers` mayor que 1 exige `--websocket-only`: el operador acepta que solo
+funcionan clientes Socket.IO con transporte WebSocket directo (la conexión se queda en su
+worker) y sin estado HTTP. En ese modo los emits entre workers pasan por una cola de
+mensajes local (SOCKETIO_MESSAGE_QUEUE, por defecto redis://127.0.0.1:6379/0).
+
+Uso:
+    python servidor_produccion.py --threads 32 --port 5000
+    python servidor_produccion.py --workers 4 --websocket-only
+"""
+
+import argparse
+import os
+
+MASTER_LAST_STAGE = 'bosque_compilado'
+
+
+def configure_environment(workers):
+    """Valores por defecto de producción; las variables ya definidas tienen prioridad.
+    Se fijan antes de importar app.py, que las lee al importarse."""
+    cores = os.cpu_count() or 2
+    per_worker = str(max(1, cores // workers))
+    os.environ.setdefault('MODEL_MMAP', '1')
+    os.environ.setdefault('LOCAL_CAMERA', '0')
+    os.environ.setdefault('POSE_POOL_SIZE', per_worker)
+    os.environ.setdefault('EXTRACTION_WORKERS', per_worker)
+    if workers > 1:
+        os.environ.setdefault('SOCKETIO_MESSAGE_QUEUE', 'redis://127.0.0.1:6379/0')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor pre-fork (gunicorn) del backend de posturas')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', 1)),
+                        help='Procesos worker (por defecto 1; más de uno exige --websocket-only)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('THREADS', 32)),
+                        help='Hilos por worker para atender peticiones')
+    parser.add_argument('--websocket-only', action='store_true',
+                        default=os.environ.get('WEBSOCKET_ONLY', '0') != '0',
+                        help='Acepta varios workers: solo clientes Socket.IO por WebSocket, sin sondeo '
+                             'largo ni sesiones HTTP con estado')
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('WORKER_TIMEOUT', 120)),
+                        help='Segundos sin respuesta antes de reiniciar un worker')
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    if workers > 1 and not args.websocket_only:
+        print("[PROD][ERROR] Con varios workers, Socket.IO por sondeo largo falla ('Invalid session') y "
+              "las sesiones HTTP se reparten entre procesos. Usa --workers 1 con más --threads, "
+              "o añade --websocket-only si todos los clientes usan WebSocket directo.")
+        raise SystemExit(2)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("[PROD][ERROR] gunicorn no está instalado (pip install gunicorn). En Windows usa: python app.py")
+        raise SystemExit(1)
+
+    configure_environment(workers)
+    import app as servidor
+
+    # Modelo y bosque compilado en el maestro, antes del fork (páginas compartidas)
+    if not servidor.boot.run(until=MASTER_LAST_STAGE):
+        print(f"[PROD][ERROR] Falló el arranque en el proceso maestro: {servidor.boot.error}")
+        raise SystemExit(1)
+
+    def post_fork(server, worker):
+        # Solo el primer worker precalienta las referencias del dataset (la caché en disco es común)
+        if worker.age > 1:
+            os.environ['WARMUP_ON_START'] = '0'
+        servidor.boot.start()
+
+    class PreforkApplication(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    options = {'bind': f'{args.host}:{args.port}',
+               'workers': workers,
+               'worker_class': 'gthread',
+               'threads': args.threads,
+               'timeout': args.timeout,
+               'graceful_timeout': 30,
+               'post_fork': post_fork}
+    print(f"[PROD] {workers} workers x {args.threads} hilos en {args.host}:{args.port} "
+          f"(mmap={os.environ['MODEL_MMAP'] != '0'}, "
+          f"cola Socket.IO={os.environ.get('SOCKETIO_MESSAGE_QUEUE') or 'ninguna'})")
+    PreforkApplication(servidor.app, options).run()
+
+
+if __name__ == '__main__':
+    main()
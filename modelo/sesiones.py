@@ -0,0 +1,228 @@
+"""
+Estado por cliente para el servidor de evaluación.
+
+Cada teléfono o pestaña del navegador tiene su propia `ClientSession` con su referencia,
+índice sincronizado, tolerancia y buffers circulares de suavizado (`suavizado.py`), en lugar de variables globales
+compartidas. `SessionRegistry` limita la memoria: desaloja sesiones inactivas tras
+`idle_timeout` segundos y, si se supera `max_sessions`, la usada hace más tiempo (LRU).
+Las secuencias de referencia se comparten con la caché (no se copian por sesión).
+`LeaseTotals` cuenta los alquileres de grafos tracking por sesión (y cuándo el pool se agotó).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from landmarks_compactos import ReferenceSequence
+from suavizado import LandmarkSmoother
+
+
+class ClientSession:
+    """Estado de evaluación de un cliente. `lock` serializa sus peticiones concurrentes."""
+
+    def __init__(self, session_id, buffer_size=3, alignment='sync', smoothing='none', motion_gate=None):
+        self.session_id = session_id
+        self.buffer_size = buffer_size
+        self.smoothing = smoothing
+        self.reference_landmarks = None     # Frame (33, 4) de la imagen de referencia (single)
+        self.reference_sequence = []        # ReferenceSequence (T, 33, 4) del video de referencia
+        self.reference_fps = 1              # FPS de la secuencia de referencia
+        self.reference_index = 0            # Índice de frame de referencia sincronizado desde cliente
+        self.alignment = alignment          # 'sync': la fase la envía el cliente; 'auto' (opt-in): la estima el servidor
+        self.phase_searcher = None          # PhaseSearcher sobre reference_sequence (modo 'auto')
+        self.tolerance = 1.0                # Factor de tolerancia: >1 más permisivo, <1 más estricto
+        self.stream_smoother = LandmarkSmoother(buffer_size, smoothing)  # Buffer circular del stream Socket.IO
+        self.http_smoother = LandmarkSmoother(buffer_size, smoothing)    # Buffer circular de los endpoints HTTP
+        self.motion_gate = motion_gate      # MotionGate: reutiliza la predicción mientras no hay movimiento
+        self.is_socket = False              # True si la sesión es un cliente Socket.IO conectado
+        self.stream_dtw = None              # DTW en línea del stream Socket.IO (StreamingDTW)
+        self.http_dtw = None                # DTW en línea de los frames HTTP / canal de evaluación
+        self.pose_graph = None              # Grafo Pose tracking alquilado en exclusiva (afinidad)
+        self.pose_last_used = 0.0           # Último frame procesado con ese grafo (time.time())
+        self.pose_lock = threading.Lock()   # Un solo frame a la vez por grafo
+        self.lock = threading.RLock()
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+
+    def touch(self):
+        self.last_seen = time.time()
+
+    def set_reference_sequence(self, seq, ref_fps):
+        """`seq` es una ReferenceSequence (compartida con la caché, sin copiar) o una lista
+        de frames que se compacta aquí."""
+        if not isinstance(seq, ReferenceSequence):
+            seq = ReferenceSequence(seq)
+        self.reference_sequence = seq
+        self.reference_landmarks = seq[0] if len(seq) else None
+        self.reference_index = 0
+        self.reference_fps = max(1, int(ref_fps))
+        self.stream_dtw = None
+        self.http_dtw = None
+        self.phase_searcher = None
+
+    def sync_time(self, t):
+        if self.alignment == 'auto':
+            return self.reference_index     # la fase la estima el servidor; se ignora el tiempo del cliente
+        self.reference_index = max(0, int(round(float(t) * self.reference_fps)))
+        return self.reference_index
+
+    def current_reference_frame(self):
+        """Frame de referencia en el índice sincronizado (o el landmark único), o None."""
+        if self.reference_sequence:
+            idx = min(max(0, self.reference_index), len(self.reference_sequence) - 1)
+            return self.reference_sequence[idx]
+        return self.reference_landmarks
+
+    def evaluation_reference(self, user_seq):
+        """Referencia para evaluate_posture: la secuencia completa (DTW temporal) en cuanto el
+        buffer `user_seq` (k, 33, 4) tiene dos o más frames; si no, el frame sincronizado."""
+        if self.reference_sequence and len(user_seq) > 1:
+            return self.reference_sequence
+        return self.current_reference_frame()
+
+    def push_stream_landmarks(self, landmarks):
+        """Añade un frame (33, 4) al buffer del stream; devuelve el frame filtrado."""
+        return self.stream_smoother.push(landmarks)
+
+    def push_http_landmarks(self, landmarks):
+        return self.http_smoother.push(landmarks)
+
+    def summary(self):
+        now = time.time()
+        return {'session_id': self.session_id,
+                'socket': self.is_socket,
+                'reference_frames': len(self.reference_sequence),
+                'reference_index': self.reference_index,
+                'reference_fps': self.reference_fps,
+                'alignment': self.alignment,
+                'phase_search': self.phase_searcher.stats() if self.phase_searcher is not None else None,
+                'tolerance': self.tolerance,
+                'motion_gate': self.motion_gate.stats() if self.motion_gate is not None else None,
+                'smoothing': {'stream': self.stream_smoother.jitter_stats(),
+                              'http': self.http_smoother.jitter_stats()},
+                'age_s': round(now - self.created_at, 1),
+                'idle_s': round(now - self.last_seen, 1)}
+
+
+class SessionRegistry:
+    """Registro de sesiones con expiración por inactividad y desalojo LRU."""
+
+    def __init__(self, max_sessions=64, idle_timeout=900, buffer_size=3, on_evict=None, alignment='sync',
+                 smoothing='none', gate_factory=None):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout = float(idle_timeout)
+        self.buffer_size = buffer_size
+        self.on_evict = on_evict
+        self.alignment = alignment
+        self.smoothing = smoothing
+        self.gate_factory = gate_factory
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def _evict(self, session, reason):
+        if self.on_evict is not None:
+            try:
+                self.on_evict(session, reason)
+            except Exception as e:
+                print(f"[SESIONES] Error liberando sesión {session.session_id}: {e}")
+
+    def _collect_expired(self, now):
+        expired = []
+        # Las sesiones más antiguas están al principio del OrderedDict
+        for sid, session in list(self._sessions.items()):
+            if now - session.last_seen <= self.idle_timeout:
+                break
+            if session.is_socket:
+                continue  # las conexiones Socket.IO se liberan al desconectar
+            del self._sessions[sid]
+            expired.append(session)
+        return expired
+
+    def get(self, session_id, create=True):
+        """Devuelve la sesión (creándola si hace falta) y la marca como usada."""
+        now = time.time()
+        evicted = []
+        with self._lock:
+            expired = self._collect_expired(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                if not create:
+                    return None
+                session = ClientSession(session_id, buffer_size=self.buffer_size, alignment=self.alignment,
+                                        smoothing=self.smoothing,
+                                        motion_gate=self.gate_factory() if self.gate_factory else None)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    # Preferir desalojar sesiones HTTP antes que conexiones Socket.IO vivas
+                    victim = next((sid for sid, s in self._sessions.items()
+                                   if not s.is_socket and sid != session_id), None)
+                    if victim is None:
+                        victim = next(iter(self._sessions))
+                    evicted.append(self._sessions.pop(victim))
+            self._sessions.move_to_end(session_id)
+            session.last_seen = now
+            self.evicted_idle += len(expired)
+            self.evicted_lru += len(evicted)
+        for s in expired:
+            self._evict(s, 'inactividad')
+        for s in evicted:
+            self._evict(s, 'lru')
+        return session
+
+    def remove(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._evict(session, 'cerrada')
+        return session
+
+    def values(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def socket_sessions(self):
+        with self._lock:
+            return [s for s in self._sessions.values() if s.is_socket]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            sessions = [s.summary() for s in self._sessions.values()]
+        return {'active': len(sessions),
+                'max_sessions': self.max_sessions,
+                'idle_timeout_s': self.idle_timeout,
+                'evicted_idle': self.evicted_idle,
+                'evicted_lru': self.evicted_lru,
+                'sessions': sessions}
+
+
+class LeaseTotals:
+    """Contadores de alquiler de grafos tracking compartidos por todas las sesiones."""
+
+    def __init__(self, idle_timeout):
+        self._lock = threading.Lock()
+        self.idle_timeout = float(idle_timeout)
+        self.leases = 0
+        self.exhausted = 0      # sesiones de streaming que se quedaron sin grafo tracking
+        self.reclaimed = 0      # alquileres liberados por inactividad
+        self.one_off = 0        # llamadas sin sesión de streaming (grafo estático)
+
+    def add(self, leases=0, exhausted=0, reclaimed=0, one_off=0):
+        with self._lock:
+            self.leases += leases
+            self.exhausted += exhausted
+            self.reclaimed += reclaimed
+            self.one_off += one_off
+
+    def stats(self):
+        with self._lock:
+            return {'idle_timeout_s': self.idle_timeout,
+                    'leases': self.leases,
+                    'exhausted': self.exhausted,
+                    'reclaimed': self.reclaimed,
+                    'one_off': self.one_off}
@@ -0,0 +1,214 @@
+"""
+Suavizado de landmarks en streaming.
+
+`LandmarkSmoother` sustituye a las listas recortadas con `pop(0)` y promediadas con
+`np.mean` en cada frame: guarda los últimos `size` frames (33, 4) en un buffer circular
+preasignado y mantiene su suma acumulada, así que añadir un frame y obtener la media son O(1)
+sin reservar memoria. Antes de entrar al buffer cada frame puede pasar por un filtro por
+articulación:
+
+- 'one_euro': filtro One-Euro (paso bajo adaptativo: suaviza mucho en reposo y poco en
+  movimientos rápidos, con poco retraso).
+- 'kalman': Kalman de velocidad constante independiente por coordenada.
+- 'none': sin filtro (solo la media del buffer, como antes).
+
+También lleva estadísticas de jitter por articulación: la media de |segunda diferencia|² de
+la posición XY, en crudo y tras el filtro.
+"""
+
+import time
+
+import numpy as np
+
+from landmarks_compactos import FRAME_SHAPE
+
+FILTERS = ('none', 'one_euro', 'kalman')
+
+
+class OneEuroFilter:
+    """One-Euro vectorizado sobre un array de coordenadas (Casiez et al., 2012).
+    `min_cutoff` en Hz; `beta` escala la velocidad en coordenadas normalizadas por segundo."""
+
+    def __init__(self, min_cutoff=1.5, beta=10.0, d_cutoff=1.0):
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        self.x_hat = None
+        self.dx_hat = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2.0 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def reset(self):
+        self.x_hat = None
+        self.dx_hat = None
+
+    def __call__(self, x, dt):
+        if self.x_hat is None:
+            self.x_hat = x.astype(np.float64)
+            self.dx_hat = np.zeros_like(self.x_hat)
+            return self.x_hat
+        dx = (x - self.x_hat) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.dx_hat += a_d * (dx - self.dx_hat)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.dx_hat)
+        a = self._alpha(cutoff, dt)
+        self.x_hat += a * (x - self.x_hat)
+        return self.x_hat
+
+
+class ConstantVelocityKalman:
+    """Kalman posición-velocidad independiente por coordenada, vectorizado.
+    `process_noise` es la varianza de la aceleración y `measurement_noise` la del detector."""
+
+    def __init__(self, process_noise=2.0, measurement_noise=1e-4):
+        self.q = float(process_noise)
+        self.r = float(measurement_noise)
+        self.p = None
+
+    def reset(self):
+        self.p = None
+
+    def __call__(self, z, dt):
+        if self.p is None:
+            self.p = z.astype(np.float64)
+            self.v = np.zeros_like(self.p)
+            self.P00 = np.full_like(self.p, self.r)
+            self.P01 = np.zeros_like(self.p)
+            self.P11 = np.full_like(self.p, 1.0)
+            return self.p
+        # Predicción
+        q = self.q
+        self.p += self.v * dt
+        P00 = self.P00 + dt * (2.0 * self.P01 + dt * self.P11) + q * dt ** 4 / 4.0
+        P01 = self.P01 + dt * self.P11 + q * dt ** 3 / 2.0
+        P11 = self.P11 + q * dt ** 2
+        # Corrección con la medida z
+        s = P00 + self.r
+        k0 = P00 / s
+        k1 = P01 / s
+        y = z - self.p
+        self.p += k0 * y
+        self.v += k1 * y
+        self.P00 = (1.0 - k0) * P00
+        self.P01 = (1.0 - k0) * P01
+        self.P11 = P11 - k1 * P01
+        return self.p
+
+
+class LandmarkSmoother:
+    """Buffer circular de frames (33, 4) con media O(1), filtro opcional y jitter por articulación."""
+
+    def __init__(self, size=3, filter='none', reset_gap=2.0, **filter_params):
+        if filter not in FILTERS:
+            raise ValueError(f"filtro desconocido: {filter} (opciones: {', '.join(FILTERS)})")
+        self.size = max(1, int(size))
+        self.filter_name = filter
+        self.reset_gap = float(reset_gap)
+        self._buf = np.zeros((self.size,) + FRAME_SHAPE, dtype=np.float32)
+        self._sum = np.zeros(FRAME_SHAPE, dtype=np.float64)
+        self._head = 0          # posición donde se escribirá el siguiente frame
+        self._count = 0
+        self._pushes = 0
+        self._last_t = None
+        if filter == 'one_euro':
+            self._filter = OneEuroFilter(**filter_params)
+        elif filter == 'kalman':
+            self._filter = ConstantVelocityKalman(**filter_params)
+        else:
+            self._filter = None
+        # Jitter: últimas dos posiciones XY (crudas y filtradas) y acumulados por articulación
+        self._raw_prev = []
+        self._out_prev = []
+        self._jitter_raw = np.zeros(FRAME_SHAPE[0])
+        self._jitter_out = np.zeros(FRAME_SHAPE[0])
+        self._jitter_n = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._sum[:] = 0.0
+        self._head = 0
+        self._count = 0
+        self._last_t = None
+        self._raw_prev = []
+        self._out_prev = []
+        if self._filter is not None:
+            self._filter.reset()
+
+    def _jitter_update(self, history, xy):
+        history.append(xy)
+        if len(history) > 3:
+            history.pop(0)
+        if len(history) < 3:
+            return None
+        accel = history[2] - 2.0 * history[1] + history[0]
+        return (accel ** 2).sum(axis=1)
+
+    def push(self, frame, t=None):
+        """Añade un frame (33, 4); devuelve el frame filtrado (vista en el buffer)."""
+        t = time.perf_counter() if t is None else float(t)
+        if self._last_t is not None and t - self._last_t > self.reset_gap:
+            self.clear()      # hueco largo: empezar un seguimiento nuevo
+        dt = max(1e-3, t - self._last_t) if self._last_t is not None else None
+        self._last_t = t
+
+        slot = self._buf[self._head]
+        if self._count == self.size:
+            self._sum -= slot
+        else:
+            self._count += 1
+        slot[:] = frame
+        if self._filter is not None:
+            # Solo x,y,z; la visibilidad pasa sin filtrar
+            slot[:, :3] = self._filter(frame[:, :3], dt if dt is not None else 1.0)
+        self._sum += slot
+        self._head = (self._head + 1) % self.size
+
+        self._pushes += 1
+        if self._pushes % 1024 == 0:
+            # Recalcular la suma para que no acumule error de redondeo
+            self._sum = self.window().sum(axis=0, dtype=np.float64)
+
+        raw = self._jitter_update(self._raw_prev, np.asarray(frame[:, :2], dtype=np.float64))
+        out = self._jitter_update(self._out_prev, slot[:, :2].astype(np.float64))
+        if raw is not None:
+            self._jitter_raw += raw
+            self._jitter_out += out
+            self._jitter_n += 1
+        return slot
+
+    def mean(self):
+        """Media de los frames del buffer (33, 4) float32, o None si está vacío."""
+        if not self._count:
+            return None
+        return (self._sum / self._count).astype(np.float32)
+
+    def latest(self):
+        if not self._count:
+            return None
+        return self._buf[(self._head - 1) % self.size]
+
+    def window(self):
+        """Frames del buffer en orden cronológico, array (k, 33, 4)."""
+        idx = (self._head - self._count + np.arange(self._count)) % self.size
+        return self._buf[idx]
+
+    def jitter_stats(self, per_joint=False):
+        n = self._jitter_n
+        raw = np.sqrt(self._jitter_raw / n) if n else np.zeros_like(self._jitter_raw)
+        out = np.sqrt(self._jitter_out / n) if n else np.zeros_like(self._jitter_out)
+        raw_mean = float(raw.mean())
+        out_mean = float(out.mean())
+        stats = {'filter': self.filter_name,
+                 'frames': self._pushes,
+                 'jitter_raw': round(raw_mean, 6),
+                 'jitter_filtered': round(out_mean, 6),
+                 'reduction': round(1.0 - out_mean / raw_mean, 3) if raw_mean > 0 else 0.0}
+        if per_joint:
+            stats['per_joint_raw'] = np.round(raw, 6).tolist()
+            stats['per_joint_filtered'] = np.round(out, 6).tolist()
+        return stats
@@ -0,0 +1,238 @@
+"""
+Suscripciones al video de la cámara local por cliente, con salas de Socket.IO y calidad adaptativa.
+
+Antes cada 'video_feed' llevaba el JPEG a resolución completa en base64 a todos los clientes,
+se conectaran por wifi o por datos móviles y aunque dibujaran el esqueleto ellos mismos.
+Ahora solo reciben video los clientes que lo piden con 'subscribe_video', y cada uno elige un
+modo:
+
+- 'full':       frame completo con el esqueleto dibujado;
+- 'downscaled': frame reducido a `downscaled_width` píxeles de ancho;
+- 'landmarks':  sin imagen, solo landmarks y etiqueta (el cliente dibuja su propia capa).
+
+Cada modo se sirve en escalones (`TIERS`) de calidad JPEG y fps máximos. Los clientes con el
+mismo (modo, escalón) comparten una sala de Socket.IO: el frame se codifica una vez por sala y
+se emite una sola vez a la sala. El veredicto (Bien/Mal) de cada cliente va aparte, en un
+mensaje pequeño dirigido a él.
+
+El cliente confirma cada frame mostrado con 'video_ack'; la latencia entre el envío y la
+confirmación (media exponencial) mueve al cliente de escalón: baja si supera `high_ms` o si
+lleva `stall_s` sin confirmar (haya confirmado antes o no), y sube tras varias confirmaciones
+por debajo de `low_ms`. Entre cambios
+se espera `cooldown_s` para no oscilar.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MODES = ('full', 'downscaled', 'landmarks')
+# (calidad JPEG, fps máximos) de menor a mayor
+TIERS = ((35, 5.0), (50, 10.0), (65, 15.0), (80, 30.0))
+
+
+def room_name(mode, tier):
+    return f'video:{mode}:{tier}'
+
+
+class VideoSubscription:
+    """Modo, escalón y latencia de confirmación de un cliente."""
+
+    def __init__(self, client_id, mode, tier):
+        self.client_id = client_id
+        self.mode = mode
+        self.tier = tier
+        self.ack_ms = None          # media exponencial de la latencia de confirmación
+        self.acks = 0
+        self.last_ack = None
+        self.subscribed_at = time.perf_counter()
+        self.unacked = 0            # frames enviados desde la última confirmación
+        self.fast_streak = 0
+        self.changed_at = 0.0
+        self.frames = 0
+        self.bytes = 0
+        self.downgrades = 0
+        self.upgrades = 0
+
+    @property
+    def room(self):
+        return room_name(self.mode, self.tier)
+
+    @property
+    def quality(self):
+        return TIERS[self.tier][0]
+
+    @property
+    def max_fps(self):
+        return TIERS[self.tier][1]
+
+    def stats(self):
+        return {'mode': self.mode,
+                'tier': self.tier,
+                'quality': self.quality if self.mode != 'landmarks' else None,
+                'max_fps': self.max_fps,
+                'ack_ms': round(self.ack_ms, 1) if self.ack_ms is not None else None,
+                'acks': self.acks,
+                'frames': self.frames,
+                'bytes': self.bytes,
+                'downgrades': self.downgrades,
+                'upgrades': self.upgrades}
+
+
+class VideoSubscriptions:
+    """Registro de suscripciones: decide qué salas reciben cada frame y adapta los escalones.
+
+    `on_room_change(client_id, old_room, new_room)` se llama (fuera del lock) cuando un cliente
+    cambia de sala, para moverlo en Socket.IO; `old_room` o `new_room` pueden ser None.
+    """
+
+    def __init__(self, on_room_change=None, high_ms=250.0, low_ms=100.0, cooldown_s=1.0,
+                 stall_s=2.0, downscaled_width=400):
+        self.on_room_change = on_room_change
+        self.high_ms = float(high_ms)
+        self.low_ms = float(low_ms)
+        self.cooldown_s = float(cooldown_s)
+        self.stall_s = float(stall_s)
+        self.downscaled_width = int(downscaled_width)
+        self._lock = threading.Lock()
+        self._subs = {}
+        self._room_last_sent = {}
+        self._sent = OrderedDict()  # frame_id -> instante de envío (últimos frames)
+        self._frame_id = 0
+        self.encodes = 0
+        self.encode_time = 0.0
+        self.bytes_out = 0
+        self.emits = 0
+
+    def _notify(self, changes):
+        if self.on_room_change is None:
+            return
+        for client_id, old, new in changes:
+            try:
+                self.on_room_change(client_id, old, new)
+            except Exception as e:
+                print(f"[VIDEO] Error moviendo {client_id} de sala: {e}")
+
+    def subscribe(self, client_id, mode='full'):
+        """Suscribe (o cambia de modo) a un cliente. Empieza en el escalón más alto.
+        Devuelve las estadísticas de su suscripción."""
+        if mode not in MODES:
+            raise ValueError(f"modo debe ser uno de {', '.join(MODES)}")
+        with self._lock:
+            sub = self._subs.get(client_id)
+            old = sub.room if sub is not None else None
+            sub = VideoSubscription(client_id, mode, len(TIERS) - 1)
+            self._subs[client_id] = sub
+            info = {**sub.stats(), 'room': sub.room}
+        if old != sub.room:
+            self._notify([(client_id, old, sub.room)])
+        return info
+
+    def is_subscribed(self, client_id):
+        with self._lock:
+            return client_id in self._subs
+
+    def unsubscribe(self, client_id):
+        with self._lock:
+            sub = self._subs.pop(client_id, None)
+        if sub is not None:
+            self._notify([(client_id, sub.room, None)])
+
+    def _move(self, sub, step, now):
+        old = sub.room
+        sub.tier += step
+        sub.changed_at = now
+        sub.fast_streak = 0
+        if step < 0:
+            sub.downgrades += 1
+        else:
+            sub.upgrades += 1
+        return sub.client_id, old, sub.room
+
+    def plan(self):
+        """Reserva un frame_id y devuelve (frame_id, salas): lista de (sala, modo, calidad,
+        [client_ids]) a las que toca emitir según los fps de su escalón."""
+        now = time.perf_counter()
+        changes = []
+        with self._lock:
+            rooms = {}
+            for sub in self._subs.values():
+                # Cliente que no confirma (dejó de hacerlo o nunca lo hizo): bajar de escalón
+                last_ack = sub.last_ack if sub.last_ack is not None else sub.subscribed_at
+                if (sub.unacked >= 3 and sub.tier > 0 and now - last_ack > self.stall_s
+                        and now - sub.changed_at >= self.cooldown_s):
+                    changes.append(self._move(sub, -1, now))
+                rooms.setdefault((sub.mode, sub.tier), []).append(sub)
+            due = []
+            for (mode, tier), subs in rooms.items():
+                room = room_name(mode, tier)
+                if now - self._room_last_sent.get(room, 0.0) < 1.0 / TIERS[tier][1]:
+                    continue
+                self._room_last_sent[room] = now
+                for sub in subs:
+                    sub.unacked += 1
+                due.append((room, mode, TIERS[tier][0], [s.client_id for s in subs]))
+            self._frame_id += 1
+            frame_id = self._frame_id
+            if due:
+                self._sent[frame_id] = now
+                while len(self._sent) > 256:
+                    self._sent.popitem(last=False)
+        self._notify(changes)
+        return frame_id, due
+
+    def record_encode(self, seconds):
+        with self._lock:
+            self.encodes += 1
+            self.encode_time += seconds
+
+    def record_emit(self, room_clients, nbytes):
+        """Cuenta los bytes de un emit a una sala con `room_clients` clientes."""
+        with self._lock:
+            self.emits += 1
+            self.bytes_out += nbytes * len(room_clients)
+            for client_id in room_clients:
+                sub = self._subs.get(client_id)
+                if sub is not None:
+                    sub.frames += 1
+                    sub.bytes += nbytes
+
+    def ack(self, client_id, frame_id):
+        """Confirmación de un frame mostrado. Devuelve la latencia en ms (o None)."""
+        now = time.perf_counter()
+        changes = []
+        with self._lock:
+            sub = self._subs.get(client_id)
+            t_sent = self._sent.get(frame_id)
+            if sub is None or t_sent is None:
+                return None
+            latency = (now - t_sent) * 1000.0
+            sub.ack_ms = latency if sub.ack_ms is None else 0.7 * sub.ack_ms + 0.3 * latency
+            sub.acks += 1
+            sub.last_ack = now
+            sub.unacked = 0
+            if now - sub.changed_at >= self.cooldown_s:
+                if sub.ack_ms > self.high_ms and sub.tier > 0:
+                    changes.append(self._move(sub, -1, now))
+                elif sub.ack_ms < self.low_ms and sub.tier < len(TIERS) - 1:
+                    sub.fast_streak += 1
+                    if sub.fast_streak >= 5:
+                        changes.append(self._move(sub, +1, now))
+                else:
+                    sub.fast_streak = 0
+        self._notify(changes)
+        return latency
+
+    def stats(self):
+        with self._lock:
+            clients = {cid: sub.stats() for cid, sub in self._subs.items()}
+            encodes, encode_time = self.encodes, self.encode_time
+            bytes_out, emits = self.bytes_out, self.emits
+        by_mode = {m: sum(1 for c in clients.values() if c['mode'] == m) for m in MODES}
+        return {'subscribers': by_mode,
+                'emits': emits,
+                'encodes': encodes,
+                'avg_encode_ms': round(1000.0 * encode_time / encodes, 2) if encodes else 0.0,
+                'bytes_out': bytes_out,
+                'downscaled_width': self.downscaled_width,
+                'clients': clients}
@@ -0,0 +1,70 @@
+"""Pruebas del almacén binario de landmarks: ida y vuelta, procedencia y borrado por origen."""
+
+import numpy as np
+import pytest
+
+from almacen_landmarks import LandmarkStore, csv_to_store, store_to_csv
+
+
+def _rows(n, seed=0):
+    return np.random.default_rng(seed).random((n, 99)).astype(np.float32)
+
+
+def test_append_and_reopen_round_trip(tmp_path):
+    path = tmp_path / 'dataset.lmk'
+    a, b = _rows(4), _rows(3, seed=1)
+    store = LandmarkStore(path, normalized=True)
+    store.append(a, 'escoliosis', sources='v1.mp4', frames=np.arange(4), timestamps=np.arange(4) / 2.0,
+                 confidences=0.9)
+    store.append(b, ['lumbalgia', 'lumbalgia', 'escoliosis'])
+
+    reopened = LandmarkStore.open(path)
+    assert len(reopened) == 7
+    assert reopened.normalized
+    assert reopened.classes == ['escoliosis', 'lumbalgia']
+    data = reopened.load()
+    assert np.array_equal(data['features'], np.vstack([a, b]))
+    assert list(data['labels']) == ['escoliosis'] * 4 + ['lumbalgia', 'lumbalgia', 'escoliosis']
+    assert list(data['sources']) == ['v1.mp4'] * 4 + [None] * 3
+    assert list(data['frames']) == [0, 1, 2, 3, -1, -1, -1]
+    assert data['timestamps'][3] == pytest.approx(1.5)
+    assert np.isnan(data['timestamps'][4:]).all()
+    assert data['confidences'][:4] == pytest.approx([0.9] * 4)
+
+    only = reopened.load(classes=['lumbalgia'])
+    assert np.array_equal(only['features'], b[:2])
+
+
+def test_csv_round_trip(tmp_path):
+    store = LandmarkStore(tmp_path / 'a.lmk')
+    feats = _rows(5)
+    store.append(feats, ['x', 'y', 'x', 'y', 'x'])
+    assert store_to_csv(tmp_path / 'a.lmk', tmp_path / 'a.csv') == 5
+    data = csv_to_store(tmp_path / 'a.csv', tmp_path / 'b.lmk').load()
+    assert np.array_equal(data['features'], feats)
+    assert list(data['labels']) == ['x', 'y', 'x', 'y', 'x']
+
+
+def test_remove_sources_keeps_other_rows_and_drops_stamps(tmp_path):
+    path = tmp_path / 'calibracion.lmk'
+    store = LandmarkStore(path)
+    rows = {name: _rows(3, seed=i) for i, name in enumerate(['v1.mp4', 'v2.mp4', 'v3.mp4'])}
+    for name, feats in rows.items():
+        store.append(feats, 'clase', sources=name, frames=np.arange(3))
+        store.set_stamp(name, {'size': 10, 'mtime_ns': 1})
+
+    assert store.remove_sources(['v2.mp4', 'no-existe.mp4']) == 3
+    assert store.stamp('v2.mp4') is None
+    assert store.stamp('v1.mp4') == {'size': 10, 'mtime_ns': 1}
+
+    reopened = LandmarkStore.open(path)
+    assert len(reopened) == 6
+    data = reopened.load()
+    assert list(data['sources']) == ['v1.mp4'] * 3 + ['v3.mp4'] * 3
+    assert np.array_equal(data['features'], np.vstack([rows['v1.mp4'], rows['v3.mp4']]))
+    assert reopened.stamp('v2.mp4') is None
+
+    # Al volver a extraer el video eliminado, sus filas se añaden al final
+    reopened.append(rows['v2.mp4'], 'clase', sources='v2.mp4')
+    assert np.array_equal(reopened.load(sources=['v2.mp4'])['features'], rows['v2.mp4'])
+    assert reopened.remove_sources(['no-existe.mp4']) == 0
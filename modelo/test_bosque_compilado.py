@@ -0,0 +1,53 @@
+"""Pruebas del bosque compilado: mismas predicciones que scikit-learn y formatos de guardado."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from bosque_compilado import CompiledForest, check_equivalence, is_forest, load_or_export
+
+
+def _data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0.0, 1.0, (n, 99)).astype(np.float32)
+    y = np.array(['lumbalgia', 'escoliosis', 'hernia'])[(X[:, 0] + X[:, 5] > 0).astype(int) + (X[:, 7] > 1)]
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def forest():
+    X, y = _data()
+    return RandomForestClassifier(n_estimators=40, max_depth=8, min_samples_leaf=2, random_state=0).fit(X, y)
+
+
+def test_compiled_forest_matches_predict(forest):
+    X, _ = _data(seed=1)
+    # Muestras exactamente en los umbrales: el desempate (<=) debe coincidir con scikit-learn
+    compiled = CompiledForest.from_model(forest)
+    on_threshold = X[:50].copy()
+    for row, est in zip(on_threshold, forest.estimators_):
+        row[est.tree_.feature[0]] = est.tree_.threshold[0]
+    X = np.vstack([X, on_threshold])
+    assert check_equivalence(compiled, forest, X) == (len(X), len(X))
+    assert np.allclose(compiled.predict_proba(X), forest.predict_proba(X))
+    assert compiled.predict(X[0]) == forest.predict(X[:1])
+
+
+def test_extra_trees_are_forests_too():
+    X, y = _data()
+    extra = ExtraTreesClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    assert is_forest(extra)
+    assert check_equivalence(CompiledForest.from_model(extra), extra, X) == (len(X), len(X))
+
+
+@pytest.mark.parametrize('suffix', ['npz', 'joblib'])
+def test_save_load_round_trip(forest, tmp_path, suffix):
+    X, _ = _data(seed=2)
+    path = tmp_path / f'modelo_compilado.{suffix}'
+    exported = load_or_export(forest, path, mmap_mode='r' if suffix == 'joblib' else None)
+    assert path.exists()
+    loaded = CompiledForest.load(path, mmap_mode='r' if suffix == 'joblib' else None)
+    assert loaded.n_trees == exported.n_trees == len(forest.estimators_)
+    assert np.array_equal(loaded.predict(X), forest.predict(X))
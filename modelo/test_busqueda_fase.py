@@ -0,0 +1,49 @@
+"""Pruebas de la búsqueda de fase: LB_Keogh es cota inferior y la poda no cambia el resultado."""
+
+import numpy as np
+import pytest
+
+from busqueda_fase import PhaseSearcher, banded_dtw, pose_features
+from landmarks_compactos import ReferenceSequence
+
+
+def _walk(n, seed=0):
+    """Secuencia (n, 33, 4) con movimiento suave (paseo aleatorio) alrededor de una pose."""
+    rng = np.random.default_rng(seed)
+    base = rng.random((33, 4)).astype(np.float32)
+    base[[11, 12], 1] = 0.3     # hombros por encima de las caderas: torso válido
+    base[[23, 24], 1] = 0.7
+    steps = rng.normal(0.0, 0.01, (n, 33, 4)).astype(np.float32)
+    return base + np.cumsum(steps, axis=0)
+
+
+@pytest.mark.parametrize('band', [0, 1, 2, 4])
+def test_lb_keogh_never_exceeds_banded_dtw(band):
+    searcher = PhaseSearcher(ReferenceSequence(_walk(60)), band=band)
+    for seed in range(5):
+        query = pose_features(_walk(5, seed=seed + 1))
+        lb = searcher.lower_bounds(query)
+        assert len(lb) == len(searcher) - len(query) + 1
+        exact = [banded_dtw(query, searcher.features[s:s + len(query)], band) for s in range(len(lb))]
+        assert np.all(lb <= np.array(exact) + 1e-9)
+
+
+def test_pruned_search_matches_brute_force():
+    reference = _walk(80)
+    searcher = PhaseSearcher(ReferenceSequence(reference), band=2)
+    for seed in range(5):
+        user = _walk(4, seed=seed + 10)
+        idx, cost = searcher.search(user)
+        query = pose_features(user)
+        exact = [banded_dtw(query, searcher.features[s:s + 4], 2) for s in range(len(searcher) - 3)]
+        assert cost == pytest.approx(min(exact))
+        assert idx == int(np.argmin(exact)) + 3
+    # Un tramo copiado de la referencia se encuentra con coste cero
+    idx, cost = searcher.search(reference[30:34])
+    assert (idx, cost) == (33, pytest.approx(0.0, abs=1e-9))
+    assert searcher.stats()['pruned_ratio'] > 0
+
+
+def test_query_longer_than_reference():
+    searcher = PhaseSearcher(_walk(3))
+    assert searcher.search(_walk(4)) == (None, float('inf'))
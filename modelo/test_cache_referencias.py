@@ -0,0 +1,75 @@
+"""Pruebas de la caché de referencias: niveles memoria/disco e invalidación por tamaño y mtime."""
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+pytest.importorskip('mediapipe')
+from cache_referencias import ReferenceCache
+
+
+class _Extractor:
+    """Extractor falso: cuenta las llamadas y devuelve frames que dependen del contenido."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, video_path, target_fps=3, max_samples=600):
+        self.calls += 1
+        size = os.path.getsize(video_path)
+        frames = np.full((4, 33, 4), size, dtype=np.float32)
+        return frames, [i / target_fps for i in range(4)]
+
+
+def _video(tmp_path, content=b'video'):
+    path = tmp_path / 'referencia.mp4'
+    path.write_bytes(content)
+    return path
+
+
+def test_memory_then_disk_then_extraction(tmp_path):
+    video = _video(tmp_path)
+    extractor = _Extractor()
+    cache = ReferenceCache(tmp_path / 'cache', extractor=extractor)
+    first = cache.get(video)
+    assert first['origen'] == 'extraccion'
+    assert len(first['sequence']) == 4
+    assert cache.get(video)['origen'] == 'memoria'
+    assert cache.get(video)['sequence'] is first['sequence']
+
+    # Otro proceso (sin memoria) encuentra la entrada en disco
+    other = ReferenceCache(tmp_path / 'cache', extractor=extractor)
+    assert other.contains(video)
+    entry = other.get(video)
+    assert entry['origen'] == 'disco'
+    assert np.array_equal(entry['sequence'].frames, first['sequence'].frames)
+    assert np.allclose(entry['timestamps'], first['timestamps'])
+    assert extractor.calls == 1
+
+    # target_fps forma parte de la clave
+    assert cache.get(video, target_fps=5)['origen'] == 'extraccion'
+    assert extractor.calls == 2
+
+
+def test_changed_video_invalidates_memory_and_disk(tmp_path):
+    video = _video(tmp_path)
+    extractor = _Extractor()
+    cache = ReferenceCache(tmp_path / 'cache', extractor=extractor)
+    cache.get(video)
+
+    st = os.stat(video)
+    video.write_bytes(b'otro video mas largo')
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert not cache.contains(video)
+    entry = cache.get(video)
+    assert entry['origen'] == 'extraccion'
+    assert entry['sequence'].frames[0, 0, 0] == len(b'otro video mas largo')
+
+    # Solo cambia el mtime (mismo tamaño): también se invalida en un proceso nuevo
+    st = os.stat(video)
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    fresh = ReferenceCache(tmp_path / 'cache', extractor=extractor)
+    assert fresh.get(video)['origen'] == 'extraccion'
+    assert extractor.calls == 3
@@ -0,0 +1,111 @@
+"""Pruebas del motor DTW: equivalencia con el cálculo por bucles y poder de rechazo."""
+
+import csv
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from dtw_vectorizado import StreamingDTW, dtw_compare
+
+CSV_PATH = Path(__file__).with_name('dataset_posturas_videos.csv')
+OK_AVG_THRESH = 0.30    # umbral 'Buen movimiento' del DTW en evaluate_posture (tolerancia 1.0)
+
+
+def _loop_frame_distance(a, b):
+    """Distancia media por punto entre dos frames planos [x,y,z,...] centrados en la pelvis y
+    escalados por el torso, con bucles de Python."""
+    def normalize(flat):
+        pts = [(flat[i], flat[i + 1]) for i in range(0, len(flat), 3)]
+        hx, hy = (pts[23][0] + pts[24][0]) / 2.0, (pts[23][1] + pts[24][1]) / 2.0
+        sx, sy = (pts[11][0] + pts[12][0]) / 2.0, (pts[11][1] + pts[12][1]) / 2.0
+        torso = math.hypot(sx - hx, sy - hy)
+        if torso <= 1e-6:
+            return None
+        return [((x - hx) / torso, (y - hy) / torso) for x, y in pts]
+    na, nb = normalize(a), normalize(b)
+    if na is None or nb is None:
+        return float('inf')
+    return sum(math.hypot(p[0] - q[0], p[1] - q[1]) for p, q in zip(na, nb)) / len(na)
+
+
+def _loop_dtw(seq_a, seq_b):
+    """DTW celda a celda con el mismo desempate que el cálculo original de evaluate_posture."""
+    na, nb = len(seq_a), len(seq_b)
+    fd = [[_loop_frame_distance(a, b) for b in seq_b] for a in seq_a]
+    inf = float('inf')
+    acc = [[inf] * (nb + 1) for _ in range(na + 1)]
+    acc[0][0] = 0.0
+    for i in range(1, na + 1):
+        for j in range(1, nb + 1):
+            acc[i][j] = fd[i - 1][j - 1] + min(acc[i - 1][j], acc[i][j - 1], acc[i - 1][j - 1])
+    i, j, path = na, nb, []
+    while i > 0 and j > 0:
+        path.append((i - 1, j - 1))
+        choices = [(acc[i - 1][j - 1], i - 1, j - 1), (acc[i - 1][j], i - 1, j), (acc[i][j - 1], i, j - 1)]
+        _, i, j = min(choices, key=lambda c: c[0])
+    costs = [fd[p][q] for p, q in path]
+    return sum(costs) / len(costs), max(costs), len(path), acc[na][nb]
+
+
+def _load_by_class():
+    by_class = {}
+    with open(CSV_PATH, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            by_class.setdefault(row[-1], []).append([float(v) for v in row[:-1]])
+    return by_class
+
+
+@pytest.fixture(scope='module')
+def by_class():
+    if not CSV_PATH.exists():
+        pytest.skip('dataset_posturas_videos.csv no disponible')
+    return _load_by_class()
+
+
+def test_dtw_compare_matches_loop_reference(by_class):
+    rng = np.random.default_rng(0)
+    rows = [r for frames in by_class.values() for r in frames]
+    for _ in range(20):
+        na, nb = int(rng.integers(1, 5)), int(rng.integers(1, 10))
+        user = [rows[k] for k in rng.integers(0, len(rows), na)]
+        ref = [rows[k] for k in rng.integers(0, len(rows), nb)]
+        avg, mx, length, total = dtw_compare(user, ref)
+        e_avg, e_mx, e_length, e_total = _loop_dtw(user, ref)
+        assert length == e_length
+        assert avg == pytest.approx(e_avg, rel=1e-5)
+        assert mx == pytest.approx(e_mx, rel=1e-5)
+        assert total == pytest.approx(e_total, rel=1e-5)
+
+
+def test_different_class_pairs_score_above_ok_avg(by_class):
+    # Buffers de 3 frames del usuario contra ventanas de 9 frames de otra clase
+    scores = []
+    for label, frames in by_class.items():
+        for other, ref_frames in by_class.items():
+            if other == label:
+                continue
+            for s in range(0, len(frames) - 3, 20):
+                r = min(s, len(ref_frames) - 9)
+                avg, _, _, _ = dtw_compare(frames[s:s + 3], ref_frames[r:r + 9])
+                scores.append(avg)
+    scores = np.array(scores)
+    assert np.median(scores) > OK_AVG_THRESH
+    assert np.mean(scores > OK_AVG_THRESH) > 0.9
+
+
+def test_streaming_dtw_without_forgetting_matches_dtw_compare(by_class):
+    frames = [r for rows in by_class.values() for r in rows]
+    for s in range(0, len(frames) - 12, 37):
+        buffer, window = frames[s:s + 3], frames[s + 2:s + 11]
+        dtw = StreamingDTW(window, window=len(window), forgetting=1.0, horizon=len(buffer))
+        for landmarks in buffer:
+            avg, mx, length, total, j = dtw.push(landmarks, center=len(window) // 2)
+        e_avg, e_mx, e_length, e_total = dtw_compare(buffer, window[:j + 1])
+        assert length == e_length
+        assert avg == pytest.approx(e_avg)
+        assert mx == pytest.approx(e_mx)
+        assert total == pytest.approx(e_total)
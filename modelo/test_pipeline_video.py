@@ -0,0 +1,58 @@
+"""Pruebas del pipeline de la cámara: cola con descarte del más antiguo y fin de la fuente."""
+
+import threading
+import time
+
+from pipeline_video import DropOldestQueue, VideoPipeline
+
+
+def test_drop_oldest_queue_keeps_newest_items():
+    q = DropOldestQueue(maxsize=2)
+    assert q.put(1) is False
+    assert q.put(2) is False
+    assert q.put(3) is True
+    assert q.put(4) is True
+    assert len(q) == 2 and q.dropped == 2
+    assert q.get(timeout=0) == 3
+    assert q.get(timeout=0) == 4
+    assert q.get(timeout=0.01) is None
+
+
+def test_close_wakes_waiting_consumer_and_drains_remaining():
+    q = DropOldestQueue(maxsize=1)
+    got = []
+    consumer = threading.Thread(target=lambda: got.append(q.get(timeout=5)))
+    consumer.start()
+    time.sleep(0.05)
+    t0 = time.perf_counter()
+    q.close()
+    consumer.join(1)
+    assert got == [None] and time.perf_counter() - t0 < 1
+    assert q.closed
+
+    # Lo que quedaba en la cola se entrega antes de dar la cola por terminada
+    q = DropOldestQueue(maxsize=1)
+    q.put('ultimo')
+    q.close()
+    assert q.get() == 'ultimo'
+    assert q.get() is None
+
+
+def test_pipeline_ends_with_source_and_emits_in_order():
+    frames = iter(range(20))
+    emitted = []
+
+    def infer(frame):
+        time.sleep(0.002)
+        return frame * 10
+
+    pipeline = VideoPipeline(lambda: next(frames, None), infer, emitted.append, queue_size=2)
+    pipeline.start()
+    pipeline.join(5)
+    assert not pipeline.running
+    # La inferencia lenta descarta frames viejos, pero lo emitido sigue en orden y llega el último
+    assert emitted == sorted(emitted)
+    assert emitted[-1] == 190
+    stats = pipeline.stats()
+    assert stats['captura']['processed'] == 20
+    assert stats['inferencia']['processed'] + stats['inferencia']['dropped'] == 20
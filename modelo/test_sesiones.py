@@ -0,0 +1,37 @@
+"""Pruebas del estado por cliente: elección de la referencia de evaluación."""
+
+import numpy as np
+
+from landmarks_compactos import ReferenceSequence
+from sesiones import ClientSession
+
+
+def _frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((n, 33, 4)).astype(np.float32)
+
+
+def test_evaluation_reference_uses_sequence_once_buffer_has_two_frames():
+    session = ClientSession('s', buffer_size=3, alignment='sync')
+    session.set_reference_sequence(_frames(10), ref_fps=10)
+    session.sync_time(0.4)
+    user = _frames(3, seed=1)
+
+    session.push_http_landmarks(user[0])
+    ref = session.evaluation_reference(session.http_smoother.window())
+    assert not isinstance(ref, ReferenceSequence)
+    assert np.array_equal(ref, session.reference_sequence[4])
+
+    for frame in user[1:]:
+        session.push_http_landmarks(frame)
+        ref = session.evaluation_reference(session.http_smoother.window())
+        assert ref is session.reference_sequence
+
+
+def test_evaluation_reference_without_sequence_falls_back_to_single_frame():
+    session = ClientSession('s')
+    assert session.evaluation_reference(session.http_smoother.window()) is None
+    session.reference_landmarks = _frames(1)[0]
+    session.push_http_landmarks(_frames(1)[0])
+    session.push_http_landmarks(_frames(1)[0])
+    assert session.evaluation_reference(session.http_smoother.window()) is session.reference_landmarks
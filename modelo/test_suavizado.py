@@ -0,0 +1,53 @@
+"""Pruebas del buffer circular de suavizado: orden cronológico, media y reinicio por hueco."""
+
+import numpy as np
+import pytest
+
+from suavizado import LandmarkSmoother
+
+
+def _frame(value):
+    return np.full((33, 4), value, dtype=np.float32)
+
+
+def test_window_is_chronological_after_wrap_around():
+    smoother = LandmarkSmoother(size=3)
+    assert smoother.window().shape == (0, 33, 4)
+    for k in range(7):
+        smoother.push(_frame(k), t=k * 0.1)
+        expected = list(range(max(0, k - 2), k + 1))
+        window = smoother.window()
+        assert window[:, 0, 0].tolist() == expected
+        assert len(smoother) == len(expected)
+        assert smoother.latest()[0, 0] == k
+        assert smoother.mean()[0, 0] == pytest.approx(np.mean(expected))
+
+
+def test_window_is_a_copy_of_the_buffer():
+    smoother = LandmarkSmoother(size=2)
+    smoother.push(_frame(1), t=0.0)
+    window = smoother.window()
+    smoother.push(_frame(2), t=0.1)
+    smoother.push(_frame(3), t=0.2)
+    assert window[:, 0, 0].tolist() == [1]
+
+
+def test_long_gap_restarts_the_buffer():
+    smoother = LandmarkSmoother(size=3, reset_gap=1.0)
+    smoother.push(_frame(1), t=0.0)
+    smoother.push(_frame(2), t=0.1)
+    smoother.push(_frame(3), t=5.0)
+    assert smoother.window()[:, 0, 0].tolist() == [3]
+    assert smoother.mean()[0, 0] == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize('filter', ['one_euro', 'kalman'])
+def test_filtered_window_keeps_order_and_visibility(filter):
+    smoother = LandmarkSmoother(size=4, filter=filter)
+    for k in range(6):
+        frame = _frame(k * 0.01)
+        frame[:, 3] = k
+        smoother.push(frame, t=k / 30.0)
+    window = smoother.window()
+    assert window[:, 0, 3].tolist() == [2, 3, 4, 5]   # la visibilidad no se filtra
+    assert np.all(np.diff(window[:, 0, 0]) > 0)
@@ -0,0 +1,116 @@
+"""Pruebas de las suscripciones de video: salas por modo/escalón y cambios de calidad."""
+
+from types import SimpleNamespace
+
+import pytest
+
+import suscripciones_video
+from suscripciones_video import TIERS, VideoSubscriptions, room_name
+
+TOP = len(TIERS) - 1
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(suscripciones_video, 'time', SimpleNamespace(perf_counter=clock))
+    return clock
+
+
+@pytest.fixture
+def moves():
+    return []
+
+
+@pytest.fixture
+def subs(clock, moves):
+    return VideoSubscriptions(on_room_change=lambda cid, old, new: moves.append((cid, old, new)))
+
+
+def _send_and_ack(subs, clock, client_id, latency_ms):
+    """Avanza hasta que toca un frame, lo planifica y lo confirma con la latencia dada."""
+    clock.t += 1.0
+    frame_id, rooms = subs.plan()
+    assert any(client_id in clients for _, _, _, clients in rooms)
+    clock.t += latency_ms / 1000.0
+    return subs.ack(client_id, frame_id)
+
+
+def test_subscribe_mode_change_and_unsubscribe_move_rooms(subs, moves):
+    info = subs.subscribe('a', 'landmarks')
+    assert info['tier'] == TOP and info['room'] == room_name('landmarks', TOP)
+    subs.subscribe('a', 'full')
+    subs.unsubscribe('a')
+    assert moves == [('a', None, room_name('landmarks', TOP)),
+                     ('a', room_name('landmarks', TOP), room_name('full', TOP)),
+                     ('a', room_name('full', TOP), None)]
+    assert not subs.is_subscribed('a')
+    with pytest.raises(ValueError):
+        subs.subscribe('a', 'hd')
+
+
+def test_slow_acks_step_down_once_per_cooldown(subs, clock, moves):
+    subs.subscribe('a')
+    moves.clear()
+    _send_and_ack(subs, clock, 'a', 400)
+    assert moves == [('a', room_name('full', TOP), room_name('full', TOP - 1))]
+    # Dentro del cooldown no se vuelve a bajar aunque siga lento
+    frame_id, _ = subs.plan()
+    clock.t += 0.4
+    subs.ack('a', frame_id)
+    assert len(moves) == 1
+    _send_and_ack(subs, clock, 'a', 400)
+    assert subs.stats()['clients']['a']['tier'] == TOP - 2
+    assert subs.stats()['clients']['a']['downgrades'] == 2
+
+
+def test_fast_acks_step_back_up(subs, clock, moves):
+    subs.subscribe('a')
+    _send_and_ack(subs, clock, 'a', 400)
+    fast = 0
+    for _ in range(30):
+        before = subs.stats()['clients']['a']
+        _send_and_ack(subs, clock, 'a', 10)
+        after = subs.stats()['clients']['a']
+        fast = fast + 1 if after['ack_ms'] < subs.low_ms else 0
+        if after['upgrades']:
+            break
+    # Sube un solo escalón y solo tras varias confirmaciones rápidas seguidas
+    assert after['upgrades'] == 1
+    assert after['tier'] == before['tier'] + 1
+    assert fast >= 5
+    assert moves[-1] == ('a', room_name('full', before['tier']), room_name('full', after['tier']))
+
+
+def test_client_that_never_acks_is_downgraded(subs, clock):
+    subs.subscribe('mudo')
+    subs.subscribe('rapido')
+    for _ in range(4):
+        clock.t += 1.0
+        frame_id, rooms = subs.plan()
+        subs.ack('rapido', frame_id)
+    clients = subs.stats()['clients']
+    assert clients['mudo']['tier'] < TOP
+    assert clients['rapido']['tier'] == TOP
+
+
+def test_plan_respects_tier_fps_and_groups_rooms(subs, clock):
+    subs.subscribe('a', 'full')
+    subs.subscribe('b', 'full')
+    subs.subscribe('c', 'landmarks')
+    _, rooms = subs.plan()
+    assert sorted((room, clients) for room, _, _, clients in rooms) == [
+        (room_name('full', TOP), ['a', 'b']), (room_name('landmarks', TOP), ['c'])]
+    # Antes de 1/fps del escalón no se vuelve a emitir a la misma sala
+    clock.t += 0.5 / TIERS[TOP][1]
+    assert subs.plan()[1] == []
+    clock.t += 1.0 / TIERS[TOP][1]
+    assert len(subs.plan()[1]) == 2